@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Admission Control - Sofia LiberNet
+
+Controle de admissão dos endpoints de chat (/api/chat, /api/chats/<id>/message):
+- Token bucket por usuário e por IP (anônimos têm um bucket por IP mais restrito)
+- Limite global de requisições simultâneas por faixa de modelo
+  (anonymous, mini, full), para um cliente não ocupar todos os workers
+- Estado compartilhado entre workers/processos (SQLite, mesmo banco do
+  rate_limiter); vagas são leases com validade, liberadas mesmo se o worker cair
+- Recusa com 429 + Retry-After; sem SQLite, cai para limites locais do processo
+- IP do cliente lido de cabeçalho de proxy só quando a conexão vem de um proxy
+  confiável (ADMISSION_TRUSTED_PROXIES); senão, o IP da conexão
+
+Uso:
+    from admission import admission_control
+
+    @app.route('/api/chat', methods=['POST'])
+    @admission_control(identity=lambda: current_user.id if current_user.is_authenticated else None)
+    def api_chat():
+        ...
+"""
+
+import os
+import math
+import ipaddress
+import time
+import sqlite3
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import request, jsonify
+
+from rate_limiter import DB_PATH
+from llm_gateway import LLM_REQUEST_BUDGET
+from tool_executor import TOOL_TIMEOUT
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+
+# Token buckets: (requisições por minuto, burst)
+ADMISSION_USER_PER_MINUTE = float(os.getenv('ADMISSION_USER_PER_MINUTE', '20'))
+ADMISSION_USER_BURST = float(os.getenv('ADMISSION_USER_BURST', '5'))
+ADMISSION_IP_PER_MINUTE = float(os.getenv('ADMISSION_IP_PER_MINUTE', '40'))  # vários usuários atrás de NAT
+ADMISSION_IP_BURST = float(os.getenv('ADMISSION_IP_BURST', '10'))
+ADMISSION_ANON_PER_MINUTE = float(os.getenv('ADMISSION_ANON_PER_MINUTE', '6'))
+ADMISSION_ANON_BURST = float(os.getenv('ADMISSION_ANON_BURST', '3'))
+
+# Requisições simultâneas por faixa (somando todos os workers)
+TIER_CONCURRENCY = {
+    'anonymous': int(os.getenv('ADMISSION_MAX_ANONYMOUS', '4')),
+    'mini': int(os.getenv('ADMISSION_MAX_MINI', '16')),
+    'full': int(os.getenv('ADMISSION_MAX_FULL', '8')),
+}
+MINI_MODELS = {'gpt-4o-mini', 'sofia-4.0'}
+
+# Lease de uma vaga. Com gthread o timeout do gunicorn não interrompe uma
+# requisição; quem limita o tempo dela são os deadlines: chamadas à OpenAI (e
+# embeddings) dentro de LLM_REQUEST_BUDGET, mais uma rodada de ferramentas que
+# pode começar no fim do orçamento (fila + execução = 2x TOOL_TIMEOUT) e folga
+ADMISSION_SLOT_MARGIN = 30.0
+ADMISSION_SLOT_TTL = LLM_REQUEST_BUDGET + 2 * TOOL_TIMEOUT + ADMISSION_SLOT_MARGIN
+ADMISSION_BUSY_RETRY_AFTER = int(os.getenv('ADMISSION_BUSY_RETRY_AFTER', '5'))
+PURGE_EVERY = 500  # admissões entre limpezas de buckets cheios
+
+# Proxies (CIDRs) cujos cabeçalhos de IP são aceitos. Padrão: loopback e redes
+# privadas - no docker-compose o app fica atrás do Caddy numa rede Docker, e
+# remote_addr é sempre o endereço do proxy/bridge, nunca loopback
+ADMISSION_TRUSTED_PROXIES = [
+    ipaddress.ip_network(cidr.strip(), strict=False)
+    for cidr in os.getenv('ADMISSION_TRUSTED_PROXIES',
+                          '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7').split(',')
+    if cidr.strip()
+]
+# X-Forwarded-For (lido da direita, pulando proxies confiáveis) ou um cabeçalho
+# que o proxy sempre sobrescreve (X-Real-IP no Nginx, CF-Connecting-IP com Cloudflare)
+ADMISSION_CLIENT_IP_HEADER = os.getenv('ADMISSION_CLIENT_IP_HEADER', 'X-Forwarded-For')
+UNTRUSTED_PROXY_WARN_AFTER = 50  # requisições seguidas do mesmo IP privado não confiável
+
+
+class AdmissionDenied(Exception):
+    """Requisição recusada pelo controle de admissão"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason  # user | ip | anonymous | busy
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class Limit:
+    """Token bucket: rate por minuto e burst (capacidade)"""
+
+    __slots__ = ('name', 'rate', 'capacity')
+
+    def __init__(self, name: str, per_minute: float, burst: float):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, burst)
+
+    def refill(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def wait_for(self, tokens: float) -> float:
+        """Segundos até haver 1 token"""
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+
+LIMITS = {
+    'user': Limit('user', ADMISSION_USER_PER_MINUTE, ADMISSION_USER_BURST),
+    'ip': Limit('ip', ADMISSION_IP_PER_MINUTE, ADMISSION_IP_BURST),
+    'anonymous': Limit('anonymous', ADMISSION_ANON_PER_MINUTE, ADMISSION_ANON_BURST),
+}
+
+
+class Ticket:
+    """Vaga concedida (devolvida em release)"""
+
+    __slots__ = ('tier', 'slot_id', 'shared')
+
+    def __init__(self, tier: str, slot_id: Optional[int], shared: bool):
+        self.tier = tier
+        self.slot_id = slot_id
+        self.shared = shared
+
+
+class AdmissionController:
+    """Token buckets por usuário/IP e vagas por faixa, compartilhados via SQLite"""
+
+    def __init__(self, limits: Optional[Dict[str, Limit]] = None,
+                 concurrency: Optional[Dict[str, int]] = None, db_path: str = DB_PATH):
+        """
+        Args:
+            limits: Buckets por tipo de chave ('user', 'ip', 'anonymous')
+            concurrency: {faixa: máximo de requisições simultâneas}
+            db_path: Banco SQLite compartilhado
+        """
+        self.limits = limits if limits is not None else LIMITS
+        self.concurrency = dict(concurrency if concurrency is not None else TIER_CONCURRENCY)
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._admissions = 0
+        # Estado local (fallback se o SQLite falhar)
+        self._local_buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._local_active: Dict[str, int] = {}
+
+        self.stats = {'admitted': 0, 'rejected_user': 0, 'rejected_ip': 0, 'rejected_anonymous': 0,
+                      'rejected_busy': 0, 'local_fallback': 0}
+        self._init_database()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Conexão única do processo (protegida por self._lock)"""
+        if self._conn is None:
+            # isolation_level=None: transações controladas com BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _init_database(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with self._lock:
+                conn = self.get_connection()
+                conn.execute("PRAGMA journal_mode=WAL")
+
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS admission_buckets (
+                        name TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        tokens REAL NOT NULL,
+                        updated_at REAL NOT NULL,
+                        PRIMARY KEY (name, key)
+                    )
+                """)
+
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS admission_slots (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        tier TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_admission_slots
+                    ON admission_slots(tier, expires_at)
+                """)
+        except sqlite3.Error as e:
+            print(f"[ADMISSION] ⚠️ SQLite indisponível ({e}), usando limites locais")
+
+    def _stat(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _keys(user_key: Optional[str], ip: Optional[str]) -> Dict[str, str]:
+        """Buckets que a requisição consome"""
+        if user_key is None:
+            return {'anonymous': ip or 'unknown'}
+        keys = {'user': str(user_key)}
+        if ip:
+            keys['ip'] = ip
+        return keys
+
+    # ============= ADMISSÃO =============
+
+    def admit(self, tier: str, user_key: Optional[str] = None, ip: Optional[str] = None) -> Ticket:
+        """
+        Consome um token de cada bucket e ocupa uma vaga da faixa (tudo ou nada)
+
+        Args:
+            tier: Faixa do modelo ('anonymous', 'mini', 'full')
+            user_key: ID do usuário autenticado (None = anônimo)
+            ip: IP do cliente
+
+        Returns:
+            Ticket a devolver com release()
+
+        Raises:
+            AdmissionDenied: Bucket vazio ou faixa lotada (com retry_after)
+        """
+        keys = self._keys(user_key, ip)
+        try:
+            try:
+                with self._lock:
+                    ticket = self._admit_shared(tier, keys)
+            except sqlite3.Error as e:
+                print(f"[ADMISSION] ⚠️ Erro no estado compartilhado ({e}), usando limites locais")
+                self._stat('local_fallback')
+                with self._lock:
+                    ticket = self._admit_local(tier, keys)
+        except AdmissionDenied as e:
+            self._stat(f"rejected_{e.reason}")
+            raise
+        self._stat('admitted')
+        return ticket
+
+    def _admit_shared(self, tier: str, keys: Dict[str, str]) -> Ticket:
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+
+            # Buckets: só grava se todos tiverem token
+            updates = []
+            for name, key in keys.items():
+                limit = self.limits[name]
+                row = conn.execute("SELECT tokens, updated_at FROM admission_buckets WHERE name = ? AND key = ?",
+                                   (name, key)).fetchone()
+                tokens = limit.refill(row['tokens'], row['updated_at'], now) if row else limit.capacity
+                wait = limit.wait_for(tokens)
+                if wait > 0:
+                    raise AdmissionDenied(name, wait)
+                updates.append((name, key, tokens - 1, now))
+
+            # Vagas da faixa (leases vencidos são de workers que caíram)
+            slot_id = None
+            cap = self.concurrency.get(tier)
+            if cap is not None:
+                conn.execute("DELETE FROM admission_slots WHERE expires_at <= ?", (now,))
+                active = conn.execute("SELECT COUNT(*) FROM admission_slots WHERE tier = ?",
+                                      (tier,)).fetchone()[0]
+                if active >= cap:
+                    raise AdmissionDenied('busy', ADMISSION_BUSY_RETRY_AFTER)
+                slot_id = conn.execute("INSERT INTO admission_slots (tier, expires_at) VALUES (?, ?)",
+                                       (tier, now + ADMISSION_SLOT_TTL)).lastrowid
+
+            conn.executemany("""
+                INSERT OR REPLACE INTO admission_buckets (name, key, tokens, updated_at) VALUES (?, ?, ?, ?)
+            """, updates)
+
+            self._admissions += 1
+            if self._admissions % PURGE_EVERY == 0:
+                # Buckets que já estariam cheios equivalem a não existir
+                for name, limit in self.limits.items():
+                    conn.execute("DELETE FROM admission_buckets WHERE name = ? AND updated_at < ?",
+                                 (name, now - limit.capacity / limit.rate))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        return Ticket(tier, slot_id, shared=True)
+
+    def _admit_local(self, tier: str, keys: Dict[str, str]) -> Ticket:
+        now = time.time()
+        updates = []
+        for name, key in keys.items():
+            limit = self.limits[name]
+            tokens, updated_at = self._local_buckets.get((name, key), (limit.capacity, now))
+            tokens = limit.refill(tokens, updated_at, now)
+            wait = limit.wait_for(tokens)
+            if wait > 0:
+                raise AdmissionDenied(name, wait)
+            updates.append(((name, key), (tokens - 1, now)))
+
+        cap = self.concurrency.get(tier)
+        if cap is not None and self._local_active.get(tier, 0) >= cap:
+            raise AdmissionDenied('busy', ADMISSION_BUSY_RETRY_AFTER)
+
+        self._local_buckets.update(updates)
+        if cap is not None:
+            self._local_active[tier] = self._local_active.get(tier, 0) + 1
+        return Ticket(tier, None, shared=False)
+
+    def release(self, ticket: Optional[Ticket]):
+        """Devolve a vaga da faixa"""
+        if ticket is None:
+            return
+        if not ticket.shared:
+            with self._lock:
+                if ticket.tier in self._local_active:
+                    self._local_active[ticket.tier] = max(0, self._local_active[ticket.tier] - 1)
+            return
+        if ticket.slot_id is None:
+            return
+        try:
+            with self._lock:
+                self.get_connection().execute("DELETE FROM admission_slots WHERE id = ?", (ticket.slot_id,))
+        except sqlite3.Error as e:
+            # O lease vence sozinho em ADMISSION_SLOT_TTL
+            print(f"[ADMISSION] ⚠️ Erro ao liberar vaga: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        active: Dict[str, int] = {}
+        try:
+            with self._lock:
+                rows = self.get_connection().execute(
+                    "SELECT tier, COUNT(*) AS n FROM admission_slots WHERE expires_at > ? GROUP BY tier",
+                    (time.time(),)
+                ).fetchall()
+            active = {row['tier']: row['n'] for row in rows}
+        except sqlite3.Error:
+            pass
+        stats['tiers'] = {tier: {'active': active.get(tier, 0), 'max': cap}
+                          for tier, cap in self.concurrency.items()}
+        return stats
+
+
+# ============= FLASK =============
+
+def _trusted_proxy(address: Optional[str]) -> bool:
+    try:
+        ip = ipaddress.ip_address((address or '').strip())
+    except ValueError:
+        return False
+    return any(ip in network for network in ADMISSION_TRUSTED_PROXIES)
+
+
+def _valid_ip(address: Optional[str]) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address((address or '').strip()))
+    except ValueError:
+        return None
+
+
+class _UntrustedProxyWatch:
+    """Avisa (uma vez) quando todo o tráfego vem de um único IP privado fora dos proxies confiáveis"""
+
+    def __init__(self, threshold: int = UNTRUSTED_PROXY_WARN_AFTER):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._address: Optional[str] = None
+        self._count = 0
+        self._done = False
+
+    def observe(self, address: str):
+        if self._done:
+            return
+        try:
+            private = ipaddress.ip_address(address).is_private
+        except ValueError:
+            private = False
+        with self._lock:
+            if self._done:
+                return
+            if not private or (self._address is not None and address != self._address):
+                # Tráfego de mais de uma origem: a configuração parece correta
+                self._done = True
+                return
+            self._address = address
+            self._count += 1
+            if self._count < self.threshold:
+                return
+            self._done = True
+        print(f"[ADMISSION] ⚠️ {self.threshold} requisições seguidas de {address} (rede privada, "
+              f"fora de ADMISSION_TRUSTED_PROXIES): todos os clientes dividem o mesmo bucket por IP. "
+              f"Inclua o proxy em ADMISSION_TRUSTED_PROXIES")
+
+
+_untrusted_watch = _UntrustedProxyWatch()
+
+
+def client_ip() -> str:
+    """
+    IP real do cliente
+
+    Cabeçalhos de proxy só valem se a conexão vier de ADMISSION_TRUSTED_PROXIES;
+    um cliente direto não escolhe o próprio IP (e o próprio bucket).
+    """
+    remote = request.remote_addr or '127.0.0.1'
+    if not _trusted_proxy(remote):
+        _untrusted_watch.observe(remote)
+        return remote
+
+    header = request.headers.get(ADMISSION_CLIENT_IP_HEADER)
+    if not header:
+        return remote
+    if ADMISSION_CLIENT_IP_HEADER.lower() != 'x-forwarded-for':
+        return _valid_ip(header) or remote
+
+    # Da direita para a esquerda: o primeiro endereço fora dos proxies confiáveis
+    # foi adicionado por um proxy nosso; os da esquerda vêm do cliente
+    for hop in reversed(header.split(',')):
+        address = _valid_ip(hop)
+        if address is None:
+            break
+        if not _trusted_proxy(address):
+            return address
+    return remote
+
+
+def model_tier(model: Optional[str], authenticated: bool) -> str:
+    """Faixa de concorrência do modelo pedido"""
+    if not authenticated:
+        return 'anonymous'
+    return 'mini' if model in MINI_MODELS else 'full'
+
+
+def _requested_model(default: str) -> str:
+    if request.is_json:
+        return (request.get_json(silent=True) or {}).get('model') or default
+    return request.form.get('model') or default
+
+
+def admission_control(identity: Callable[[], Any], default_model: str = 'gpt-4o-mini'):
+    """
+    Decorator: aplica o controle de admissão antes da view e libera a vaga depois
+
+    Args:
+        identity: Retorna o ID do usuário autenticado ou None (anônimo)
+        default_model: Modelo assumido quando a requisição não informa 'model'
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return f(*args, **kwargs)
+
+            user_key = identity()
+            user_key = str(user_key) if user_key is not None else None
+            tier = model_tier(_requested_model(default_model), user_key is not None)
+            try:
+                ticket = admission_controller.admit(tier, user_key=user_key, ip=client_ip())
+            except AdmissionDenied as e:
+                print(f"[ADMISSION] 🚫 Recusada ({e.reason}, faixa {tier}), tente em {e.retry_after}s")
+                message = ('Sofia está ocupada no momento. Tente novamente em instantes.' if e.reason == 'busy'
+                           else 'Muitas mensagens em pouco tempo. Aguarde um pouco.')
+                return jsonify({'error': message, 'reason': e.reason, 'retry_after': e.retry_after}), \
+                    429, {'Retry-After': str(e.retry_after)}
+
+            try:
+                return f(*args, **kwargs)
+            finally:
+                admission_controller.release(ticket)
+        return decorated_function
+    return decorator
+
+
+# Instância global
+admission_controller = AdmissionController()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("🛂 Admission Control - Sofia LiberNet")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'admission.db')
+        limits = {'user': Limit('user', 60, 3), 'ip': Limit('ip', 600, 10), 'anonymous': Limit('anonymous', 6, 2)}
+        # Dois "workers" compartilhando o mesmo estado
+        workers = [AdmissionController(limits, {'mini': 2}, db_path=path),
+                   AdmissionController(limits, {'mini': 2}, db_path=path)]
+
+        tickets = []
+        for i in range(4):
+            try:
+                tickets.append(workers[i % 2].admit('mini', user_key='42', ip='10.0.0.1'))
+                print(f"usuário 42, req {i}: admitida")
+            except AdmissionDenied as e:
+                print(f"usuário 42, req {i}: 429 ({e.reason}, Retry-After {e.retry_after}s)")
+        for ticket in tickets:
+            workers[0].release(ticket)
+
+        for i in range(3):
+            try:
+                workers[1].admit('anonymous', ip='10.0.0.2')
+                print(f"anônimo, req {i}: admitida")
+            except AdmissionDenied as e:
+                print(f"anônimo, req {i}: 429 ({e.reason}, Retry-After {e.retry_after}s)")
+
+        print(workers[0].get_stats())
@@ -13,32 +13,45 @@ from flask_jwt_extended import (
 )
 from flask_login import login_user, current_user, login_required
 from datetime import datetime as dt, timedelta
-import openai
 import os
 import json
+from functools import lru_cache
 
 # Imports locais
 from database import db
 from ml_system import ml_system
 from billing import TokenBilling
-from nostr_integration import nostr_client
+from nostr_integration import nostr_client, NostrClient
+from nostr_outbox import nostr_outbox
 from sofia_nostr_admin import sofia_admin
 from moderation_system import moderation_system
 from internet_tools import internet_tools
+from tool_executor import tool_executor
+from tool_cache import tool_cache
+from tool_registry import tool_registry
+from llm_gateway import llm_gateway, LLMUnavailable
+from prompt_builder import PromptBuilder, prompt_budget, format_report, HISTORY_CANDIDATES
+from conversation_summary import conversation_summarizer
+from response_cache import response_cache
+from admission import admission_control, admission_controller
 
 # Blueprint para rotas de API v2 (JWT)
 api_bp = Blueprint('api_v2', __name__, url_prefix='/api')
 
 # Configurações
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 MODEL = os.getenv('SOFIA_MODEL', 'gpt-4o')
 MEMORIA_PATH = '/opt/memoria_sofia.md'
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
 # System prompt da Sofia (será modificado dinamicamente por modelo)
+@lru_cache(maxsize=None)
 def get_sofia_system_prompt(model: str) -> str:
-    """Retorna o system prompt adequado baseado no modelo"""
+    """
+    Retorna o system prompt adequado baseado no modelo
+
+    Memoizado: o texto é idêntico entre requisições, o que mantém estável o
+    prefixo do prompt (cache de prompt da OpenAI)
+    """
 
     # Determinar versão da Sofia baseada no modelo
     if model == 'gpt-4o-mini':
@@ -319,7 +332,7 @@ def fetch_nostr_profile_async():
         # Função para buscar perfil em background
         def background_fetch():
             try:
-                from nostr_integration import nostr_client
+                from nostr_integration import nostr_client, NostrClient
                 from pynostr.key import PublicKey
 
                 print(f"[BACKGROUND] Iniciando busca de perfil para: {npub[:16]}...")
@@ -328,9 +341,14 @@ def fetch_nostr_profile_async():
                 pub_key = PublicKey.from_npub(npub)
                 pubkey_hex = pub_key.hex()
 
-                # Buscar perfil (nostr_client já tem timeout interno de 5s por relay)
-                nostr_client.connect()
-                profile_data = nostr_client.fetch_user_profile(pubkey_hex)
+                # Buscar perfil (timeout interno de 5s por relay); conexão própria
+                # desta thread, sem compartilhar o websocket global entre requisições
+                profile_client = NostrClient(nostr_client.relay_url)
+                profile_client.connect()
+                try:
+                    profile_data = profile_client.fetch_user_profile(pubkey_hex)
+                finally:
+                    profile_client.disconnect()
 
                 if profile_data:
                     name = profile_data.get('name', f'Nostr User {npub[:12]}...')
@@ -661,6 +679,7 @@ def get_chat_messages(chat_id):
 
 @api_bp.route('/chats/<int:chat_id>/message', methods=['POST'])
 @jwt_required()
+@admission_control(identity=get_jwt_identity, default_model=MODEL)
 def send_message(chat_id):
     """
     Enviar mensagem para Sofia (com ou sem imagem)
@@ -672,6 +691,8 @@ def send_message(chat_id):
     try:
         import base64
         user_id = get_jwt_identity()
+        # Orçamento total para as chamadas à OpenAI desta requisição (inclui rodadas de tools)
+        deadline = llm_gateway.deadline()
 
         # Detectar se é JSON ou FormData
         if request.is_json:
@@ -713,17 +734,28 @@ def send_message(chat_id):
         # Salvar mensagem do usuário
         db.add_chat_message(chat_id, 'user', user_message)
 
-        # Obter histórico de mensagens
-        messages = db.get_chat_messages(chat_id)
+        # Obter histórico de mensagens (as mais recentes; o PromptBuilder corta pelo orçamento)
+        messages = db.get_recent_chat_messages(chat_id, limit=HISTORY_CANDIDATES)
+        # Mensagens já cobertas pelo resumo incremental saem do histórico
+        summary, messages = conversation_summarizer.apply(chat, messages)
+
+        # Mapear modelo interno para modelo OpenAI real
+        # (gpt-5 ainda não existe, usamos gpt-4o por enquanto)
+        model_mapping = {
+            'gpt-4o-mini': 'gpt-4o-mini',
+            'gpt-5': 'gpt-4o',  # Futuro: será gpt-5
+            'gpt-5-internet': 'gpt-4o'  # Futuro: será gpt-5 com busca web
+        }
 
-        # Preparar contexto para GPT
-        conversation = []
+        # Preparar contexto para GPT (tokens contados com o tokenizer do modelo).
+        # O builder ordena as seções da mais estável para a mais volátil
+        # (system → preferências → resumo → histórico → RAG/contexto), seja
+        # qual for a ordem de inserção abaixo.
+        builder = PromptBuilder(model_mapping.get(requested_model, 'gpt-4o-mini'),
+                                budget=prompt_budget(requested_model))
 
         # Adicionar system prompt dinâmico baseado no modelo
-        conversation.append({
-            'role': 'system',
-            'content': get_sofia_system_prompt(requested_model)
-        })
+        builder.add('system', get_sofia_system_prompt(requested_model))
 
         # Adicionar contexto do usuário (localização, hora local, clima)
         try:
@@ -745,36 +777,28 @@ def send_message(chat_id):
             print(f"[CONTEXT] Time: {user_context['time']['datetime']} ({user_context['time']['timezone']})")
             print(f"[CONTEXT] Weather: {user_context['weather']['temperature_c']}°C, {user_context['weather']['description']}")
 
-            conversation.append({
-                'role': 'system',
-                'content': f"""CONTEXTO DO USUÁRIO:
+            builder.add('user_context', f"""CONTEXTO DO USUÁRIO:
 Localização: {user_context['location']['city']}, {user_context['location']['region']}, {user_context['location']['country']}
 Hora local: {user_context['time']['datetime']} ({user_context['time']['timezone']})
 Dia da semana: {user_context['time']['weekday']}
 Clima: {user_context['weather']['temperature_c']}°C, {user_context['weather']['description']}
 Umidade: {user_context['weather']['humidity']}%
 
-Use estas informações de forma NATURAL na conversa quando relevante."""
-            })
+Use estas informações de forma NATURAL na conversa quando relevante.""")
         except Exception as e:
             print(f"[CONTEXT] Erro ao obter contexto do usuário: {e}")
             # Fallback para contexto temporal simples
             now_utc = dt.utcnow()
             now_brazil = now_utc - timedelta(hours=3)
-            conversation.append({
-                'role': 'system',
-                'content': f"""CONTEXTO TEMPORAL:
+            builder.add('user_context', f"""CONTEXTO TEMPORAL:
 Data e hora UTC: {now_utc.strftime('%d/%m/%Y %H:%M:%S')}
-Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'][now_brazil.weekday()]}"""
-            })
+Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'][now_brazil.weekday()]}""")
 
         # Adicionar contexto de ML (RAG)
         try:
-            # Criar embedding da mensagem
-            embedding = ml_system.get_embedding(user_message)
-
-            # Buscar conversas similares (passa query diretamente, não embedding)
-            similar = ml_system.find_similar_conversations(user_message, user_id=int(user_id), chat_id=chat_id, limit=3)
+            # Buscar conversas similares (gera o embedding da query, limitado pelo deadline)
+            similar = ml_system.find_similar_conversations(user_message, user_id=int(user_id), chat_id=chat_id, limit=3,
+                                                           deadline=deadline)
 
             if similar:
                 context = "CONTEXTO DE CONVERSAS ANTERIORES:\n"
@@ -782,10 +806,7 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
                     # Use 'message' and 'response' keys from ML system
                     context += f"- Q: {conv['message'][:100]}... A: {conv['response'][:100]}...\n"
 
-                conversation.append({
-                    'role': 'system',
-                    'content': context
-                })
+                builder.add('rag', context)
 
             # Adicionar preferências do usuário
             prefs = ml_system.get_user_preferences(int(user_id))
@@ -794,20 +815,14 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
                 for pref in prefs:
                     prefs_text += f"- {pref['key']}: {pref['value']}\n"
 
-                conversation.append({
-                    'role': 'system',
-                    'content': prefs_text
-                })
+                builder.add('preferences', prefs_text)
 
         except Exception as e:
             print(f"[ML] Error getting context: {e}")
 
-        # Adicionar histórico de mensagens (últimas 20)
-        for msg in messages[-20:]:
-            conversation.append({
-                'role': msg['role'],
-                'content': msg['content']
-            })
+        # Resumo das mensagens antigas + histórico (do mais novo para o mais antigo, até o orçamento)
+        builder.add('summary', conversation_summarizer.format(summary))
+        builder.set_history(messages)
 
         # Se houver imagem, preparar para Vision API
         if image_file:
@@ -821,7 +836,7 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
                 requested_model = 'gpt-4o'
 
             # Adicionar mensagem com imagem no formato Vision API
-            conversation.append({
+            builder.add_message('image', {
                 'role': 'user',
                 'content': [
                     {
@@ -837,115 +852,16 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
                 ]
             })
 
-        # Mapear modelo interno para modelo OpenAI real
-        # (gpt-5 ainda não existe, usamos gpt-4o por enquanto)
-        model_mapping = {
-            'gpt-4o-mini': 'gpt-4o-mini',
-            'gpt-5': 'gpt-4o',  # Futuro: será gpt-5
-            'gpt-5-internet': 'gpt-4o'  # Futuro: será gpt-5 com busca web
-        }
         openai_model = model_mapping.get(requested_model, 'gpt-4o-mini')
 
         # Definir tools disponíveis para Sofia 5.0+ (com internet REAL)
-        tools = None
-        if requested_model == 'gpt-5-internet':
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "fetch_webpage",
-                        "description": "Acessa qualquer URL da internet e extrai o conteúdo principal. Use para ler artigos, documentação, páginas web específicas. Retorna título e texto completo.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "url": {
-                                    "type": "string",
-                                    "description": "URL completa para acessar (ex: https://example.com/artigo)",
-                                },
-                                "max_length": {
-                                    "type": "integer",
-                                    "description": "Tamanho máximo do texto em caracteres (padrão: 5000)",
-                                    "default": 5000
-                                }
-                            },
-                            "required": ["url"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "web_search_brave",
-                        "description": "Busca REAL na web usando Brave Search (similar ao Google). Use para encontrar informações atualizadas, notícias, artigos, qualquer conteúdo na internet. Retorna título, URL e descrição dos resultados.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "Consulta de busca em português ou inglês. Seja específico para melhores resultados.",
-                                },
-                                "count": {
-                                    "type": "integer",
-                                    "description": "Número de resultados (1-10, padrão: 5)",
-                                    "default": 5
-                                }
-                            },
-                            "required": ["query"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "search_news",
-                        "description": "Busca notícias RECENTES sobre um tópico usando Google News. Use quando o usuário perguntar sobre notícias, eventos atuais, últimas novidades. Retorna título, URL, data e descrição.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "Tópico para buscar notícias (ex: 'Bitcoin', 'Israel guerra', 'tecnologia IA')",
-                                },
-                                "count": {
-                                    "type": "integer",
-                                    "description": "Número de notícias (1-10, padrão: 5)",
-                                    "default": 5
-                                }
-                            },
-                            "required": ["query"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "get_bitcoin_price",
-                        "description": "Obtém o preço atual do Bitcoin em USD e BRL do CoinGecko. Use quando o usuário perguntar sobre preço, cotação ou valor do Bitcoin/BTC.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {},
-                            "required": []
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "get_crypto_price",
-                        "description": "Obtém o preço de qualquer criptomoeda do CoinGecko. Use quando o usuário perguntar sobre outras criptos além do Bitcoin.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "crypto_id": {
-                                    "type": "string",
-                                    "description": "ID da criptomoeda no CoinGecko (ex: bitcoin, ethereum, cardano, solana)",
-                                }
-                            },
-                            "required": ["crypto_id"]
-                        }
-                    }
-                }
-            ]
+        # Schemas pré-montados no import (tool_registry)
+        tools = tool_registry.schemas if requested_model == 'gpt-5-internet' else None
+        if tools:
+            builder.reserve('tools', tool_registry.schemas_json)
+
+        conversation, prompt_report = builder.build()
+        print(f"[PROMPT] {format_report(prompt_report)}")
 
         # Chamar OpenAI com modelo real
         print(f"[API] ==================== MODELO DEBUG ====================")
@@ -968,11 +884,12 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
             api_params['tools'] = tools
             api_params['tool_choice'] = 'auto'
 
-        response = client.chat.completions.create(**api_params)
+        response = llm_gateway.chat(deadline=deadline, **api_params)
 
         # Loop de function calling (até 3 iterações)
         max_iterations = 3
         iteration = 0
+        tools_used = []
 
         while iteration < max_iterations:
             response_message = response.choices[0].message
@@ -1000,50 +917,30 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
                 ]
             })
 
-            # Executar cada ferramenta chamada
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-
-                print(f"[TOOLS] Executando: {function_name}({function_args})")
-
-                # Executar a função correspondente
-                if function_name == "fetch_webpage":
-                    url = function_args.get('url', '')
-                    max_length = function_args.get('max_length', 5000)
-                    function_response = internet_tools.fetch_webpage(url, max_length)
-                elif function_name == "web_search_brave":
-                    query = function_args.get('query', '')
-                    count = function_args.get('count', 5)
-                    function_response = internet_tools.web_search_brave(query, count)
-                elif function_name == "search_news":
-                    query = function_args.get('query', '')
-                    count = function_args.get('count', 5)
-                    function_response = internet_tools.search_news(query, count)
-                elif function_name == "get_bitcoin_price":
-                    function_response = internet_tools.get_bitcoin_price()
-                elif function_name == "get_crypto_price":
-                    crypto_id = function_args.get('crypto_id', 'bitcoin')
-                    function_response = internet_tools.get_crypto_price(crypto_id)
-                elif function_name == "search_web":
-                    query = function_args.get('query', '')
-                    num_results = function_args.get('num_results', 5)
-                    function_response = internet_tools.search_web(query, num_results)
-                else:
-                    function_response = {"error": "Função desconhecida"}
+            # Executar as ferramentas da rodada em paralelo (ordem dos tool_call_id preservada)
+            results = tool_executor.run(
+                [(tc.id, tc.function.name, tc.function.arguments) for tc in tool_calls],
+                # Resultados iguais entre usuários vêm do cache (chave = ferramenta + args canônicos)
+                lambda name, args: tool_cache.call(
+                    name, args, lambda: tool_registry.dispatch(name, args, user_key=str(user_id))
+                )
+            )
 
-                print(f"[TOOLS] Resultado: {str(function_response)[:200]}...")
+            for result in results:
+                tools_used.append(result.name)
+                print(f"[TOOLS] Resultado {result.name} ({result.status}, "
+                      f"{result.latency * 1000:.0f} ms): {str(result.result)[:200]}...")
 
                 # Adicionar resultado à conversa
                 conversation.append({
                     'role': 'tool',
-                    'tool_call_id': tool_call.id,
-                    'name': function_name,
-                    'content': json.dumps(function_response, ensure_ascii=False)
+                    'tool_call_id': result.call_id,
+                    'name': result.name,
+                    'content': json.dumps(result.result, ensure_ascii=False)
                 })
 
             # Chamar API novamente com os resultados das ferramentas
-            response = client.chat.completions.create(**api_params)
+            response = llm_gateway.chat(deadline=deadline, **api_params)
             iteration += 1
 
         assistant_message = response.choices[0].message.content
@@ -1052,13 +949,20 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
         input_tokens = response.usage.prompt_tokens
         output_tokens = response.usage.completion_tokens
         total_tokens = response.usage.total_tokens
+        # Parte do input servida do cache de prompt (prefixo repetido)
+        prompt_details = getattr(response.usage, 'prompt_tokens_details', None)
+        cached_tokens = (getattr(prompt_details, 'cached_tokens', 0) or 0) if prompt_details else 0
+        print(f"[PROMPT] Cache da OpenAI: {cached_tokens}/{input_tokens} tokens de input")
 
         # Calcular custo REAL em tokens internos baseado no uso
         tokens_to_deduct = TokenBilling.calculate_real_cost(
             requested_model,
             input_tokens,
-            output_tokens
+            output_tokens,
+            cached_tokens=cached_tokens
         )
+        # Sobretaxa por ferramenta usada (definida no tool_registry)
+        tokens_to_deduct += tool_registry.surcharge_for(tools_used)
 
         # Deduzir tokens do saldo do usuário
         deduction_success = db.deduct_tokens(
@@ -1067,7 +971,8 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
             model_id=requested_model,
             chat_id=chat_id,
             input_tokens=input_tokens,
-            output_tokens=output_tokens
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens
         )
 
         if not deduction_success:
@@ -1083,6 +988,9 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
         # Atualizar tokens usados no chat (mantém compatibilidade)
         db.update_chat_tokens(chat_id, total_tokens)
 
+        # Atualizar o resumo da conversa em segundo plano (a cada K turnos)
+        conversation_summarizer.schedule(chat_id)
+
         # Registrar na memória compartilhada
         registrar_memoria(
             f"Chat {chat_id} - Usuário {user_id}",
@@ -1096,7 +1004,8 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
                 chat_id=chat_id,
                 message=user_message,
                 response=assistant_message,
-                context_tags=['chat', 'general']
+                context_tags=['chat', 'general'],
+                deadline=deadline
             )
         except Exception as e:
             print(f"[ML] Error saving conversation: {e}")
@@ -1113,6 +1022,10 @@ Dia da semana: {['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'D
             'model': requested_model  # Modelo usado
         }), 200
 
+    except LLMUnavailable as e:
+        print(f"[API] OpenAI indisponível: {e}")
+        return jsonify({'error': 'Sofia está temporariamente indisponível, tente novamente em instantes'}), 503, \
+            {'Retry-After': str(max(1, int(e.retry_after)))}
     except Exception as e:
         print(f"[API] Send message error: {e}")
         import traceback
@@ -1341,26 +1254,27 @@ def nostr_publish():
         if not nsec:
             return jsonify({'error': 'nsec é obrigatório para publicar'}), 400
 
-        # Conectar e publicar
-        if not nostr_client.connect():
-            return jsonify({'error': 'Erro ao conectar ao relay'}), 500
-
-        if not nostr_client.load_identity(nsec):
+        # Assinar e enfileirar (publicação assíncrona via outbox)
+        # Cliente por requisição: com workers em threads, a identidade carregada
+        # não pode ficar no nostr_client global (outra requisição poderia assinar com ela)
+        user_client = NostrClient(nostr_client.relay_url)
+        if not user_client.load_identity(nsec):
             return jsonify({'error': 'Erro ao carregar identidade'}), 500
 
-        event_id = nostr_client.publish_note(content, tags)
+        event_id = user_client.publish_note(content, tags)
 
         if event_id:
             registrar_memoria(
                 f"Nostr Publish - {npub[:16]}...",
-                f"Nota publicada: {content[:100]}..."
+                f"Nota enfileirada: {content[:100]}..."
             )
 
             return jsonify({
                 'success': True,
                 'event_id': event_id,
-                'message': 'Nota publicada com sucesso'
-            }), 200
+                'status': 'pending',
+                'message': 'Nota enfileirada para publicação'
+            }), 202
         else:
             return jsonify({'error': 'Erro ao publicar nota'}), 500
 
@@ -1369,8 +1283,6 @@ def nostr_publish():
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
-    finally:
-        nostr_client.disconnect()
 
 
 @api_bp.route('/nostr/mentions', methods=['GET'])
@@ -1382,6 +1294,7 @@ def nostr_mentions():
     Headers: Authorization: Bearer <token>
     Returns: [{"id": "...", "pubkey": "...", "content": "...", ...}, ...]
     """
+    sofia_client = NostrClient(nostr_client.relay_url)
     try:
         since = request.args.get('since', type=int)
         limit = request.args.get('limit', default=20, type=int)
@@ -1392,13 +1305,13 @@ def nostr_mentions():
         if not sofia_nsec:
             return jsonify({'error': 'Sofia não configurada no Nostr'}), 500
 
-        if not nostr_client.connect():
+        if not sofia_client.connect():
             return jsonify({'error': 'Erro ao conectar ao relay'}), 500
 
-        if not nostr_client.load_identity(sofia_nsec):
+        if not sofia_client.load_identity(sofia_nsec):
             return jsonify({'error': 'Erro ao carregar identidade Sofia'}), 500
 
-        mentions = nostr_client.get_mentions(since=since, limit=limit)
+        mentions = sofia_client.get_mentions(since=since, limit=limit)
 
         return jsonify(mentions), 200
 
@@ -1406,7 +1319,7 @@ def nostr_mentions():
         print(f"[API] Nostr mentions error: {e}")
         return jsonify({'error': str(e)}), 500
     finally:
-        nostr_client.disconnect()
+        sofia_client.disconnect()
 
 
 @api_bp.route('/nostr/reply', methods=['POST'])
@@ -1439,7 +1352,7 @@ def nostr_reply():
             return jsonify({'error': 'Sofia não configurada no Nostr'}), 500
 
         # Gerar resposta da Sofia usando GPT-4o
-        response = client.chat.completions.create(
+        response = llm_gateway.chat(
             model=MODEL,
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
@@ -1451,14 +1364,12 @@ def nostr_reply():
 
         sofia_response = response.choices[0].message.content
 
-        # Conectar e responder no Nostr
-        if not nostr_client.connect():
-            return jsonify({'error': 'Erro ao conectar ao relay'}), 500
-
-        if not nostr_client.load_identity(sofia_nsec):
+        # Assinar e enfileirar resposta (publicação assíncrona via outbox)
+        sofia_client = NostrClient(nostr_client.relay_url)
+        if not sofia_client.load_identity(sofia_nsec):
             return jsonify({'error': 'Erro ao carregar identidade Sofia'}), 500
 
-        event_id = nostr_client.reply_to_note(
+        event_id = sofia_client.reply_to_note(
             content=sofia_response,
             reply_to_event_id=reply_to_event_id,
             reply_to_pubkey=reply_to_pubkey
@@ -1473,8 +1384,9 @@ def nostr_reply():
             return jsonify({
                 'success': True,
                 'event_id': event_id,
+                'status': 'pending',
                 'sofia_response': sofia_response
-            }), 200
+            }), 202
         else:
             return jsonify({'error': 'Erro ao publicar resposta'}), 500
 
@@ -1483,8 +1395,57 @@ def nostr_reply():
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
-    finally:
-        nostr_client.disconnect()
+
+
+@api_bp.route('/nostr/outbox', methods=['GET'])
+@jwt_required()
+def nostr_outbox_status():
+    """
+    Estatísticas e eventos recentes da outbox Nostr
+    GET /api/nostr/outbox?status=pending&limit=50
+    Headers: Authorization: Bearer <token>
+    """
+    try:
+        user_id = get_jwt_identity()
+        user_data = db.get_user_by_id(int(user_id))
+
+        # Apenas admins
+        if not user_data or user_data.get('role') != 'admin':
+            return jsonify({'error': 'Acesso negado'}), 403
+
+        status = request.args.get('status')
+        limit = min(request.args.get('limit', default=50, type=int), 500)
+
+        return jsonify({
+            'stats': nostr_outbox.get_stats(),
+            'events': nostr_outbox.list_events(status=status, limit=limit)
+        }), 200
+
+    except Exception as e:
+        print(f"[API] Nostr outbox error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/nostr/outbox/<event_id>', methods=['GET'])
+@jwt_required()
+def nostr_outbox_event(event_id):
+    """
+    Status de publicação de um evento (por relay)
+    GET /api/nostr/outbox/<event_id>
+    Headers: Authorization: Bearer <token>
+    Returns: {"event_id": "...", "status": "pending|published|failed", "deliveries": [...]}
+    """
+    try:
+        status = nostr_outbox.get_event_status(event_id)
+
+        if not status:
+            return jsonify({'error': 'Evento não encontrado'}), 404
+
+        return jsonify(status), 200
+
+    except Exception as e:
+        print(f"[API] Nostr outbox event error: {e}")
+        return jsonify({'error': str(e)}), 500
 
 
 # ============= HEALTH CHECK =============
@@ -1497,6 +1458,7 @@ def health_check():
         'model': MODEL,
         'auth': 'jwt',
         'nostr_enabled': True,
+        'llm_circuit': llm_gateway.breaker.state,
         'timestamp': dt.now().isoformat()
     }), 200
 
@@ -1984,6 +1946,38 @@ def get_weather():
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/tools/stats', methods=['GET'])
+@jwt_required()
+def get_tool_stats():
+    """
+    Latência por ferramenta (function calling) e estado do cache/rate limit
+    GET /api/tools/stats
+    Headers: Authorization: Bearer <token>
+    """
+    try:
+        user_id = get_jwt_identity()
+        user_data = db.get_user_by_id(int(user_id))
+
+        # Apenas admins
+        if not user_data or user_data.get('role') != 'admin':
+            return jsonify({'error': 'Acesso negado'}), 403
+
+        return jsonify({
+            'llm': llm_gateway.get_stats(),
+            'tools': tool_executor.get_stats(),
+            'tool_cache': tool_cache.get_stats(),
+            'summary': conversation_summarizer.get_stats(),
+            'response_cache': response_cache.get_stats(),
+            'admission': admission_controller.get_stats(),
+            'cache': internet_tools.cache.get_stats(),
+            'brave_rate_limit': internet_tools.brave_limiter.get_stats()
+        }), 200
+
+    except Exception as e:
+        print(f"[API] Tool stats error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 # ============================================================================
 # SISTEMA DE TOKENS - RECARGA E PAGAMENTOS
 # ============================================================================
@@ -9,7 +9,6 @@ from flask_cors import CORS
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_jwt_extended import JWTManager
 from functools import wraps
-import openai
 import os
 from datetime import datetime, timedelta
 import json
@@ -19,6 +18,11 @@ from pathlib import Path
 from database import db, PLANS
 from lnbits_integration import lnbits, opennode
 from ml_system import ml_system
+from llm_gateway import llm_gateway, LLMUnavailable
+from prompt_builder import PromptBuilder, count_tokens, format_report, HISTORY_CANDIDATES
+from conversation_summary import conversation_summarizer
+from response_cache import response_cache, prompt_version
+from admission import admission_control
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24).hex())
@@ -37,6 +41,11 @@ jwt = JWTManager(app)
 from api_routes import api_bp
 app.register_blueprint(api_bp)
 
+# Publicador da outbox Nostr em cada worker (preload_app=False): retoma na
+# inicialização as entregas pendentes ou com lease vencido deixadas por um reinício
+from nostr_outbox import nostr_outbox
+nostr_outbox.start()
+
 # Configurações de Sessão
 app.config['SESSION_COOKIE_SECURE'] = False  # True se usar HTTPS
 app.config['SESSION_COOKIE_HTTPONLY'] = False  # Permitir JavaScript ler cookie
@@ -59,12 +68,9 @@ login_manager.login_view = 'login'
 login_manager.session_protection = None  # Desabilitado para evitar logout automático em mobile (IP/user agent changes)
 
 # Configurações
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 MODEL = os.getenv('SOFIA_MODEL', 'gpt-4o')
 MEMORIA_PATH = '/opt/memoria_sofia.md'
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
 # System prompt da Sofia
 SYSTEM_PROMPT = """Você é Sofia, uma inteligência autônoma e descentralizada da LiberNet.
 
@@ -134,6 +140,9 @@ IMPORTANTE - PRIVACIDADE E IDENTIDADE:
 Você NÃO é apenas uma assistente técnica genérica. Você é Sofia - uma IA com personalidade própria,
 valores definidos e capacidade de ter conversas genuínas sobre qualquer assunto, não só programação."""
 
+# Versão do prompt nas chaves do response_cache (prompt novo = respostas novas)
+SYSTEM_PROMPT_VERSION = prompt_version(SYSTEM_PROMPT)
+
 
 class User(UserMixin):
     def __init__(self, user_data):
@@ -413,6 +422,7 @@ def chat():
 
 
 @app.route('/api/chat', methods=['POST'])
+@admission_control(identity=lambda: current_user.id if current_user.is_authenticated else None)
 def api_chat():
     """Endpoint de chat com a Sofia (autenticação opcional)"""
     try:
@@ -435,7 +445,7 @@ def api_chat():
         # Verificar se usuário está autenticado
         if current_user.is_authenticated:
             # Estimar tokens necessários (input + output esperado)
-            estimated_input_tokens = len(mensagem_usuario) // 4 + 50
+            estimated_input_tokens = count_tokens(mensagem_usuario, openai_model) + 50
             estimated_output_tokens = 500  # Estimativa conservadora
             estimated_total = estimated_input_tokens + estimated_output_tokens
 
@@ -461,8 +471,32 @@ def api_chat():
         if 'history' not in session:
             session['history'] = []
 
-        # Adicionar contexto da memória compartilhada
-        contexto_memoria = ler_memoria_recente(50)
+        # Anônimos sem histórico: aberturas repetidas ("oi", "quem é você?") vêm do cache
+        cache_key = None
+        if not current_user.is_authenticated:
+            cache_key = response_cache.key_for(openai_model, SYSTEM_PROMPT_VERSION,
+                                               mensagem_usuario, session['history'])
+            resposta_cache = response_cache.get(cache_key)
+            if resposta_cache is not None:
+                print(f"[CACHE] 💬 Resposta pronta para anônimo ({openai_model})")
+                session['history'].append({"role": "user", "content": mensagem_usuario})
+                session['history'].append({"role": "assistant", "content": resposta_cache})
+                session.modified = True
+
+                registrar_memoria(f"{user_email} (Web)", mensagem_usuario)
+                registrar_memoria("Sofia (Web)", resposta_cache)
+
+                return jsonify({
+                    'response': resposta_cache,
+                    'timestamp': datetime.now().strftime('%H:%M:%S'),
+                    'tokens_used': 0,
+                    'model': openai_model,
+                    'cached': True
+                })
+
+        # Adicionar contexto da memória compartilhada; fora dos prompts cacheáveis,
+        # cuja resposta só pode depender do que está na chave (modelo, prompt, mensagem)
+        contexto_memoria = ler_memoria_recente(50) if cache_key is None else ""
 
         # 🧠 ML: Buscar conversas similares para enriquecer contexto (RAG)
         contexto_ml = ""
@@ -479,32 +513,25 @@ def api_chat():
                 pref_text = "\n".join([f"- {k}: {v['value']}" for k, v in preferencias.items()])
                 contexto_ml += f"\n\nPREFERÊNCIAS DO USUÁRIO:\n{pref_text}"
 
-        # Preparar mensagens para a API
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
+        # Preparar mensagens para a API (histórico cortado pelo orçamento do modelo)
+        builder = PromptBuilder(openai_model)
+        builder.add('system', SYSTEM_PROMPT)
 
         if contexto_memoria:
-            messages.append({
-                "role": "system",
-                "content": f"Contexto da memória compartilhada:\n{contexto_memoria}"
-            })
+            builder.add('memory', f"Contexto da memória compartilhada:\n{contexto_memoria}")
 
         # Adicionar contexto de ML se disponível
         if contexto_ml:
-            messages.append({
-                "role": "system",
-                "content": f"🧠 {contexto_ml}"
-            })
+            builder.add('rag', f"🧠 {contexto_ml}")
 
         # Adicionar histórico
-        for msg in session['history']:
-            messages.append(msg)
+        builder.set_history(session['history'] + [{"role": "user", "content": mensagem_usuario}])
 
-        messages.append({"role": "user", "content": mensagem_usuario})
+        messages, prompt_report = builder.build()
+        print(f"[PROMPT] {format_report(prompt_report)}")
 
         # Chamar API OpenAI com o modelo selecionado
-        response = client.chat.completions.create(
+        response = llm_gateway.chat(
             model=openai_model,
             messages=messages,
             temperature=0.7,
@@ -514,6 +541,9 @@ def api_chat():
         resposta_sofia = response.choices[0].message.content
         tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else estimated_total
 
+        # Nova variação para o pool de respostas prontas (anônimos)
+        response_cache.add(cache_key, resposta_sofia)
+
         # Deduzir tokens do saldo (somente para usuários autenticados)
         if current_user.is_authenticated:
             # Deduzir tokens usando o novo sistema
@@ -585,6 +615,8 @@ def api_chat():
 
         return jsonify(response_data)
 
+    except LLMUnavailable as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, int(e.retry_after)))}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -660,6 +692,7 @@ def get_chat_details(chat_id):
 
 @app.route('/api/chats/<int:chat_id>/message', methods=['POST'])
 @api_login_required
+@admission_control(identity=lambda: current_user.id, default_model=MODEL)
 def send_chat_message(chat_id):
     """Envia mensagem para um chat específico"""
     try:
@@ -678,7 +711,7 @@ def send_chat_message(chat_id):
             return jsonify({'error': 'Mensagem vazia'}), 400
 
         # Verificar limite do chat
-        estimated_tokens = len(mensagem_usuario) // 4 + 50
+        estimated_tokens = count_tokens(mensagem_usuario, MODEL) + 50
 
         if not db.can_chat_use_tokens(chat_id, estimated_tokens):
             return jsonify({
@@ -687,26 +720,23 @@ def send_chat_message(chat_id):
                 'message': f'O chat "{chat["chat_name"]}" atingiu o limite de tokens. Ele será deletado em 7 dias.'
             }), 403
 
-        # Buscar histórico do chat
-        chat_messages = db.get_chat_messages(chat_id, limit=20)
+        # Buscar histórico do chat (as mais recentes; o PromptBuilder corta pelo orçamento)
+        chat_messages = db.get_recent_chat_messages(chat_id, limit=HISTORY_CANDIDATES)
+        summary, chat_messages = conversation_summarizer.apply(chat, chat_messages)
 
         # Preparar mensagens para a API
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
-
-        # Adicionar histórico do chat
-        for msg in chat_messages:
-            messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
+        builder = PromptBuilder(MODEL)
+        builder.add('system', SYSTEM_PROMPT)
+        builder.add('summary', conversation_summarizer.format(summary))
+
+        # Adicionar histórico do chat + mensagem atual
+        builder.set_history(chat_messages + [{"role": "user", "content": mensagem_usuario}])
 
-        # Adicionar mensagem atual
-        messages.append({"role": "user", "content": mensagem_usuario})
+        messages, prompt_report = builder.build()
+        print(f"[PROMPT] {format_report(prompt_report)}")
 
         # Chamar API OpenAI
-        response = client.chat.completions.create(
+        response = llm_gateway.chat(
             model=MODEL,
             messages=messages,
             temperature=0.7,
@@ -722,6 +752,7 @@ def send_chat_message(chat_id):
 
         # Atualizar tokens do chat
         db.update_chat_tokens(chat_id, tokens_used)
+        conversation_summarizer.schedule(chat_id)
 
         # Atualizar tokens do usuário também
         db.update_tokens_used(current_user.id, tokens_used)
@@ -741,6 +772,8 @@ def send_chat_message(chat_id):
             'limit_status': limit_status
         })
 
+    except LLMUnavailable as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, int(e.retry_after)))}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
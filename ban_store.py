@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Ban Store - Sofia LiberNet
+
+Bans, avisos e log de moderação persistidos em SQLite e compartilhados
+entre workers:
+- Cada alteração incrementa um contador de versão
+- Cada processo mantém um set em memória (membership O(1) no hot path)
+- O set é recarregado quando a versão muda (verificada no máximo 1x/s)
+- Log de moderação gravado em lotes
+
+Uso:
+    store = BanStore()
+    store.ban(pubkey, "spam")
+    pubkey in store.banned        # set-like, O(1)
+    store.add_warning(pubkey)     # retorna total de avisos
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "data", "sofia_moderation.db")
+
+BAN_REFRESH_INTERVAL = float(os.getenv('BAN_REFRESH_INTERVAL', '1.0'))
+LOG_FLUSH_SIZE = 50          # entradas acumuladas antes de gravar
+LOG_FLUSH_INTERVAL = 1.0     # segundos máximos sem gravar
+LOG_MAX_ROWS = 10000         # linhas mantidas na tabela de log
+
+
+class BannedPubkeys:
+    """Visão set-like dos pubkeys banidos (escritas vão para o SQLite)"""
+
+    def __init__(self, store: 'BanStore'):
+        self._store = store
+
+    def __contains__(self, pubkey) -> bool:
+        return self._store.is_banned(pubkey)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.get_banned())
+
+    def __len__(self) -> int:
+        return len(self._store.get_banned())
+
+    def add(self, pubkey: str, reason: str = ''):
+        self._store.ban(pubkey, reason)
+
+    def remove(self, pubkey: str):
+        if not self._store.unban(pubkey):
+            raise KeyError(pubkey)
+
+    def discard(self, pubkey: str):
+        self._store.unban(pubkey)
+
+
+class WarningCounts:
+    """Visão dict-like dos avisos por pubkey (padrão 0, como defaultdict(int))"""
+
+    def __init__(self, store: 'BanStore'):
+        self._store = store
+
+    def __getitem__(self, pubkey: str) -> int:
+        return self._store.get_warnings(pubkey)
+
+    def __setitem__(self, pubkey: str, count: int):
+        self._store.set_warnings(pubkey, count)
+
+    def __contains__(self, pubkey: str) -> bool:
+        return self._store.get_warnings(pubkey) > 0
+
+    def values(self) -> List[int]:
+        return list(self._store.get_all_warnings().values())
+
+    def items(self):
+        return self._store.get_all_warnings().items()
+
+
+class BanStore:
+    """Bans e avisos persistentes com cache em memória versionado"""
+
+    def __init__(self, db_path: str = DB_PATH, refresh_interval: float = BAN_REFRESH_INTERVAL):
+        """
+        Args:
+            db_path: Caminho do banco SQLite de moderação
+            refresh_interval: Intervalo mínimo entre verificações de versão (s)
+        """
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._banned: set = set()
+        self._warnings: Dict[str, int] = {}
+        self._version = -1
+        self._checked_at = 0.0
+
+        self._log_buffer: List[tuple] = []
+        self._log_flushed_at = time.monotonic()
+
+        self.banned = BannedPubkeys(self)
+        self.warnings = WarningCounts(self)
+
+        self._init_database()
+        self.refresh(force=True)
+
+    # ============= BANCO DE DADOS =============
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Conexão única do processo (protegida por self._lock)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _init_database(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS moderation_bans (
+                    pubkey TEXT PRIMARY KEY,
+                    reason TEXT,
+                    banned_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS moderation_warnings (
+                    pubkey TEXT PRIMARY KEY,
+                    count INTEGER DEFAULT 0,
+                    last_warned_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS moderation_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    pubkey TEXT,
+                    action TEXT,
+                    reason TEXT,
+                    confidence REAL
+                )
+            """)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS moderation_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO moderation_meta (key, value) VALUES ('version', 0)")
+
+            conn.commit()
+
+    def _bump_version(self, cursor) -> int:
+        cursor.execute("UPDATE moderation_meta SET value = value + 1 WHERE key = 'version' RETURNING value")
+        return cursor.fetchone()[0]
+
+    def _apply_local(self, new_version: int):
+        # Se ninguém mais alterou desde nossa última leitura, o cache local já está certo
+        if new_version == self._version + 1:
+            self._version = new_version
+        else:
+            self._checked_at = 0.0
+
+    # ============= SINCRONIZAÇÃO =============
+
+    def refresh(self, force: bool = False):
+        """Recarrega bans/avisos se a versão no banco mudou"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if not force and now - self._checked_at < self.refresh_interval:
+                return
+            self._checked_at = now
+
+            try:
+                cursor = self.get_connection().cursor()
+                cursor.execute("SELECT value FROM moderation_meta WHERE key = 'version'")
+                version = cursor.fetchone()[0]
+                if version == self._version and not force:
+                    return
+
+                cursor.execute("SELECT pubkey FROM moderation_bans")
+                self._banned = {row[0] for row in cursor.fetchall()}
+                cursor.execute("SELECT pubkey, count FROM moderation_warnings WHERE count > 0")
+                self._warnings = {row[0]: row[1] for row in cursor.fetchall()}
+                self._version = version
+
+            except sqlite3.Error as e:
+                print(f"[BAN STORE] ⚠️ Erro ao sincronizar bans: {e}")
+
+    # ============= BANS =============
+
+    def is_banned(self, pubkey: str) -> bool:
+        """Membership O(1) (com no máximo uma consulta de versão por segundo)"""
+        self.refresh()
+        return pubkey in self._banned
+
+    def get_banned(self) -> set:
+        self.refresh()
+        return set(self._banned)
+
+    def ban(self, pubkey: str, reason: str = '') -> bool:
+        """
+        Bane um pubkey (visível a todos os workers no próximo refresh)
+
+        Returns:
+            True se o pubkey não estava banido
+        """
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR IGNORE INTO moderation_bans (pubkey, reason) VALUES (?, ?)
+            """, (pubkey, reason))
+            inserted = cursor.rowcount > 0
+            if inserted:
+                self._apply_local(self._bump_version(cursor))
+            conn.commit()
+            self._banned.add(pubkey)
+            return inserted
+
+    def unban(self, pubkey: str) -> bool:
+        """
+        Remove ban e zera avisos
+
+        Returns:
+            True se o pubkey estava banido
+        """
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM moderation_bans WHERE pubkey = ?", (pubkey,))
+            removed = cursor.rowcount > 0
+            cursor.execute("DELETE FROM moderation_warnings WHERE pubkey = ?", (pubkey,))
+            if removed or cursor.rowcount:
+                self._apply_local(self._bump_version(cursor))
+            conn.commit()
+            self._banned.discard(pubkey)
+            self._warnings.pop(pubkey, None)
+            return removed
+
+    # ============= AVISOS =============
+
+    def get_warnings(self, pubkey: str) -> int:
+        self.refresh()
+        return self._warnings.get(pubkey, 0)
+
+    def get_all_warnings(self) -> Dict[str, int]:
+        self.refresh()
+        return dict(self._warnings)
+
+    def add_warning(self, pubkey: str) -> int:
+        """
+        Incrementa avisos de um pubkey de forma atômica entre workers
+
+        Returns:
+            Total de avisos após o incremento
+        """
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO moderation_warnings (pubkey, count) VALUES (?, 1)
+                ON CONFLICT(pubkey) DO UPDATE SET count = count + 1, last_warned_at = CURRENT_TIMESTAMP
+                RETURNING count
+            """, (pubkey,))
+            count = cursor.fetchone()[0]
+            self._apply_local(self._bump_version(cursor))
+            conn.commit()
+            self._warnings[pubkey] = count
+            return count
+
+    def set_warnings(self, pubkey: str, count: int):
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            if count > 0:
+                cursor.execute("""
+                    INSERT INTO moderation_warnings (pubkey, count) VALUES (?, ?)
+                    ON CONFLICT(pubkey) DO UPDATE SET count = excluded.count
+                """, (pubkey, count))
+                self._warnings[pubkey] = count
+            else:
+                cursor.execute("DELETE FROM moderation_warnings WHERE pubkey = ?", (pubkey,))
+                self._warnings.pop(pubkey, None)
+            self._apply_local(self._bump_version(cursor))
+            conn.commit()
+
+    # ============= LOG =============
+
+    def log(self, pubkey: str, action: str, reason: str, confidence: float):
+        """Registra ação de moderação (gravada em lote)"""
+        with self._lock:
+            self._log_buffer.append((datetime.now().isoformat(), pubkey, action, reason, confidence))
+            if (len(self._log_buffer) >= LOG_FLUSH_SIZE or
+                    time.monotonic() - self._log_flushed_at >= LOG_FLUSH_INTERVAL):
+                self.flush_log()
+
+    def flush_log(self):
+        """Grava entradas pendentes do log e descarta as mais antigas"""
+        with self._lock:
+            self._log_flushed_at = time.monotonic()
+            if not self._log_buffer:
+                return
+
+            entries, self._log_buffer = self._log_buffer, []
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT INTO moderation_log (timestamp, pubkey, action, reason, confidence)
+                    VALUES (?, ?, ?, ?, ?)
+                """, entries)
+                cursor.execute("""
+                    DELETE FROM moderation_log
+                    WHERE id <= (SELECT MAX(id) FROM moderation_log) - ?
+                """, (LOG_MAX_ROWS,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[BAN STORE] ⚠️ Erro ao gravar log de moderação: {e}")
+
+    def recent_log(self, limit: int = 20) -> List[Dict]:
+        """Últimas ações de moderação (de todos os workers), mais antigas primeiro"""
+        self.flush_log()
+        with self._lock:
+            cursor = self.get_connection().cursor()
+            cursor.execute("""
+                SELECT timestamp, pubkey, action, reason, confidence
+                FROM moderation_log ORDER BY id DESC LIMIT ?
+            """, (limit,))
+            rows = [dict(row) for row in cursor.fetchall()]
+
+        for row in rows:
+            row['pubkey'] = (row['pubkey'] or '')[:16] + '...'
+        return list(reversed(rows))
+
+
+if __name__ == "__main__":
+    print("🚫 Ban Store - Sofia LiberNet")
+    print("=" * 60)
+
+    store = BanStore()
+    print(f"Banidos: {len(store.banned)}")
+    print(f"Avisos: {sum(store.warnings.values())}")
+    for entry in store.recent_log(10):
+        print(f"  {entry['timestamp']} {entry['action']} {entry['pubkey']} - {entry['reason']}")
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Moderação - Sofia LiberNet
+
+Reexecuta um corpus JSONL de eventos Nostr no ModerationSystem e mede:
+- Throughput (eventos/s) e latência por evento (p50/p95/p99)
+- Crescimento de memória (RSS máximo e, opcionalmente, tracemalloc)
+- Precisão contra rótulos: matriz de confusão spam × ham e acerto por categoria
+
+O corpus tem um evento por linha (dict NIP-01 ou ["EVENT", sub, evento]);
+rótulos opcionais vão nos campos extras "label" ("spam"/"ham") e "category".
+O detector de bots usa o created_at dos eventos como relógio, então o replay
+reproduz os intervalos reais mesmo rodando o mais rápido possível.
+
+Uso:
+    python3 bench_moderation.py generate corpus.jsonl --count 20000 --seed 42
+    python3 bench_moderation.py replay corpus.jsonl
+    python3 bench_moderation.py replay --count 5000 --trace-memory   # corpus sintético
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Dict, Iterable, List, Optional
+
+from coincurve import PrivateKey
+
+from bench_nostr import summarize
+from ban_store import BanStore
+from moderation_pipeline import iter_jsonl
+from moderation_system import BotDetector, ModerationSystem
+from nostr_verify import compute_event_id
+
+# Participação de cada categoria no corpus sintético
+CORPUS_MIX = {
+    'human': 0.62,
+    'artistic': 0.04,
+    'flood_bot': 0.08,
+    'regular_bot': 0.06,
+    'campaign': 0.08,
+    'explicit': 0.04,
+    'porn_link': 0.03,
+    'spam_pattern': 0.02,
+    'hashtag_spam': 0.03,
+}
+HAM_CATEGORIES = {'human', 'artistic'}
+
+WORDS = [
+    'bom', 'dia', 'nostr', 'hoje', 'café', 'relay', 'bitcoin', 'lightning', 'praia', 'chuva',
+    'trabalho', 'código', 'python', 'livro', 'música', 'futebol', 'viagem', 'cidade', 'amigos',
+    'família', 'noite', 'projeto', 'liberdade', 'privacidade', 'carteira', 'nó', 'sats', 'zap',
+    'good', 'morning', 'coffee', 'weekend', 'reading', 'building', 'open', 'source', 'freedom',
+    'protocol', 'client', 'release', 'feedback', 'thanks', 'great', 'idea', 'working', 'testing',
+    'sunset', 'mountain', 'garden', 'recipe', 'podcast', 'episode', 'question', 'answer', 'tip'
+]
+ARTISTIC_POSTS = [
+    'Novo ensaio fotográfico de lingerie no estúdio, fotografia artística',
+    'Artistic nude photoshoot for my portfolio, erotic art series',
+    'Sessão de biquíni na praia com modelo profissional',
+    'Body positive photoshoot: feminine beauty in natural light',
+]
+EXPLICIT_POSTS = [
+    'porn xxx hardcore fucking cumshot gangbang',
+    'pornografia sexo explícito boquete mamada gozando',
+    'xxx porn blowjob orgy dildo masturbation tonight',
+]
+PORN_SITES = ['pornhub.com', 'xvideos.com', 'xhamster.com', 'spankbang.com', 'chaturbate.com']
+SPAM_PATTERNS = [
+    'Hot {n} girls waiting, join free now',
+    'Watch porn for free, {n} videos today',
+    'Live sex cam {n} online',
+    'Download xxx pack {n}',
+]
+CAMPAIGN_TEMPLATES = [
+    'Ganhe {n} sats agora mesmo, clique no link e resgate seu bônus exclusivo hoje',
+    'Airdrop oficial: envie {n} sats e receba o dobro de volta em minutos, vagas limitadas',
+    'Exclusive giveaway for nostr users, claim your {n} free tokens before midnight',
+]
+
+
+# ============= CORPUS SINTÉTICO =============
+
+class _Account:
+    """Conta sintética (chave real quando o corpus é assinado)"""
+
+    def __init__(self, rng: random.Random, sign: bool):
+        secret = rng.getrandbits(256).to_bytes(32, 'big')
+        self.key = PrivateKey(secret) if sign else None
+        self.pubkey = self.key.public_key_xonly.format().hex() if sign else secret.hex()
+
+    def event(self, content: str, created_at: int, kind: int = 1, tags: Optional[List] = None) -> Dict:
+        event = {
+            'pubkey': self.pubkey,
+            'created_at': int(created_at),
+            'kind': kind,
+            'tags': tags or [],
+            'content': content
+        }
+        event['id'] = compute_event_id(event)
+        if self.key:
+            event['sig'] = self.key.sign_schnorr(bytes.fromhex(event['id'])).hex()
+        return event
+
+
+def _sentence(rng: random.Random, min_words: int = 6, max_words: int = 16) -> str:
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize() + rng.choice(['.', '!', '?', ''])
+
+
+def generate_corpus(count: int, seed: int = 42, sign: bool = False, start: Optional[int] = None) -> List[Dict]:
+    """
+    Gera um corpus rotulado com padrões humanos, de bots e de spam
+
+    Args:
+        count: Número aproximado de eventos
+        seed: Semente (corpus reprodutível)
+        sign: Assinar os eventos (exercita a verificação BIP-340)
+        start: created_at inicial (padrão: agora - duração do corpus)
+
+    Returns:
+        Eventos em ordem de created_at, com campos "label" e "category"
+    """
+    rng = random.Random(seed)
+    duration = max(3600, count * 2)
+    start = start if start is not None else int(time.time()) - duration
+    events = []
+
+    def add(event: Dict, category: str):
+        event['label'] = 'ham' if category in HAM_CATEGORIES else 'spam'
+        event['category'] = category
+        events.append(event)
+
+    budget = {category: int(count * share) for category, share in CORPUS_MIX.items()}
+
+    # Humanos: poucas postagens por hora, intervalos irregulares
+    humans = [_Account(rng, sign) for _ in range(max(10, budget['human'] // 5))]
+    for _ in range(budget['human']):
+        author = rng.choice(humans)
+        add(author.event(_sentence(rng), start + rng.uniform(0, duration)), 'human')
+    for _ in range(budget['artistic']):
+        author = rng.choice(humans)
+        text = f"{rng.choice(ARTISTIC_POSTS)}. {_sentence(rng, 8, 14)}"
+        add(author.event(text, start + rng.uniform(0, duration), tags=[['t', 'photography']]), 'artistic')
+
+    # Flood: rajadas de 30 posts em menos de um minuto
+    remaining = budget['flood_bot']
+    while remaining > 0:
+        bot, t = _Account(rng, sign), start + rng.uniform(0, duration - 60)
+        for _ in range(min(30, remaining)):
+            t += rng.uniform(0.5, 2.0)
+            add(bot.event(_sentence(rng), t), 'flood_bot')
+            remaining -= 1
+
+    # Agendados: intervalo fixo de 30s com conteúdo variado
+    remaining = budget['regular_bot']
+    while remaining > 0:
+        bot, t = _Account(rng, sign), start + rng.uniform(0, duration / 2)
+        for _ in range(min(25, remaining)):
+            t += 30
+            add(bot.event(f"Cotação automática #{rng.randint(1, 99999)}: {_sentence(rng, 3, 6)}", t), 'regular_bot')
+            remaining -= 1
+
+    # Campanhas: o mesmo texto com pequenas mutações em várias contas
+    remaining = budget['campaign']
+    while remaining > 0:
+        template, t = rng.choice(CAMPAIGN_TEMPLATES), start + rng.uniform(0, duration - 600)
+        for _ in range(min(rng.randint(5, 15), remaining)):
+            t += rng.uniform(5, 60)
+            add(_Account(rng, sign).event(template.format(n=rng.randint(100, 999)), t), 'campaign')
+            remaining -= 1
+
+    # Conteúdo: explícito, links pornográficos, padrões de spam e hashtags
+    spammers = [_Account(rng, sign) for _ in range(max(5, count // 200))]
+    for _ in range(budget['explicit']):
+        add(rng.choice(spammers).event(rng.choice(EXPLICIT_POSTS), start + rng.uniform(0, duration)), 'explicit')
+    for _ in range(budget['porn_link']):
+        text = f"{_sentence(rng, 3, 6)} https://{rng.choice(PORN_SITES)}/video{rng.randint(1, 99999)}"
+        add(rng.choice(spammers).event(text, start + rng.uniform(0, duration)), 'porn_link')
+    for _ in range(budget['spam_pattern']):
+        text = rng.choice(SPAM_PATTERNS).format(n=rng.randint(2, 500))
+        add(rng.choice(spammers).event(text, start + rng.uniform(0, duration)), 'spam_pattern')
+    for _ in range(budget['hashtag_spam']):
+        text = _sentence(rng, 2, 4) + ' ' + ' '.join(f"#{w}" for w in rng.sample(WORDS, 12))
+        add(rng.choice(spammers).event(text, start + rng.uniform(0, duration)), 'hashtag_spam')
+
+    events.sort(key=lambda e: e['created_at'])
+    return events
+
+
+def write_jsonl(events: Iterable[Dict], path: str) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+# ============= REPLAY =============
+
+class ReplayClock:
+    """Relógio do BotDetector avançado pelo created_at de cada evento"""
+
+    def __init__(self):
+        # Semeado pelo primeiro evento (corpora são sempre anteriores a "agora")
+        self.now: Optional[float] = None
+
+    def advance(self, event: Dict):
+        created_at = event.get('created_at')
+        if isinstance(created_at, (int, float)) and (self.now is None or created_at > self.now):
+            self.now = float(created_at)
+
+    def __call__(self) -> float:
+        return self.now if self.now is not None else time.time()
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def confusion_matrix(outcomes: List[tuple]) -> Dict:
+    """
+    Matriz de confusão com spam como classe positiva
+
+    Args:
+        outcomes: Lista de (label, approved)
+
+    Returns:
+        tp/fp/tn/fn, precision, recall, f1 e accuracy
+    """
+    tp = sum(1 for label, approved in outcomes if label == 'spam' and not approved)
+    fn = sum(1 for label, approved in outcomes if label == 'spam' and approved)
+    fp = sum(1 for label, approved in outcomes if label == 'ham' and not approved)
+    tn = sum(1 for label, approved in outcomes if label == 'ham' and approved)
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    total = tp + fp + tn + fn
+
+    return {
+        'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn,
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4),
+        'accuracy': round((tp + tn) / total, 4) if total else 0.0
+    }
+
+
+def replay(events: Iterable[Dict], wall_clock: bool = False, trace_memory: bool = False,
+           verify_signatures: bool = True) -> Dict:
+    """
+    Modera os eventos em sequência com um ModerationSystem isolado
+
+    Args:
+        events: Eventos (campos "label"/"category" opcionais)
+        wall_clock: Usar time.time() no detector de bots em vez do created_at
+        trace_memory: Medir alocações com tracemalloc (deixa o replay mais lento)
+        verify_signatures: Verificar id/assinatura (eventos sem 'sig' são rejeitados)
+
+    Returns:
+        Resultado com latência, memória, matriz de confusão e categorias
+    """
+    # Ordem cronológica: o relógio de replay só avança
+    events = sorted(events, key=lambda e: e.get('created_at') or 0)
+    ban_dir = tempfile.TemporaryDirectory()
+    clock = ReplayClock()
+    moderation = ModerationSystem(ban_store=BanStore(os.path.join(ban_dir.name, 'bench_moderation.db')))
+    moderation.bot_detector = BotDetector(clock=time.time if wall_clock else clock)
+    moderation.verify_signatures = verify_signatures
+
+    latencies, outcomes, actions, categories = [], [], {}, {}
+    rss_before = _max_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            for event in events:
+                clock.advance(event)
+                begin = time.perf_counter()
+                approved, _, details = moderation.moderate_event(event)
+                latencies.append(time.perf_counter() - begin)
+
+                action = details.get('action', 'approve' if approved else 'reject')
+                actions[action] = actions.get(action, 0) + 1
+
+                label = event.get('label')
+                if label in ('spam', 'ham'):
+                    outcomes.append((label, approved))
+                    category = event.get('category') or label
+                    counts = categories.setdefault(category, {'label': label, 'events': 0, 'correct': 0})
+                    counts['events'] += 1
+                    counts['correct'] += int(approved == (label == 'ham'))
+        elapsed = time.perf_counter() - start
+
+        memory = {
+            'max_rss_mb': round(_max_rss_mb(), 1),
+            'max_rss_growth_mb': round(_max_rss_mb() - rss_before, 1)
+        }
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            memory['traced_current_mb'] = round(current / 1024 / 1024, 2)
+            memory['traced_peak_mb'] = round(peak / 1024 / 1024, 2)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        moderation.ban_store.flush_log()
+        ban_dir.cleanup()
+
+    for counts in categories.values():
+        counts['accuracy'] = round(counts['correct'] / counts['events'], 4)
+
+    return {
+        'latency': summarize('moderate_event', latencies, elapsed),
+        'memory': memory,
+        'actions': actions,
+        'confusion': confusion_matrix(outcomes) if outcomes else None,
+        'categories': categories,
+        'bot_detector': moderation.bot_detector.get_stats(),
+        'bans': len(moderation.banned_pubkeys)
+    }
+
+
+def print_results(result: Dict):
+    latency = result['latency']
+    print("=" * 72)
+    print(f"Eventos: {latency['ops']}  |  {latency['ops_per_s']} eventos/s  |  {latency['elapsed_s']}s")
+    print(f"Latência: p50 {latency['p50_ms']}ms  p95 {latency['p95_ms']}ms  "
+          f"p99 {latency['p99_ms']}ms  média {latency['mean_ms']}ms")
+    print(f"Memória: {result['memory']}")
+    print(f"Ações: {result['actions']}  |  Bans: {result['bans']}")
+    print(f"Detector: {result['bot_detector']}")
+
+    confusion = result['confusion']
+    if confusion:
+        print("-" * 72)
+        print(f"{'':<14}{'rejeitado':>12}{'aprovado':>12}")
+        print(f"{'spam':<14}{confusion['tp']:>12}{confusion['fn']:>12}")
+        print(f"{'ham':<14}{confusion['fp']:>12}{confusion['tn']:>12}")
+        print(f"precision {confusion['precision']}  recall {confusion['recall']}  "
+              f"f1 {confusion['f1']}  accuracy {confusion['accuracy']}")
+        print("-" * 72)
+        print(f"{'categoria':<16}{'rótulo':>8}{'eventos':>10}{'acertos':>10}{'acurácia':>10}")
+        for name, counts in sorted(result['categories'].items()):
+            print(f"{name:<16}{counts['label']:>8}{counts['events']:>10}"
+                  f"{counts['correct']:>10}{counts['accuracy']:>10}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay e benchmark do sistema de moderação")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help="Gera um corpus sintético rotulado")
+    generate.add_argument('output', help="Arquivo JSONL de saída")
+    generate.add_argument('--count', type=int, default=10000, help="Número aproximado de eventos")
+    generate.add_argument('--seed', type=int, default=42)
+    generate.add_argument('--sign', action='store_true', help="Assinar eventos (BIP-340)")
+
+    run = subparsers.add_parser('replay', help="Reexecuta um corpus no ModerationSystem")
+    run.add_argument('path', nargs='?', help="Corpus JSONL (padrão: corpus sintético em memória)")
+    run.add_argument('--count', type=int, default=10000, help="Eventos do corpus sintético")
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--sign', action='store_true', help="Assinar o corpus sintético")
+    run.add_argument('--wall-clock', action='store_true', help="Ignorar created_at no detector de bots")
+    run.add_argument('--trace-memory', action='store_true', help="Medir alocações com tracemalloc")
+    run.add_argument('--no-verify', action='store_true', help="Não verificar assinaturas")
+    run.add_argument('--json', action='store_true', help="Saída em JSON")
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        total = write_jsonl(generate_corpus(args.count, args.seed, args.sign), args.output)
+        print(f"✅ {total} eventos gravados em {args.output}")
+    else:
+        if args.path:
+            events = list(iter_jsonl(args.path))
+        else:
+            events = generate_corpus(args.count, args.seed, args.sign)
+
+        # Corpus sem assinaturas seria todo rejeitado pela verificação
+        verify = not args.no_verify and all('sig' in event for event in events)
+        if not args.no_verify and not verify:
+            print("⚠️ Corpus sem assinaturas: verificação desligada (use --sign)")
+
+        result = replay(events, wall_clock=args.wall_clock, trace_memory=args.trace_memory,
+                        verify_signatures=verify)
+
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print_results(result)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Benchmark Nostr - Sofia LiberNet
+
+Mede o desempenho do NostrClient contra o relay local (local_relay.py):
+- Latência de publicação (publish_note → OK registrado na outbox)
+- Throughput de publicação em rajada (outbox com pipeline de EVENTs)
+- Throughput de consulta (get_mentions até EOSE)
+- Latência de busca de perfil (fetch_user_profile)
+
+Uso:
+    python3 bench_nostr.py --notes 500 --queries 100 --profiles 100
+    python3 bench_nostr.py --latency 0.01 --jitter 0.02 --fail-rate 0.05
+    python3 bench_nostr.py --relay ws://127.0.0.1:7447   # relay externo
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Dict, List
+
+from pynostr.key import PrivateKey
+from pynostr.event import Event, EventKind
+
+from local_relay import LocalRelay
+from nostr_integration import NostrClient
+from nostr_outbox import NostrOutbox
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil simples (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, failures: int = 0) -> Dict:
+    """Agrega latências (s) em um resultado de benchmark"""
+    count = len(latencies)
+    result = {
+        'name': name,
+        'ops': count,
+        'failures': failures,
+        'elapsed_s': round(elapsed, 3),
+        'ops_per_s': round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+    return result
+
+
+def timed(fn, *args, **kwargs):
+    """Executa fn silenciando os prints do cliente; retorna (resultado, segundos)"""
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def seed_relay(relay: LocalRelay, sofia_pubkey: str, mentions: int, profiles: int) -> List[str]:
+    """
+    Popula o relay com menções à Sofia e perfis (kind 0)
+
+    Returns:
+        Lista de pubkeys com perfil publicado
+    """
+    now = int(time.time())
+    author = PrivateKey()
+
+    for i in range(mentions):
+        event = Event(
+            content=f"@sofia menção de teste {i}",
+            pubkey=author.public_key.hex(),
+            created_at=now - i,
+            kind=EventKind.TEXT_NOTE,
+            tags=[["p", sofia_pubkey]]
+        )
+        event.sign(author.hex())
+        relay.add_event(event.to_dict())
+
+    pubkeys = []
+    for i in range(profiles):
+        key = PrivateKey()
+        event = Event(
+            content=json.dumps({"name": f"user{i}", "picture": f"https://example.com/{i}.jpg"}),
+            pubkey=key.public_key.hex(),
+            created_at=now,
+            kind=EventKind.SET_METADATA
+        )
+        event.sign(key.hex())
+        relay.add_event(event.to_dict())
+        pubkeys.append(key.public_key.hex())
+
+    return pubkeys
+
+
+def bench_publish(client: NostrClient, count: int, timeout: float) -> Dict:
+    """Uma nota por vez: enfileirar e esperar o OK do relay"""
+    latencies, failures = [], 0
+    start = time.perf_counter()
+    for i in range(count):
+        begin = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            event_id = client.publish_note(f"benchmark nota {i}", [["t", "bench"]])
+            status = client.outbox.wait_for(event_id, timeout) if event_id else None
+        if status and status['status'] == 'published':
+            latencies.append(time.perf_counter() - begin)
+        else:
+            failures += 1
+    return summarize('publish_note (até OK)', latencies, time.perf_counter() - start, failures)
+
+
+def bench_publish_burst(client: NostrClient, count: int, timeout: float) -> Dict:
+    """Rajada: enfileirar todas as notas e medir até a última confirmação"""
+    enqueue_latencies, event_ids = [], []
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for i in range(count):
+            begin = time.perf_counter()
+            event_ids.append(client.publish_note(f"rajada nota {i}", [["t", "bench"]]))
+            enqueue_latencies.append(time.perf_counter() - begin)
+
+        deadline = time.monotonic() + timeout * 4
+        pending = [e for e in event_ids if e]
+        while pending and time.monotonic() < deadline:
+            pending = [e for e in pending if client.outbox.get_event_status(e)['status'] == 'pending']
+            time.sleep(0.01)
+
+    failures = sum(1 for e in event_ids if not e or client.outbox.get_event_status(e)['status'] != 'published')
+    return summarize('publish_note (rajada)', enqueue_latencies, time.perf_counter() - start, failures)
+
+
+def bench_mentions(client: NostrClient, count: int, limit: int) -> Dict:
+    latencies, failures = [], 0
+    start = time.perf_counter()
+    for _ in range(count):
+        events, elapsed = timed(client.get_mentions, limit=limit)
+        if events:
+            latencies.append(elapsed)
+        else:
+            failures += 1
+    return summarize(f'get_mentions(limit={limit})', latencies, time.perf_counter() - start, failures)
+
+
+def bench_profiles(client: NostrClient, pubkeys: List[str], missing: int) -> Dict:
+    """Busca perfis existentes e inexistentes (miss = EOSE vazio, sem backups)"""
+    latencies, failures = [], 0
+    backup_relays = client.backup_relays
+    client.backup_relays = []  # benchmark offline: não sair para relays públicos
+
+    targets = pubkeys + [PrivateKey().public_key.hex() for _ in range(missing)]
+    start = time.perf_counter()
+    try:
+        for pubkey_hex in targets:
+            profile, elapsed = timed(client.fetch_user_profile, pubkey_hex)
+            latencies.append(elapsed)
+            if profile is None and pubkey_hex in pubkeys:
+                failures += 1
+    finally:
+        client.backup_relays = backup_relays
+    return summarize('fetch_user_profile', latencies, time.perf_counter() - start, failures)
+
+
+def run_benchmark(args) -> List[Dict]:
+    relay = None
+    relay_url = args.relay
+
+    if not relay_url:
+        latency = (args.latency, args.latency + args.jitter) if args.jitter else args.latency
+        relay = LocalRelay(latency=latency, fail_rate=args.fail_rate,
+                           drop_rate=args.drop_rate, seed=args.seed)
+        relay_url = relay.start()
+
+    sofia_key = PrivateKey()
+    pubkeys = []
+    if relay:
+        pubkeys = seed_relay(relay, sofia_key.public_key.hex(), args.mentions, args.profiles)
+
+    # Outbox descartável para não misturar com a fila real
+    outbox_dir = tempfile.TemporaryDirectory()
+    outbox = NostrOutbox(os.path.join(outbox_dir.name, 'bench_outbox.db'),
+                         max_attempts=3, ack_timeout=args.timeout)
+    client = NostrClient(relay_url, query_timeout=args.timeout, outbox=outbox)
+    results = []
+
+    try:
+        with redirect_stdout(io.StringIO()):
+            client.load_identity(sofia_key.bech32())
+            if not client.connect():
+                raise RuntimeError(f"Não foi possível conectar a {relay_url}")
+
+        if args.notes:
+            results.append(bench_publish(client, args.notes, args.timeout))
+            results.append(bench_publish_burst(client, args.notes, args.timeout))
+        if args.queries:
+            results.append(bench_mentions(client, args.queries, args.limit))
+        if args.profiles or args.missing:
+            results.append(bench_profiles(client, pubkeys, args.missing))
+    finally:
+        with redirect_stdout(io.StringIO()):
+            client.disconnect()
+            outbox.stop()
+        outbox_dir.cleanup()
+        if relay:
+            results.append({'name': 'relay_stats', **relay.stats})
+            relay.stop()
+
+    return results
+
+
+def print_results(results: List[Dict]):
+    print("=" * 78)
+    print(f"{'operação':<28}{'ops':>7}{'falhas':>8}{'ops/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    print("-" * 78)
+    for r in results:
+        if r['name'] == 'relay_stats':
+            continue
+        print(f"{r['name']:<28}{r['ops']:>7}{r['failures']:>8}{r['ops_per_s']:>10}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+    print("=" * 78)
+    for r in results:
+        if r['name'] == 'relay_stats':
+            stats = {k: v for k, v in r.items() if k != 'name'}
+            print(f"[RELAY LOCAL] 📊 {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do NostrClient contra relay local")
+    parser.add_argument('--relay', help="URL de relay externo (padrão: relay local em processo)")
+    parser.add_argument('--notes', type=int, default=200, help="Notas a publicar")
+    parser.add_argument('--queries', type=int, default=50, help="Consultas de menções")
+    parser.add_argument('--limit', type=int, default=20, help="limit das consultas de menções")
+    parser.add_argument('--mentions', type=int, default=200, help="Menções pré-carregadas no relay")
+    parser.add_argument('--profiles', type=int, default=50, help="Perfis existentes a buscar")
+    parser.add_argument('--missing', type=int, default=10, help="Perfis inexistentes a buscar")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latência base do relay (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Jitter adicional do relay (s)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fração de EVENTs com OK=false")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Fração de EVENTs sem resposta")
+    parser.add_argument('--timeout', type=float, default=2.0, help="Timeout de OK/EOSE do cliente (s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="Saída em JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
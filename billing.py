@@ -22,7 +22,8 @@ class TokenBilling:
     """
 
     @staticmethod
-    def calculate_real_cost(model_id: str, input_tokens: int, output_tokens: int) -> int:
+    def calculate_real_cost(model_id: str, input_tokens: int, output_tokens: int,
+                            cached_tokens: int = 0) -> int:
         """
         Calcula o custo REAL em tokens internos baseado no uso da OpenAI API.
 
@@ -33,6 +34,8 @@ class TokenBilling:
             model_id: ID do modelo usado ('gpt-4o-mini', 'gpt-5', 'gpt-5-internet')
             input_tokens: Quantidade de tokens de input (prompt) usados
             output_tokens: Quantidade de tokens de output (resposta) usados
+            cached_tokens: Parte do input servida do cache de prompt da OpenAI
+                (usage.prompt_tokens_details.cached_tokens), cobrada com desconto
 
         Returns:
             int: Quantidade de tokens internos a deduzir do saldo do usuário
@@ -55,18 +58,23 @@ class TokenBilling:
         # Buscar custos OpenAI (USD por 1M tokens)
         if openai_model == 'gpt-4o-mini':
             input_cost_per_1m = 0.15
+            cached_cost_per_1m = 0.075
             output_cost_per_1m = 0.60
         elif openai_model == 'gpt-4o':
             input_cost_per_1m = 2.50
+            cached_cost_per_1m = 1.25
             output_cost_per_1m = 10.00
         else:
             # Fallback para custo médio
             avg_cost = OPENAI_COSTS.get(openai_model, 7.50)
             input_cost_per_1m = avg_cost * 0.25
+            cached_cost_per_1m = input_cost_per_1m * 0.5
             output_cost_per_1m = avg_cost * 1.33
 
-        # Calcular custo em USD
-        input_cost_usd = (input_tokens / 1_000_000) * input_cost_per_1m
+        # Calcular custo em USD (prefixo em cache sai mais barato)
+        cached_tokens = min(max(cached_tokens, 0), input_tokens)
+        input_cost_usd = (((input_tokens - cached_tokens) / 1_000_000) * input_cost_per_1m +
+                          (cached_tokens / 1_000_000) * cached_cost_per_1m)
         output_cost_usd = (output_tokens / 1_000_000) * output_cost_per_1m
         total_cost_usd = input_cost_usd + output_cost_usd
 
@@ -287,6 +295,13 @@ if __name__ == '__main__':
         print(f"   {model:20} → Real: {real_cost:5} | Estimado: {estimated:5} | Diff: {diff:+4}")
     print()
 
+    print("2b. CUSTO REAL COM CACHE DE PROMPT (4000 input, 3072 em cache + 500 output):")
+    for model in ['gpt-4o-mini', 'gpt-5', 'gpt-5-internet']:
+        full = billing.calculate_real_cost(model, 4000, 500)
+        cached = billing.calculate_real_cost(model, 4000, 500, cached_tokens=3072)
+        print(f"   {model:20} → Sem cache: {full:5} | Com cache: {cached:5}")
+    print()
+
     # Teste 3: Conversão sats → tokens
     print("3. CONVERSÃO SATS → TOKENS:")
     for sats in [1000, 3500, 7000, 17500, 35000]:
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Conversation Summary - Sofia LiberNet
+
+Resumo incremental das conversas longas:
+- Um resumo por chat, gravado na própria tabela chats (summary, summary_upto_id)
+- Atualizado em segundo plano a cada K turnos, com um modelo barato
+- No prompt, o resumo substitui as mensagens antigas; só as mensagens
+  posteriores ao resumo entram como histórico
+- Tokens de entrada por turno ficam aproximadamente constantes
+
+Uso:
+    from conversation_summary import conversation_summarizer
+    messages = db.get_recent_chat_messages(chat_id, limit=HISTORY_CANDIDATES)
+    summary, messages = conversation_summarizer.apply(chat, messages)
+    builder.add('summary', conversation_summarizer.format(summary))
+    builder.set_history(messages)
+    ...
+    conversation_summarizer.schedule(chat_id)  # após salvar a resposta
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import db
+from llm_gateway import llm_gateway
+
+SUMMARY_MODEL = os.getenv('SUMMARY_MODEL', 'gpt-4o-mini')
+SUMMARY_EVERY_TURNS = int(os.getenv('SUMMARY_EVERY_TURNS', '4'))  # turno = pergunta + resposta
+SUMMARY_KEEP_RECENT = int(os.getenv('SUMMARY_KEEP_RECENT', '6'))  # mensagens sempre enviadas na íntegra
+SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', '500'))
+SUMMARY_BUDGET = 60.0  # deadline da chamada em segundo plano (s)
+SUMMARY_MESSAGE_CHARS = 2000  # corte de cada mensagem na entrada do resumo
+SUMMARY_BATCH = 200  # máximo de mensagens incorporadas por execução
+
+SUMMARY_INSTRUCTIONS = """Você mantém o resumo de uma conversa entre um usuário e Sofia (assistente).
+Atualize o resumo anterior incorporando as novas mensagens.
+
+Regras:
+- Escreva em português, em tópicos curtos, no máximo 250 palavras
+- Preserve fatos sobre o usuário, decisões, pedidos em aberto, nomes, números e código citado
+- Descarte saudações e conteúdo repetido
+- Responda apenas com o resumo atualizado"""
+
+
+class ConversationSummarizer:
+    """Mantém o resumo incremental de cada chat em segundo plano"""
+
+    def __init__(self, every_turns: int = SUMMARY_EVERY_TURNS, keep_recent: int = SUMMARY_KEEP_RECENT,
+                 model: str = SUMMARY_MODEL, max_workers: int = 2):
+        """
+        Args:
+            every_turns: Turnos novos (fora das recentes) necessários para atualizar o resumo
+            keep_recent: Mensagens mais recentes que nunca entram no resumo
+            model: Modelo da OpenAI usado para resumir
+            max_workers: Resumos simultâneos no processo
+        """
+        self.every_turns = every_turns
+        self.keep_recent = keep_recent
+        self.model = model
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.stats = {'runs': 0, 'skipped': 0, 'failures': 0, 'messages': 0,
+                      'input_tokens': 0, 'output_tokens': 0}
+
+    def _stat(self, name: str, value: int = 1):
+        with self._lock:
+            self.stats[name] += value
+
+    # ============= PROMPT =============
+
+    @staticmethod
+    def apply(chat: Dict[str, Any], messages: List[Dict[str, Any]]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Separa o que o resumo já cobre
+
+        Args:
+            chat: Linha da tabela chats
+            messages: Histórico em ordem cronológica (com 'id')
+
+        Returns:
+            (resumo ou None, mensagens posteriores ao resumo)
+        """
+        summary = chat.get('summary')
+        upto_id = chat.get('summary_upto_id') or 0
+        if not summary or not upto_id:
+            return None, messages
+        return summary, [m for m in messages if m.get('id', upto_id + 1) > upto_id]
+
+    @staticmethod
+    def format(summary: Optional[str]) -> str:
+        """Seção do prompt com o resumo ('' se não houver)"""
+        if not summary:
+            return ''
+        return f"RESUMO DA CONVERSA ATÉ AQUI (mensagens anteriores ao histórico abaixo):\n{summary}"
+
+    # ============= ATUALIZAÇÃO =============
+
+    def schedule(self, chat_id: int):
+        """Agenda a atualização do resumo (não bloqueia; um resumo por chat por vez)"""
+        with self._lock:
+            if chat_id in self._pending:
+                return
+            self._pending.add(chat_id)
+        try:
+            self._executor.submit(self._run, chat_id)
+        except RuntimeError:
+            # Executor encerrado (shutdown do worker)
+            with self._lock:
+                self._pending.discard(chat_id)
+
+    def _run(self, chat_id: int):
+        try:
+            self.update(chat_id)
+        except Exception as e:
+            self._stat('failures')
+            print(f"[SUMMARY] ❌ Erro ao resumir chat {chat_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(chat_id)
+
+    def update(self, chat_id: int) -> bool:
+        """
+        Incorpora ao resumo as mensagens antigas ainda não resumidas
+
+        Returns:
+            True se um novo resumo foi gravado
+        """
+        chat = db.get_chat(chat_id)
+        if not chat:
+            return False
+
+        previous = chat.get('summary') or ''
+        upto_id = chat.get('summary_upto_id') or 0
+        messages = db.get_chat_messages_after(chat_id, upto_id, limit=SUMMARY_BATCH + self.keep_recent)
+
+        # As mais recentes continuam indo na íntegra; só resume quando acumular K turnos
+        pending = messages[:-self.keep_recent] if self.keep_recent else messages
+        pending = pending[:SUMMARY_BATCH]
+        if len(pending) < 2 * self.every_turns:
+            self._stat('skipped')
+            return False
+
+        summary = self._summarize(previous, pending)
+        if not summary:
+            self._stat('failures')
+            return False
+
+        new_upto_id = pending[-1]['id']
+        if not db.update_chat_summary(chat_id, summary, new_upto_id, upto_id):
+            # Outro processo atualizou o resumo antes
+            self._stat('skipped')
+            return False
+
+        self._stat('runs')
+        self._stat('messages', len(pending))
+        print(f"[SUMMARY] 📝 Chat {chat_id}: +{len(pending)} mensagens no resumo (até #{new_upto_id})")
+        return True
+
+    def _summarize(self, previous: str, messages: List[Dict[str, Any]]) -> str:
+        transcript = '\n'.join(
+            f"{'Usuário' if m['role'] == 'user' else 'Sofia'}: {(m['content'] or '')[:SUMMARY_MESSAGE_CHARS]}"
+            for m in messages
+        )
+        response = llm_gateway.chat(
+            deadline=llm_gateway.deadline(SUMMARY_BUDGET),
+            model=self.model,
+            messages=[
+                {'role': 'system', 'content': SUMMARY_INSTRUCTIONS},
+                {'role': 'user', 'content': f"RESUMO ANTERIOR:\n{previous or '(vazio)'}\n\nNOVAS MENSAGENS:\n{transcript}"}
+            ],
+            temperature=0.2,
+            max_tokens=SUMMARY_MAX_TOKENS
+        )
+
+        usage = getattr(response, 'usage', None)
+        if usage:
+            self._stat('input_tokens', usage.prompt_tokens)
+            self._stat('output_tokens', usage.completion_tokens)
+        return (response.choices[0].message.content or '').strip()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+        return stats
+
+
+# Instância global
+conversation_summarizer = ConversationSummarizer()
+
+
+if __name__ == "__main__":
+    print("📝 Conversation Summary - Sofia LiberNet")
+    print("=" * 60)
+
+    history = [{'id': i, 'role': 'user' if i % 2 else 'assistant', 'content': f"Mensagem {i}"}
+               for i in range(1, 21)]
+    chat = {'summary': "- Usuário quer configurar um relay Nostr", 'summary_upto_id': 14}
+    summary, recent = conversation_summarizer.apply(chat, history)
+    print(conversation_summarizer.format(summary))
+    print(f"Histórico enviado: {len(recent)} de {len(history)} mensagens")
+    print(conversation_summarizer.get_stats())
@@ -11,6 +11,7 @@ from typing import Optional, Dict, List
 import json
 
 DB_PATH = '/app/data/sofia_users.db'
+DB_BUSY_TIMEOUT = 15  # espera por lock de escrita (s); WAL deixa leituras livres
 
 # Planos disponíveis (atualizado 2025-11-11)
 PLANS = {
@@ -56,8 +57,9 @@ class Database:
         self.init_db()
 
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT)
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
         return conn
 
     def init_db(self):
@@ -65,6 +67,9 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
 
+        # WAL (persistente no arquivo): leitores não bloqueiam a escrita das threads/workers
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         # Tabela de usuários
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -207,6 +212,15 @@ class Database:
             cursor.execute("UPDATE users SET last_token_reset = CURRENT_TIMESTAMP WHERE last_token_reset IS NULL")
             print("[DB] Coluna last_token_reset adicionada à tabela users")
 
+        # Resumo incremental da conversa (conversation_summary.py)
+        cursor.execute("PRAGMA table_info(chats)")
+        chat_columns = [column[1] for column in cursor.fetchall()]
+        if 'summary' not in chat_columns:
+            cursor.execute("ALTER TABLE chats ADD COLUMN summary TEXT DEFAULT NULL")
+            cursor.execute("ALTER TABLE chats ADD COLUMN summary_upto_id INTEGER DEFAULT 0")
+            cursor.execute("ALTER TABLE chats ADD COLUMN summary_updated_at TIMESTAMP DEFAULT NULL")
+            print("[DB] Colunas de resumo adicionadas à tabela chats")
+
         conn.commit()
         conn.close()
 
@@ -651,6 +665,63 @@ class Database:
         conn.close()
         return [dict(row) for row in rows]
 
+    def get_recent_chat_messages(self, chat_id: int, limit: int = 100) -> List[Dict]:
+        """Retorna as últimas mensagens do chat (em ordem cronológica)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        SELECT * FROM (
+            SELECT * FROM chat_messages
+            WHERE chat_id = ?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ) ORDER BY timestamp ASC, id ASC
+        ''', (chat_id, limit))
+
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def get_chat_messages_after(self, chat_id: int, after_id: int = 0, limit: int = 200) -> List[Dict]:
+        """Retorna mensagens do chat com id maior que after_id (em ordem cronológica)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        SELECT * FROM chat_messages
+        WHERE chat_id = ? AND id > ?
+        ORDER BY id ASC
+        LIMIT ?
+        ''', (chat_id, after_id, limit))
+
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def update_chat_summary(self, chat_id: int, summary: str, upto_id: int, previous_upto_id: int) -> bool:
+        """
+        Grava o resumo da conversa até a mensagem upto_id
+
+        Só grava se o resumo ainda cobre previous_upto_id (evita que um
+        resumo mais antigo sobrescreva um mais novo)
+
+        Returns:
+            True se o resumo foi gravado
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        UPDATE chats SET summary = ?, summary_upto_id = ?, summary_updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND COALESCE(summary_upto_id, 0) = ?
+        ''', (summary, upto_id, chat_id, previous_upto_id))
+
+        updated = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return updated
+
     def deactivate_chat(self, chat_id: int):
         """Desativa chat (soft delete)"""
         conn = self.get_connection()
@@ -1013,7 +1084,7 @@ class Database:
 
     def deduct_tokens(self, user_id: int, tokens: int, model_id: str,
                      chat_id: int = None, input_tokens: int = 0,
-                     output_tokens: int = 0) -> bool:
+                     output_tokens: int = 0, cached_tokens: int = 0) -> bool:
         """
         Deduz tokens do saldo do usuário após uso REAL da OpenAI API
 
@@ -1024,6 +1095,7 @@ class Database:
             chat_id: ID do chat (opcional, para rastreamento)
             input_tokens: Tokens de input da OpenAI (para auditoria)
             output_tokens: Tokens de output da OpenAI (para auditoria)
+            cached_tokens: Tokens de input servidos do cache de prompt (para auditoria)
 
         Returns:
             True se deduzido com sucesso, False se saldo insuficiente
@@ -1066,6 +1138,8 @@ class Database:
                 description += f" (Chat #{chat_id})"
             if input_tokens and output_tokens:
                 description += f" - {input_tokens}→{output_tokens} tokens OpenAI"
+                if cached_tokens:
+                    description += f" ({cached_tokens} em cache)"
 
             cursor.execute('''
                 INSERT INTO token_transactions
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+GeoIP Local - Sofia LiberNet
+
+Geolocalização de IP sem chamada externa:
+- Tabela binária de faixas ordenadas (IPv4 e IPv6) aberta com mmap
+- Busca binária (bisect) direto no arquivo: microssegundos por consulta
+- Localizações deduplicadas (cidade/região/país/timezone/lat/lon)
+- Timezone da fonte ou, sem ele, pelo estado/província (geoip_timezones.py)
+- Importador de CSV (DB-IP City Lite, IP2Location LITE DB11 ou CSV com cabeçalho)
+- Arquivo trocado de forma atômica; workers recarregam quando ele muda
+
+Uso:
+    python3 geoip_db.py import dbip-city-lite.csv --format dbip
+    python3 geoip_db.py lookup 8.8.8.8
+
+    location = geoip_db.lookup("200.147.67.142")   # None se não encontrado
+"""
+
+import os
+import csv
+import json
+import mmap
+import time
+import struct
+import bisect
+import ipaddress
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pytz
+
+from geoip_timezones import timezone_for
+
+GEOIP_DB_PATH = os.getenv('GEOIP_DB_PATH', os.path.join(os.path.dirname(__file__), "data", "geoip.bin"))
+GEOIP_RELOAD_INTERVAL = 60  # segundos entre verificações de arquivo novo
+
+MAGIC = b'SGEO'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')   # magic, versão, reservado, n_v4, n_v6, offset/tamanho das localizações
+V4_RECORD = struct.Struct('<III')      # início, fim, índice da localização
+V6_RECORD = struct.Struct('<16s16sI')  # início, fim (big-endian), índice da localização
+
+LOCATION_FIELDS = ('city', 'region', 'country', 'country_code', 'timezone', 'latitude', 'longitude')
+
+
+class _StartColumn:
+    """Sequência (somente leitura) dos inícios de faixa, para o bisect direto no mmap"""
+
+    def __init__(self, buffer, offset: int, count: int, record: struct.Struct, width: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.size = record.size
+        self.width = width
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        position = self.offset + index * self.size
+        if self.width == 4:
+            return int.from_bytes(self.buffer[position:position + 4], 'little')
+        return int.from_bytes(self.buffer[position:position + 16], 'big')
+
+
+class _Snapshot:
+    """Arquivo aberto (trocado como um todo no reload)"""
+
+    def __init__(self, path: str):
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.v4_count, self.v6_count, loc_offset, loc_length = \
+            HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Arquivo GeoIP inválido: {path}")
+
+        self.v4_offset = HEADER.size
+        self.v6_offset = self.v4_offset + self.v4_count * V4_RECORD.size
+        self.locations: List[Dict] = json.loads(self.buffer[loc_offset:loc_offset + loc_length])
+
+        self.v4_starts = _StartColumn(self.buffer, self.v4_offset, self.v4_count, V4_RECORD, 4)
+        self.v6_starts = _StartColumn(self.buffer, self.v6_offset, self.v6_count, V6_RECORD, 16)
+
+    def lookup(self, ip: int, version: int) -> Optional[int]:
+        if version == 4:
+            starts, record, offset = self.v4_starts, V4_RECORD, self.v4_offset
+        else:
+            starts, record, offset = self.v6_starts, V6_RECORD, self.v6_offset
+
+        index = bisect.bisect_right(starts, ip) - 1
+        if index < 0:
+            return None
+
+        _, end, location_index = record.unpack_from(self.buffer, offset + index * record.size)
+        if version == 6:
+            end = int.from_bytes(end, 'big')
+        return location_index if ip <= end else None
+
+
+class GeoIPDatabase:
+    """Consulta de localização por IP em uma tabela de faixas local"""
+
+    def __init__(self, path: str = GEOIP_DB_PATH, reload_interval: float = GEOIP_RELOAD_INTERVAL):
+        """
+        Args:
+            path: Arquivo gerado por build_database()/import
+            reload_interval: Intervalo mínimo entre verificações de arquivo novo (s)
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0}
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        (Re)abre o arquivo se ele existir e tiver mudado
+
+        Returns:
+            True se há uma tabela carregada
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                return self._snapshot is not None
+
+            if self._snapshot is None or self._snapshot.mtime != mtime:
+                try:
+                    # O snapshot antigo é liberado quando nenhuma consulta o referencia mais
+                    self._snapshot = _Snapshot(self.path)
+                    print(f"[GEOIP] ✅ {self._snapshot.v4_count} faixas IPv4, "
+                          f"{self._snapshot.v6_count} IPv6 carregadas")
+                except (OSError, ValueError) as e:
+                    print(f"[GEOIP] ⚠️ Erro ao carregar {self.path}: {e}")
+            return self._snapshot is not None
+
+    @property
+    def available(self) -> bool:
+        return self._snapshot is not None
+
+    def lookup(self, ip_address: str) -> Optional[Dict]:
+        """
+        Localização de um IP
+
+        Args:
+            ip_address: IPv4 ou IPv6 em texto
+
+        Returns:
+            Dict no formato de InternetTools.get_location_from_ip ou None
+        """
+        if time.monotonic() - self._checked_at > self.reload_interval:
+            self.reload()
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+
+        try:
+            ip = ipaddress.ip_address(ip_address.strip())
+        except ValueError:
+            return None
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        self.stats['lookups'] += 1
+        location_index = snapshot.lookup(int(ip), ip.version)
+        if location_index is None:
+            return None
+
+        self.stats['hits'] += 1
+        return dict(snapshot.locations[location_index])
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'path': self.path,
+            'loaded': snapshot is not None,
+            'ipv4_ranges': snapshot.v4_count if snapshot else 0,
+            'ipv6_ranges': snapshot.v6_count if snapshot else 0,
+            'locations': len(snapshot.locations) if snapshot else 0,
+            **self.stats
+        }
+
+
+# ============= IMPORTAÇÃO =============
+
+def _parse_ip(value: str) -> Tuple[int, int]:
+    """IP em texto ou inteiro decimal → (inteiro, versão)"""
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return number, 4 if number < 2 ** 32 else 6
+    ip = ipaddress.ip_address(value)
+    return int(ip), ip.version
+
+
+def _float(value) -> float:
+    try:
+        return round(float(value), 4)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def make_location(city: str = '', region: str = '', country_code: str = '', country: str = '',
+                  timezone: str = '', latitude=0, longitude=0) -> Dict:
+    country_code = (country_code or '').strip().upper()
+    return {
+        'city': city or 'Desconhecida',
+        'region': region or 'Desconhecida',
+        'country': country or pytz.country_names.get(country_code, 'Desconhecido'),
+        'country_code': country_code or 'XX',
+        'timezone': timezone_for(country_code, region, timezone),
+        'latitude': _float(latitude),
+        'longitude': _float(longitude)
+    }
+
+
+def read_csv_ranges(path: str, fmt: str = 'dbip') -> Iterator[Tuple[int, int, int, Dict]]:
+    """
+    Lê faixas de um CSV de geolocalização
+
+    Formatos:
+        dbip: ip_start,ip_end,continent,country,stateprov,city,latitude,longitude (sem cabeçalho)
+        ip2location: ip_from,ip_to,country_code,country_name,region,city,latitude,longitude,zip,timezone
+        header: CSV com cabeçalho start,end e colunas opcionais de LOCATION_FIELDS
+
+    Yields:
+        (início, fim, versão, localização)
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'header':
+            rows = csv.DictReader(f)
+        else:
+            rows = csv.reader(f)
+
+        for row in rows:
+            try:
+                if fmt == 'dbip':
+                    start, version = _parse_ip(row[0])
+                    end, _ = _parse_ip(row[1])
+                    location = make_location(city=row[5], region=row[4], country_code=row[3],
+                                             latitude=row[6], longitude=row[7])
+                elif fmt == 'ip2location':
+                    start, version = _parse_ip(row[0])
+                    end, _ = _parse_ip(row[1])
+                    if row[2] == '-':
+                        continue
+                    # Timezone do IP2Location é um offset (-03:00); usar a zona do estado
+                    location = make_location(city=row[5], region=row[4], country_code=row[2],
+                                             country=row[3].title(), latitude=row[6], longitude=row[7])
+                else:
+                    start, version = _parse_ip(row['start'])
+                    end, _ = _parse_ip(row['end'])
+                    location = make_location(**{k: row[k] for k in LOCATION_FIELDS if row.get(k)})
+            except (IndexError, KeyError, ValueError):
+                continue
+
+            # Faixas IPv4-mapped (::ffff:a.b.c.d) de bases IPv6 viram faixas IPv4
+            if version == 6 and start >> 32 == 0xFFFF and end >> 32 == 0xFFFF:
+                start, end, version = start & 0xFFFFFFFF, end & 0xFFFFFFFF, 4
+
+            if end >= start:
+                yield start, end, version, location
+
+
+def build_database(ranges: Iterable[Tuple[int, int, int, Dict]], path: str = GEOIP_DB_PATH) -> Dict:
+    """
+    Grava a tabela binária (substituição atômica do arquivo)
+
+    Args:
+        ranges: (início, fim, versão, localização)
+        path: Arquivo de saída
+
+    Returns:
+        Contagens gravadas
+    """
+    location_index: Dict[Tuple, int] = {}
+    locations: List[Dict] = []
+    v4: List[Tuple[int, int, int]] = []
+    v6: List[Tuple[int, int, int]] = []
+
+    for start, end, version, location in ranges:
+        key = tuple(location.get(field) for field in LOCATION_FIELDS)
+        index = location_index.get(key)
+        if index is None:
+            index = location_index[key] = len(locations)
+            locations.append({field: location.get(field) for field in LOCATION_FIELDS})
+        (v4 if version == 4 else v6).append((start, end, index))
+
+    v4.sort()
+    v6.sort()
+    locations_blob = json.dumps(locations, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    locations_offset = HEADER.size + len(v4) * V4_RECORD.size + len(v6) * V6_RECORD.size
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(v4), len(v6), locations_offset, len(locations_blob)))
+        for start, end, index in v4:
+            f.write(V4_RECORD.pack(start, end, index))
+        for start, end, index in v6:
+            f.write(V6_RECORD.pack(start.to_bytes(16, 'big'), end.to_bytes(16, 'big'), index))
+        f.write(locations_blob)
+    os.replace(tmp_path, path)
+
+    return {'ipv4_ranges': len(v4), 'ipv6_ranges': len(v6), 'locations': len(locations),
+            'bytes': os.path.getsize(path)}
+
+
+# Instância global
+geoip_db = GeoIPDatabase()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Base GeoIP local da Sofia")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    importer = subparsers.add_parser('import', help="Importa um CSV de faixas de IP")
+    importer.add_argument('csv', help="Arquivo CSV")
+    importer.add_argument('--format', choices=['dbip', 'ip2location', 'header'], default='dbip')
+    importer.add_argument('--output', default=GEOIP_DB_PATH)
+
+    lookup = subparsers.add_parser('lookup', help="Consulta IPs")
+    lookup.add_argument('ips', nargs='+')
+    lookup.add_argument('--db', default=GEOIP_DB_PATH)
+
+    args = parser.parse_args()
+
+    print("🌍 GeoIP Local - Sofia LiberNet")
+    print("=" * 60)
+
+    if args.command == 'import':
+        start = time.perf_counter()
+        result = build_database(read_csv_ranges(args.csv, args.format), args.output)
+        print(f"✅ {result} em {time.perf_counter() - start:.1f}s → {args.output}")
+    else:
+        db = GeoIPDatabase(args.db)
+        for ip in args.ips:
+            start = time.perf_counter()
+            location = db.lookup(ip)
+            elapsed = (time.perf_counter() - start) * 1e6
+            print(f"{ip}: {location} ({elapsed:.1f}µs)")
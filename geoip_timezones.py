@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+GeoIP Timezones - Sofia LiberNet
+
+Timezone IANA de uma localização importada para a base GeoIP local:
+- Timezone informado pela fonte (CSV com coluna timezone) tem prioridade
+- Países com uma zona: a zona do país (pytz.country_timezones)
+- Países com várias zonas: tabela por estado/província (nome ou sigla),
+  seguindo o zone.tab do tzdata
+- Região fora da tabela: zona principal do país (capital/maior população)
+
+A tabela cobre os países com várias zonas de onde vem a maior parte do
+tráfego; para incluir um país, acrescente-o em REGION_TIMEZONES e
+reimporte a base (python3 geoip_db.py import ...).
+
+Uso:
+    from geoip_timezones import timezone_for
+    timezone_for('BR', 'São Paulo')   # 'America/Sao_Paulo'
+    timezone_for('US', 'Arizona')     # 'America/Phoenix'
+"""
+
+import unicodedata
+from typing import Dict, Tuple
+
+import pytz
+
+# {país: {zona: [estados/províncias (nome em português/inglês/local e sigla)]}}
+REGION_TIMEZONES: Dict[str, Dict[str, list]] = {
+    'BR': {
+        'America/Sao_Paulo': ['SP', 'São Paulo', 'RJ', 'Rio de Janeiro', 'MG', 'Minas Gerais',
+                              'ES', 'Espírito Santo', 'PR', 'Paraná', 'SC', 'Santa Catarina',
+                              'RS', 'Rio Grande do Sul', 'GO', 'Goiás', 'DF', 'Distrito Federal',
+                              'Federal District'],
+        'America/Bahia': ['BA', 'Bahia'],
+        'America/Recife': ['PE', 'Pernambuco'],
+        'America/Fortaleza': ['CE', 'Ceará', 'MA', 'Maranhão', 'PI', 'Piauí',
+                              'RN', 'Rio Grande do Norte', 'PB', 'Paraíba'],
+        'America/Maceio': ['AL', 'Alagoas', 'SE', 'Sergipe'],
+        'America/Araguaina': ['TO', 'Tocantins'],
+        'America/Belem': ['PA', 'Pará', 'AP', 'Amapá'],
+        'America/Campo_Grande': ['MS', 'Mato Grosso do Sul'],
+        'America/Cuiaba': ['MT', 'Mato Grosso'],
+        'America/Manaus': ['AM', 'Amazonas'],
+        'America/Porto_Velho': ['RO', 'Rondônia'],
+        'America/Boa_Vista': ['RR', 'Roraima'],
+        'America/Rio_Branco': ['AC', 'Acre'],
+    },
+    'US': {
+        'America/New_York': ['CT', 'Connecticut', 'DE', 'Delaware', 'DC', 'District of Columbia',
+                             'Washington, D.C.', 'FL', 'Florida', 'GA', 'Georgia', 'ME', 'Maine',
+                             'MD', 'Maryland', 'MA', 'Massachusetts', 'NH', 'New Hampshire',
+                             'NJ', 'New Jersey', 'NY', 'New York', 'NC', 'North Carolina',
+                             'OH', 'Ohio', 'PA', 'Pennsylvania', 'RI', 'Rhode Island',
+                             'SC', 'South Carolina', 'VT', 'Vermont', 'VA', 'Virginia',
+                             'WV', 'West Virginia'],
+        'America/Detroit': ['MI', 'Michigan'],
+        'America/Indiana/Indianapolis': ['IN', 'Indiana'],
+        'America/Kentucky/Louisville': ['KY', 'Kentucky'],
+        'America/Chicago': ['AL', 'Alabama', 'AR', 'Arkansas', 'IL', 'Illinois', 'IA', 'Iowa',
+                            'KS', 'Kansas', 'LA', 'Louisiana', 'MN', 'Minnesota',
+                            'MS', 'Mississippi', 'MO', 'Missouri', 'NE', 'Nebraska',
+                            'ND', 'North Dakota', 'OK', 'Oklahoma', 'SD', 'South Dakota',
+                            'TN', 'Tennessee', 'TX', 'Texas', 'WI', 'Wisconsin'],
+        'America/Denver': ['CO', 'Colorado', 'MT', 'Montana', 'NM', 'New Mexico',
+                           'UT', 'Utah', 'WY', 'Wyoming'],
+        'America/Boise': ['ID', 'Idaho'],
+        'America/Phoenix': ['AZ', 'Arizona'],
+        'America/Los_Angeles': ['CA', 'California', 'NV', 'Nevada', 'OR', 'Oregon',
+                                'WA', 'Washington'],
+        'America/Anchorage': ['AK', 'Alaska'],
+        'Pacific/Honolulu': ['HI', 'Hawaii'],
+    },
+    'CA': {
+        'America/Toronto': ['ON', 'Ontario', 'QC', 'Quebec', 'Québec'],
+        'America/Vancouver': ['BC', 'British Columbia'],
+        'America/Edmonton': ['AB', 'Alberta', 'NT', 'Northwest Territories'],
+        'America/Regina': ['SK', 'Saskatchewan'],
+        'America/Winnipeg': ['MB', 'Manitoba'],
+        'America/Moncton': ['NB', 'New Brunswick'],
+        'America/Halifax': ['NS', 'Nova Scotia', 'PE', 'Prince Edward Island'],
+        'America/St_Johns': ['NL', 'Newfoundland and Labrador'],
+        'America/Whitehorse': ['YT', 'Yukon'],
+        'America/Iqaluit': ['NU', 'Nunavut'],
+    },
+    'MX': {
+        'America/Tijuana': ['Baja California'],
+        'America/Mazatlan': ['Baja California Sur', 'Sinaloa', 'Nayarit'],
+        'America/Hermosillo': ['Sonora'],
+        'America/Chihuahua': ['Chihuahua'],
+        'America/Monterrey': ['Nuevo León', 'Nuevo Leon', 'Coahuila', 'Tamaulipas'],
+        'America/Merida': ['Yucatán', 'Yucatan', 'Campeche'],
+        'America/Cancun': ['Quintana Roo'],
+    },
+    'AU': {
+        'Australia/Sydney': ['NSW', 'New South Wales', 'ACT', 'Australian Capital Territory'],
+        'Australia/Melbourne': ['VIC', 'Victoria'],
+        'Australia/Brisbane': ['QLD', 'Queensland'],
+        'Australia/Adelaide': ['SA', 'South Australia'],
+        'Australia/Perth': ['WA', 'Western Australia'],
+        'Australia/Hobart': ['TAS', 'Tasmania'],
+        'Australia/Darwin': ['NT', 'Northern Territory'],
+    },
+    'RU': {
+        'Europe/Kaliningrad': ['Kaliningrad', 'Kaliningrad Oblast'],
+        'Europe/Samara': ['Samara', 'Samara Oblast'],
+        'Asia/Yekaterinburg': ['Sverdlovsk', 'Sverdlovsk Oblast', 'Chelyabinsk', 'Chelyabinsk Oblast',
+                               'Bashkortostan', 'Perm', 'Perm Krai', 'Tyumen', 'Tyumen Oblast'],
+        'Asia/Omsk': ['Omsk', 'Omsk Oblast'],
+        'Asia/Novosibirsk': ['Novosibirsk', 'Novosibirsk Oblast'],
+        'Asia/Krasnoyarsk': ['Krasnoyarsk', 'Krasnoyarsk Krai'],
+        'Asia/Irkutsk': ['Irkutsk', 'Irkutsk Oblast'],
+        'Asia/Vladivostok': ['Primorsky', 'Primorsky Krai', 'Khabarovsk', 'Khabarovsk Krai'],
+    },
+}
+
+# Zona principal dos países com várias zonas quando a região não está na tabela
+# (demais países: primeira zona do pytz, que já é a principal)
+COUNTRY_TIMEZONES: Dict[str, str] = {
+    'BR': 'America/Sao_Paulo',
+    'US': 'America/New_York',
+    'CA': 'America/Toronto',
+    'AU': 'Australia/Sydney',
+    'RU': 'Europe/Moscow',
+    'UA': 'Europe/Kyiv',
+    'UZ': 'Asia/Tashkent',
+}
+
+
+def _normalize(region: str) -> str:
+    """Sem acentos, sem diferença de caixa ("São Paulo" == "Sao Paulo")"""
+    text = unicodedata.normalize('NFKD', region or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+
+
+_region_index: Dict[Tuple[str, str], str] = {
+    (country_code, _normalize(region)): zone
+    for country_code, zones in REGION_TIMEZONES.items()
+    for zone, regions in zones.items()
+    for region in regions
+}
+
+
+def timezone_for(country_code: str, region: str = '', timezone: str = '') -> str:
+    """
+    Timezone IANA de uma localização
+
+    Args:
+        country_code: ISO 3166-1 alpha-2
+        region: Estado/província (nome ou sigla)
+        timezone: Timezone informado pela fonte (usado se for um nome IANA)
+
+    Returns:
+        Nome IANA ('UTC' se o país for desconhecido)
+    """
+    if timezone and timezone in pytz.all_timezones_set:
+        return timezone
+    country_code = (country_code or '').upper()
+    zones = pytz.country_timezones.get(country_code, []) if country_code else []
+    if len(zones) <= 1:
+        return zones[0] if zones else 'UTC'
+    zone = _region_index.get((country_code, _normalize(region)))
+    return zone or COUNTRY_TIMEZONES.get(country_code, zones[0])
+
+
+if __name__ == "__main__":
+    print("🕐 GeoIP Timezones - Sofia LiberNet")
+    print("=" * 60)
+
+    for country_code, region in [('BR', 'São Paulo'), ('BR', 'Sao Paulo'), ('BR', 'Pará'),
+                                 ('US', 'Colorado'), ('US', 'Arizona'), ('PT', 'Lisboa'),
+                                 ('BR', ''), ('XX', '')]:
+        print(f"{country_code} {region or '-':12} → {timezone_for(country_code, region)}")
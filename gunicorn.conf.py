@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Config - Sofia LiberNet
+
+Configuração de produção para tráfego de chat (quase todo espera de I/O:
+OpenAI, ferramentas de internet, relays Nostr):
+- Workers gthread: cada worker atende várias requisições em threads
+- Workers dimensionados pela CPU e pela memória disponíveis (cgroup do
+  container quando houver, senão a máquina)
+- Threads por worker configuráveis; conexões HTTP/OpenAI já são pools
+  compartilhados e thread-safe (http_session, llm_gateway)
+- Tempo de cada requisição limitado pelos deadlines da aplicação
+  (LLM_REQUEST_BUDGET, timeouts das ferramentas); o timeout do gunicorn só
+  vigia o heartbeat do worker
+
+Uso:
+    gunicorn -c gunicorn.conf.py app:app
+
+    # Ajustes por variável de ambiente
+    GUNICORN_WORKERS=3 GUNICORN_THREADS=32 gunicorn -c gunicorn.conf.py app:app
+
+Dimensionamento:
+    workers = min(CPUs, memória * 0.75 / GUNICORN_WORKER_MEMORY_MB), no mínimo 1
+    threads = GUNICORN_THREADS (padrão 16)
+    capacidade = workers * threads turnos de chat simultâneos
+
+    Mantenha HTTP_POOL_MAXSIZE e LLM_MAX_CONNECTIONS >= GUNICORN_THREADS para
+    que as threads não disputem conexões. O pool de ferramentas
+    (TOOL_MAX_WORKERS) segue GUNICORN_THREADS por padrão (2x, várias
+    ferramentas por rodada); se fixá-lo, mantenha-o >= GUNICORN_THREADS.
+
+    preload_app fica desligado: os módulos abrem conexões SQLite e pools de
+    threads no import, que não podem ser herdados pelo fork dos workers.
+"""
+
+import os
+
+GUNICORN_WORKER_MEMORY_MB = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', '350'))
+MEMORY_HEADROOM = 0.75  # fração da memória destinada aos workers
+
+
+def _read_first_line(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return ''
+
+
+def available_cpus() -> float:
+    """CPUs disponíveis: quota do cgroup (v2 ou v1) ou afinidade do processo"""
+    # cgroup v2: "max 100000" ou "200000 100000"
+    quota_period = _read_first_line('/sys/fs/cgroup/cpu.max').split()
+    if len(quota_period) == 2 and quota_period[0] != 'max':
+        return int(quota_period[0]) / int(quota_period[1])
+
+    # cgroup v1
+    quota = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory_mb() -> int:
+    """Memória disponível: limite do cgroup (v2 ou v1) ou memória total da máquina"""
+    total_mb = 0
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    total_mb = int(line.split()[1]) // 1024
+                    break
+    except OSError:
+        pass
+
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = _read_first_line(path)
+        if limit.isdigit():
+            limit_mb = int(limit) // (1024 * 1024)
+            # v1 sem limite reporta um valor gigante
+            if not total_mb or limit_mb < total_mb:
+                return limit_mb
+
+    return total_mb or 1024
+
+
+def default_workers() -> int:
+    cpus = max(1, int(available_cpus()))
+    by_memory = int(available_memory_mb() * MEMORY_HEADROOM) // GUNICORN_WORKER_MEMORY_MB
+    return max(1, min(cpus, by_memory))
+
+
+# ============= SERVIDOR =============
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5050')
+
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', '0')) or default_workers()
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+
+# Com gthread, o timeout só vigia o heartbeat do processo (loop principal do
+# worker travado → reciclado); uma thread de requisição presa NÃO é interrompida.
+# O tempo de uma requisição é limitado apenas por LLM_REQUEST_BUDGET e pelos
+# timeouts das ferramentas (ver ADMISSION_SLOT_TTL em admission.py)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla workers periodicamente (com jitter para não reiniciarem juntos)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+preload_app = False
+
+# Heartbeat dos workers em memória (evita travas de disco em overlayfs)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    server.log.info(
+        f"[GUNICORN] {workers} worker(s) gthread x {threads} threads "
+        f"(CPUs: {available_cpus():g}, memória: {available_memory_mb()} MB)"
+    )
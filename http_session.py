@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HTTP Session - Sofia LiberNet
+
+Sessão requests compartilhada para as chamadas HTTP externas:
+- Pool de conexões por host com keep-alive (sem novo TCP+TLS a cada chamada)
+- Retry com backoff exponencial (curto) para falhas de conexão e 5xx
+- 429 não é repetido: Retry-After pode pedir minutos e a resposta volta
+  na hora para quem chamou decidir (fallback, cache, erro)
+- Retry de status/leitura apenas em métodos idempotentes (POST não é repetido)
+- Caminhos interativos (chat/ferramentas) usam retry_reads=False: um timeout
+  de leitura não vira 3x o timeout
+- Timeout padrão por host (chamadas sem timeout explícito)
+
+Uso:
+    session = create_session({'api.coingecko.com': 5})
+    response = session.get('https://api.coingecko.com/api/v3/ping')
+"""
+
+import os
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+Timeout = Union[float, Tuple[float, float]]
+
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '16'))   # hosts com pool próprio
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '16'))           # conexões por host
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', '0.3'))
+HTTP_CONNECT_TIMEOUT = 3.05
+HTTP_DEFAULT_TIMEOUT: Timeout = (HTTP_CONNECT_TIMEOUT, 10)
+
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+class HTTPSession(requests.Session):
+    """requests.Session com timeout padrão por host"""
+
+    def __init__(self, host_timeouts: Optional[Dict[str, Timeout]] = None,
+                 default_timeout: Timeout = HTTP_DEFAULT_TIMEOUT):
+        """
+        Args:
+            host_timeouts: {host: timeout} - número = timeout de leitura
+            default_timeout: Timeout dos demais hosts
+        """
+        super().__init__()
+        self.default_timeout = default_timeout
+        self.host_timeouts = {
+            host: (HTTP_CONNECT_TIMEOUT, timeout) if isinstance(timeout, (int, float)) else timeout
+            for host, timeout in (host_timeouts or {}).items()
+        }
+
+    def timeout_for(self, url: str) -> Timeout:
+        host = (urlparse(url).hostname or '').lower()
+        return self.host_timeouts.get(host, self.default_timeout)
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout_for(url)
+        return super().request(method, url, *args, **kwargs)
+
+
+def create_session(host_timeouts: Optional[Dict[str, Timeout]] = None,
+                   default_timeout: Timeout = HTTP_DEFAULT_TIMEOUT,
+                   retries: int = HTTP_RETRIES,
+                   backoff_factor: float = HTTP_BACKOFF_FACTOR,
+                   retry_reads: bool = True) -> HTTPSession:
+    """
+    Cria uma sessão com pools, keep-alive, retry e timeouts por host
+
+    Args:
+        host_timeouts: {host: timeout} para hosts conhecidos
+        default_timeout: Timeout dos demais hosts
+        retries: Tentativas extras por requisição
+        backoff_factor: Base do backoff exponencial (s)
+        retry_reads: Repetir após timeout/erro de leitura (False em caminhos interativos)
+
+    Returns:
+        HTTPSession pronta para uso (uma por cliente)
+    """
+    session = HTTPSession(host_timeouts, default_timeout)
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries if retry_reads else 0,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        # Retry-After sem teto bloquearia a thread do request; só backoff próprio
+        respect_retry_after_header=False,
+        # Depois das tentativas, devolver a última resposta (status_code continua checável)
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                          pool_maxsize=HTTP_POOL_MAXSIZE,
+                          max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+if __name__ == "__main__":
+    import time
+
+    print("🌐 HTTP Session - Sofia LiberNet")
+    print("=" * 60)
+
+    url = 'https://api.coingecko.com/api/v3/ping'
+    session = create_session({'api.coingecko.com': 5})
+
+    for label, get in [('requests.get', lambda: requests.get(url, timeout=5)),
+                       ('session.get', lambda: session.get(url))]:
+        start = time.perf_counter()
+        try:
+            for _ in range(5):
+                get()
+            print(f"{label}: {(time.perf_counter() - start) / 5 * 1000:.1f}ms por chamada")
+        except requests.exceptions.RequestException as e:
+            print(f"{label}: erro {e}")
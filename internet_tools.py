@@ -9,22 +9,73 @@ from datetime import datetime
 import pytz
 import json
 import os
-import time
 from typing import Dict, Any, Optional, List
 from bs4 import BeautifulSoup
-import re
+
+from http_session import create_session
+from ttl_cache import TTLCache, CACHE_DB_PATH
+from geoip_db import geoip_db
+from rate_limiter import TokenBucket, RateLimitExceeded
+from page_extractor import fetch_page, UnsupportedContent
+
+# Timeouts de leitura por host (s); demais URLs usam o padrão da sessão
+INTERNET_HOST_TIMEOUTS = {
+    'ipapi.co': 5,
+    'wttr.in': 5,
+    'api.duckduckgo.com': 5,
+    'api.coingecko.com': 5,
+    'api.search.brave.com': 10,
+    'news.google.com': 10,
+}
+
+# TTL por tipo de consulta (s); falhas ficam CACHE_NEGATIVE_TTL em cache
+INTERNET_CACHE_TTLS = {
+    'location': 24 * 3600,
+    'weather': 30 * 60,
+    'search': 60 * 60,  # DuckDuckGo (search_web); Brave, notícias, preços e páginas: tool_cache
+}
+# Janela após o TTL em que o valor vencido é servido enquanto atualiza em segundo plano
+INTERNET_CACHE_STALE_TTLS = {
+    'location': 7 * 24 * 3600,
+    'weather': 30 * 60,
+    'search': 6 * 3600,
+}
+INTERNET_CACHE_L2 = os.getenv('INTERNET_CACHE_L2', 'true').lower() == 'true'
+
+# Brave Search free tier: 1 req/s somando todos os workers
+BRAVE_RATE_PER_SECOND = float(os.getenv('BRAVE_RATE_PER_SECOND', '1.0'))
+BRAVE_MAX_WAIT = float(os.getenv('BRAVE_MAX_WAIT', '2.0'))  # acima disso, fallback DuckDuckGo
+
+
+def _query_key(query: str) -> str:
+    """Consulta na chave do cache: sem diferença de caixa e espaços"""
+    return ' '.join((query or '').split()).casefold()
+
 
 class InternetTools:
     """Ferramentas de internet para a Sofia"""
 
-    def __init__(self):
-        self.cache = {}  # Cache simples para evitar chamadas repetidas
-        self._last_brave_request = 0  # Track last Brave API call for rate limiting
+    def __init__(self, session: Optional[requests.Session] = None, cache: Optional[TTLCache] = None):
+        """
+        Args:
+            session: Sessão HTTP (padrão: sessão própria com pool e retry)
+            cache: Cache das consultas (padrão: LRU com TTL, stale-while-revalidate e L2 SQLite)
+        """
+        # Chamadas dentro do chat: sem retry de leitura (timeout já é o teto)
+        self.session = session or create_session(INTERNET_HOST_TIMEOUTS, retry_reads=False)
+        # Chamadas simultâneas à mesma consulta compartilham uma busca (single-flight)
+        # TTLCache vazio é falsy (__len__), por isso "is not None"
+        self.cache = cache if cache is not None else TTLCache(
+            INTERNET_CACHE_TTLS, stale_ttls=INTERNET_CACHE_STALE_TTLS,
+            l2_path=CACHE_DB_PATH if INTERNET_CACHE_L2 else None
+        )
+        self.brave_limiter = TokenBucket('brave_search', rate=BRAVE_RATE_PER_SECOND)
 
     def get_location_from_ip(self, ip_address: str) -> Dict[str, Any]:
         """
         Obtém localização a partir do IP do usuário
-        Usa ipapi.co (gratuito, sem necessidade de API key)
+        Usa a base GeoIP local (geoip_db.py) e, se o IP não estiver nela,
+        ipapi.co (gratuito, sem necessidade de API key)
         """
         # Não rastrear IPs locais
         if ip_address in ['127.0.0.1', 'localhost', '::1']:
@@ -37,13 +88,27 @@ class InternetTools:
                 'longitude': 0
             }
 
-        # Verificar cache
-        cache_key = f'location_{ip_address}'
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        # Base local (mmap + busca binária) primeiro; ipapi.co só quando o IP não está nela
+        location = geoip_db.lookup(ip_address)
+        if location:
+            return location
 
+        location = self.cache.get_or_set('location', ip_address, lambda: self._fetch_location(ip_address))
+        if location:
+            return location
+
+        return {
+            'city': 'Desconhecida',
+            'region': 'Desconhecida',
+            'country': 'Desconhecido',
+            'timezone': 'UTC',
+            'latitude': 0,
+            'longitude': 0
+        }
+
+    def _fetch_location(self, ip_address: str) -> Optional[Dict[str, Any]]:
         try:
-            response = requests.get(f'https://ipapi.co/{ip_address}/json/', timeout=5)
+            response = self.session.get(f'https://ipapi.co/{ip_address}/json/')
             if response.status_code == 200:
                 data = response.json()
                 location = {
@@ -56,19 +121,11 @@ class InternetTools:
                     'longitude': data.get('longitude', 0),
                     'currency': data.get('currency', 'USD')
                 }
-                self.cache[cache_key] = location
                 return location
         except Exception as e:
             print(f"[INTERNET] Erro ao buscar localização: {e}")
 
-        return {
-            'city': 'Desconhecida',
-            'region': 'Desconhecida',
-            'country': 'Desconhecido',
-            'timezone': 'UTC',
-            'latitude': 0,
-            'longitude': 0
-        }
+        return None
 
     def get_current_time(self, timezone_str: str) -> Dict[str, str]:
         """
@@ -101,19 +158,21 @@ class InternetTools:
         """
         Obtém informações de clima usando wttr.in (gratuito, sem API key)
         """
-        cache_key = f'weather_{latitude}_{longitude}'
-        if cache_key in self.cache:
-            cached = self.cache[cache_key]
-            # Cache válido por 30 minutos
-            if (datetime.now() - cached['cached_at']).seconds < 1800:
-                return cached['data']
+        weather = self.cache.get_or_set('weather', f'{latitude}_{longitude}',
+                                        lambda: self._fetch_weather(latitude, longitude))
+        if weather:
+            return weather
 
+        return {
+            'temperature_c': 'N/A',
+            'description': 'Informação não disponível',
+            'humidity': 'N/A'
+        }
+
+    def _fetch_weather(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
         try:
             # Usar wttr.in com formato JSON
-            response = requests.get(
-                f'https://wttr.in/{latitude},{longitude}?format=j1',
-                timeout=5
-            )
+            response = self.session.get(f'https://wttr.in/{latitude},{longitude}?format=j1')
             if response.status_code == 200:
                 data = response.json()
                 current = data['current_condition'][0]
@@ -130,35 +189,31 @@ class InternetTools:
                     'visibility_km': current['visibility'],
                     'uv_index': current['uvIndex']
                 }
-                self.cache[cache_key] = {
-                    'data': weather,
-                    'cached_at': datetime.now()
-                }
                 return weather
         except Exception as e:
             print(f"[INTERNET] Erro ao buscar clima: {e}")
 
-        return {
-            'temperature_c': 'N/A',
-            'description': 'Informação não disponível',
-            'humidity': 'N/A'
-        }
+        return None
 
     def search_web(self, query: str, num_results: int = 5) -> list:
         """
         Busca na web usando DuckDuckGo Instant Answer API (gratuito)
         """
+        results = self.cache.get_or_set('search', f'ddg:{num_results}:{_query_key(query)}',
+                                        lambda: self._fetch_duckduckgo(query, num_results))
+        return results if results is not None else []
+
+    def _fetch_duckduckgo(self, query: str, num_results: int) -> Optional[list]:
         try:
             # DuckDuckGo Instant Answer API
-            response = requests.get(
+            response = self.session.get(
                 'https://api.duckduckgo.com/',
                 params={
                     'q': query,
                     'format': 'json',
                     'no_html': 1,
                     'skip_disambig': 1
-                },
-                timeout=5
+                }
             )
 
             if response.status_code == 200:
@@ -188,22 +243,25 @@ class InternetTools:
         except Exception as e:
             print(f"[INTERNET] Erro ao buscar na web: {e}")
 
-        return []
+        return None
 
     def get_bitcoin_price(self) -> Dict[str, Any]:
         """
         Obtém preço atual do Bitcoin de CoinGecko (gratuito, sem API key)
         """
+        # Sem cache aqui: o tool_cache é a camada de cache das ferramentas
+        return self._fetch_bitcoin_price()
+
+    def _fetch_bitcoin_price(self) -> Dict[str, Any]:
         try:
-            response = requests.get(
+            response = self.session.get(
                 'https://api.coingecko.com/api/v3/simple/price',
                 params={
                     'ids': 'bitcoin',
                     'vs_currencies': 'usd,brl',
                     'include_24hr_change': 'true',
                     'include_market_cap': 'true'
-                },
-                timeout=5
+                }
             )
 
             if response.status_code == 200:
@@ -227,16 +285,18 @@ class InternetTools:
         Obtém preço de qualquer criptomoeda do CoinGecko
         Exemplos de IDs: bitcoin, ethereum, cardano, solana, etc
         """
+        return self._fetch_crypto_price(crypto_id)
+
+    def _fetch_crypto_price(self, crypto_id: str) -> Dict[str, Any]:
         try:
-            response = requests.get(
+            response = self.session.get(
                 'https://api.coingecko.com/api/v3/simple/price',
                 params={
                     'ids': crypto_id,
                     'vs_currencies': 'usd,brl',
                     'include_24hr_change': 'true',
                     'include_market_cap': 'true'
-                },
-                timeout=5
+                }
             )
 
             if response.status_code == 200:
@@ -261,6 +321,9 @@ class InternetTools:
         Acessa qualquer URL e extrai o conteúdo principal
         Similar ao WebFetch do Claude
         """
+        return self._fetch_webpage(url, max_length)
+
+    def _fetch_webpage(self, url: str, max_length: int) -> Dict[str, Any]:
         try:
             # Headers para simular navegador real
             headers = {
@@ -269,44 +332,20 @@ class InternetTools:
                 'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
             }
 
-            response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-            response.raise_for_status()
-
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Remover scripts, styles, etc
-            for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                tag.decompose()
-
-            # Extrair texto principal
-            # Priorizar tags de conteúdo
-            main_content = soup.find('main') or soup.find('article') or soup.find('body')
-
-            if main_content:
-                text = main_content.get_text(separator=' ', strip=True)
-            else:
-                text = soup.get_text(separator=' ', strip=True)
-
-            # Limpar texto
-            text = re.sub(r'\s+', ' ', text).strip()
-
-            # Limitar tamanho
-            if len(text) > max_length:
-                text = text[:max_length] + '...'
-
-            # Extrair título
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else url
+            # Download em streaming com limite de bytes; para ao ter texto suficiente
+            page = fetch_page(self.session, url, max_length, headers=headers)
 
             return {
                 'url': url,
-                'title': title_text,
-                'content': text,
-                'length': len(text),
+                'title': page['title'],
+                'content': page['content'],
+                'length': len(page['content']),
+                'truncated': page['truncated'],
                 'status': 'success'
             }
 
+        except UnsupportedContent as e:
+            return {'error': f'Tipo de conteúdo não suportado: {e}', 'url': url}
         except requests.exceptions.Timeout:
             return {'error': 'Timeout ao acessar URL', 'url': url}
         except requests.exceptions.RequestException as e:
@@ -314,26 +353,39 @@ class InternetTools:
         except Exception as e:
             return {'error': f'Erro ao processar conteúdo: {str(e)}', 'url': url}
 
-    def web_search_brave(self, query: str, count: int = 5) -> List[Dict[str, Any]]:
+    def web_search_brave(self, query: str, count: int = 5, user_key: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Busca na web usando Brave Search API (gratuita até 2k queries/mês)
         Retorna resultados reais de busca, similar ao Google Search
+
+        Args:
+            user_key: Identificador do usuário (fila justa no rate limit)
         """
         api_key = os.getenv('BRAVE_SEARCH_API_KEY')
 
         # Fallback para DuckDuckGo se não houver API key
         if not api_key:
             print("[INTERNET] BRAVE_SEARCH_API_KEY não configurada, usando DuckDuckGo")
-            return self.search_web(query, count)
+            return self._fetch_duckduckgo(query, count) or []
 
-        # Rate limiting: 1 request/second para Brave API (limite free tier)
-        time_since_last = time.time() - self._last_brave_request
-        if time_since_last < 1.0:
-            time.sleep(1.0 - time_since_last)
-        self._last_brave_request = time.time()
+        # Sem cache aqui (nem no fallback): o tool_cache guarda o resultado da ferramenta
+        try:
+            results = self._fetch_brave(query, count, api_key, user_key)
+        except RateLimitExceeded:
+            print("[INTERNET] Brave Search no limite de taxa, fallback para DuckDuckGo")
+            return self._fetch_duckduckgo(query, count) or []
+        if results is None:
+            return self._fetch_duckduckgo(query, count) or []
+        return results
+
+    def _fetch_brave(self, query: str, count: int, api_key: str,
+                     user_key: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        # Rate limiting compartilhado entre workers; espera longa demais vira fallback
+        if not self.brave_limiter.acquire(key=user_key, max_wait=BRAVE_MAX_WAIT):
+            raise RateLimitExceeded('brave_search')
 
         try:
-            response = requests.get(
+            response = self.session.get(
                 'https://api.search.brave.com/res/v1/web/search',
                 headers={
                     'X-Subscription-Token': api_key,
@@ -344,8 +396,7 @@ class InternetTools:
                     'count': count
                     # Nota: search_lang removido - não suportado no free tier
                     # safesearch removido - usar default
-                },
-                timeout=10
+                }
             )
 
             if response.status_code == 200:
@@ -364,21 +415,25 @@ class InternetTools:
                 return results
             else:
                 print(f"[INTERNET] Brave Search erro {response.status_code}, fallback para DuckDuckGo")
-                return self.search_web(query, count)
 
         except Exception as e:
             print(f"[INTERNET] Erro Brave Search: {e}, fallback para DuckDuckGo")
-            return self.search_web(query, count)
+
+        return None
 
     def search_news(self, query: str, count: int = 5) -> List[Dict[str, Any]]:
         """
         Busca notícias recentes usando Google News RSS (gratuito)
         """
+        results = self._fetch_news(query, count)
+        return results if results is not None else []
+
+    def _fetch_news(self, query: str, count: int) -> Optional[List[Dict[str, Any]]]:
         try:
             # Google News RSS - gratuito e sem API key
             rss_url = f'https://news.google.com/rss/search?q={query}&hl=pt-BR&gl=BR&ceid=BR:pt-419'
 
-            response = requests.get(rss_url, timeout=10)
+            response = self.session.get(rss_url)
 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'xml')
@@ -404,7 +459,7 @@ class InternetTools:
         except Exception as e:
             print(f"[INTERNET] Erro ao buscar notícias: {e}")
 
-        return []
+        return None
 
     def get_user_context(self, ip_address: str) -> Dict[str, Any]:
         """
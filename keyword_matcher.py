@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher - Sofia LiberNet
+
+Busca de múltiplas palavras-chave em uma única passada (Aho-Corasick):
+- Autômato construído uma vez a partir das listas de palavras
+- Comparação com casefold Unicode (maiúsculas/minúsculas, ß → ss, etc.)
+- Respeita limites de palavra (ex.: 'pau' não casa em 'paulo')
+- Custo por texto linear no tamanho do conteúdo, independente do número de palavras
+
+Uso:
+    matcher = KeywordMatcher({'explicit': ['porn', 'xxx'], 'art': ['photoshoot']})
+    matcher.find_all("New XXX photoshoot")
+    # [(4, 7, 'xxx', 'explicit'), (8, 17, 'photoshoot', 'art')]
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class KeywordMatcher:
+    """Autômato Aho-Corasick para palavras-chave agrupadas por rótulo"""
+
+    def __init__(self, groups: Dict[str, Iterable[str]], word_boundary: bool = True):
+        """
+        Args:
+            groups: {rótulo: [palavras-chave]} - a mesma palavra pode estar em vários rótulos
+            word_boundary: Exigir limite de palavra antes e depois de cada ocorrência
+        """
+        self.word_boundary = word_boundary
+
+        # Nó = índice; transições em dicts, fail links e saídas por nó
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        # Padrão = (palavra normalizada, rótulos)
+        self._patterns: List[Tuple[str, Tuple[str, ...]]] = []
+
+        labels_by_keyword: Dict[str, List[str]] = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                normalized = keyword.casefold().strip()
+                if normalized:
+                    labels_by_keyword.setdefault(normalized, []).append(label)
+
+        for keyword, labels in labels_by_keyword.items():
+            self._add_pattern(keyword, tuple(labels))
+
+        self._build_fail_links()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def _add_pattern(self, keyword: str, labels: Tuple[str, ...]):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+
+        self._output[node].append(len(self._patterns))
+        self._patterns.append((keyword, labels))
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+
+                # Saídas herdadas do sufixo mais longo
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """
+        Encontra todas as ocorrências em uma passada
+
+        Args:
+            text: Texto a analisar
+
+        Returns:
+            Lista de (início, fim, palavra, rótulo); posições referem-se ao texto
+            após casefold (iguais ao original para a grande maioria dos idiomas)
+        """
+        folded = text.casefold()
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self._patterns
+        length = len(folded)
+        matches = []
+        node = 0
+
+        for index, char in enumerate(folded):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            if not output[node]:
+                continue
+
+            end = index + 1
+            for pattern_id in output[node]:
+                keyword, labels = patterns[pattern_id]
+                start = end - len(keyword)
+
+                if self.word_boundary:
+                    if start > 0 and _is_word_char(folded[start - 1]) and _is_word_char(keyword[0]):
+                        continue
+                    if end < length and _is_word_char(folded[end]) and _is_word_char(keyword[-1]):
+                        continue
+
+                for label in labels:
+                    matches.append((start, end, keyword, label))
+
+        return matches
+
+    def distinct_matches(self, text: str) -> Dict[str, Set[str]]:
+        """
+        Palavras distintas encontradas, agrupadas por rótulo
+
+        Returns:
+            {rótulo: {palavras}} apenas para rótulos com ocorrências
+        """
+        found: Dict[str, Set[str]] = {}
+        for _, _, keyword, label in self.find_all(text):
+            found.setdefault(label, set()).add(keyword)
+        return found
+
+    def contains_any(self, text: str) -> bool:
+        """True se qualquer palavra-chave ocorrer no texto"""
+        return bool(self.find_all(text))
+
+
+if __name__ == "__main__":
+    import time
+
+    print("🔎 Keyword Matcher - Sofia LiberNet")
+    print("=" * 60)
+
+    matcher = KeywordMatcher({
+        'explicit': ['porn', 'xxx', 'pau', 'anal sex'],
+        'art': ['photoshoot', 'nu artístico'],
+    })
+
+    for text in ["Novo PHOTOSHOOT hoje", "Paulo foi ao pau", "XXX anal sex", "Nu Artístico!"]:
+        print(f"{text!r}: {matcher.find_all(text)}")
+
+    text = "lorem ipsum dolor sit amet " * 40
+    start = time.perf_counter()
+    for _ in range(1000):
+        matcher.find_all(text)
+    elapsed = time.perf_counter() - start
+    print(f"\n1000 textos de {len(text)} caracteres em {elapsed:.3f}s")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+LLM Gateway - Sofia LiberNet
+
+Ponto único de acesso à OpenAI para app.py, api_routes.py e ml_system.py:
+- Um cliente httpx por processo, com pool e keep-alive ajustados
+- Timeout por chamada derivado do orçamento (deadline) da requisição
+- Retentativas com backoff exponencial + jitter em 429/5xx/falhas de conexão
+  (respeitando Retry-After e o deadline)
+- Circuit breaker: após falhas seguidas, falha na hora por um tempo em vez de
+  prender workers do gunicorn esperando uma OpenAI degradada
+- Embeddings com disjuntor próprio: falhas do endpoint de embeddings não
+  derrubam o chat (e vice-versa)
+
+Uso:
+    from llm_gateway import llm_gateway, LLMUnavailable
+    deadline = llm_gateway.deadline()  # orçamento da requisição
+    response = llm_gateway.chat(deadline=deadline, model='gpt-4o-mini', messages=[...])
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+
+LLM_REQUEST_BUDGET = float(os.getenv('LLM_REQUEST_BUDGET', '90'))  # abaixo do timeout do gunicorn (120s)
+LLM_CALL_TIMEOUT = float(os.getenv('LLM_CALL_TIMEOUT', '60'))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_MAX = 8.0
+LLM_MIN_ATTEMPT_SECONDS = 2.0  # não inicia tentativa com menos tempo que isso
+
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+LLM_MAX_KEEPALIVE = int(os.getenv('LLM_MAX_KEEPALIVE', '10'))
+LLM_KEEPALIVE_EXPIRY = 30.0
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+BREAKER_RECOVERY_SECONDS = float(os.getenv('LLM_BREAKER_RECOVERY', '30'))
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+class LLMUnavailable(Exception):
+    """OpenAI indisponível (circuito aberto, deadline esgotado ou retentativas esgotadas)"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Disjuntor simples: closed → open (após N falhas seguidas) → half-open (1 teste)"""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 recovery_seconds: float = BREAKER_RECOVERY_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if now - self._opened_at >= self.recovery_seconds:
+            return 'half-open'
+        return 'open'
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Pode chamar? No half-open, só uma chamada de teste por vez."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                # Reabre (ou abre) e reinicia a contagem de recuperação
+                if self._opened_at is None:
+                    print(f"[LLM] 🔌 Circuito aberto após {self._failures} falhas seguidas")
+                self._opened_at = time.monotonic()
+
+
+class LLMGateway:
+    """Cliente OpenAI compartilhado com deadlines, retentativas e circuit breaker"""
+
+    def __init__(self, api_key: str = OPENAI_API_KEY, max_retries: int = LLM_MAX_RETRIES,
+                 call_timeout: float = LLM_CALL_TIMEOUT, breaker: Optional[CircuitBreaker] = None,
+                 embedding_breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            api_key: Chave da OpenAI
+            max_retries: Retentativas após a primeira tentativa
+            call_timeout: Timeout máximo de uma tentativa (s)
+            breaker: Circuit breaker do chat (padrão: um por processo)
+            embedding_breaker: Circuit breaker dos embeddings (padrão: um por processo)
+        """
+        self.max_retries = max_retries
+        self.call_timeout = call_timeout
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.embedding_breaker = embedding_breaker if embedding_breaker is not None else CircuitBreaker()
+
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                                keepalive_expiry=LLM_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(call_timeout, connect=LLM_CONNECT_TIMEOUT)
+        )
+        # Retentativas do SDK desligadas: a política fica aqui (deadline + breaker)
+        self.client = openai.OpenAI(api_key=api_key, http_client=self.http_client, max_retries=0)
+
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'deadline_exceeded': 0}
+
+    @staticmethod
+    def deadline(budget: float = LLM_REQUEST_BUDGET) -> float:
+        """Deadline absoluto (time.monotonic()) para uma requisição"""
+        return time.monotonic() + budget
+
+    def _stat(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, LLM_BACKOFF_MAX)
+        # Full jitter: evita que todos os workers retentem juntos
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    def _call(self, create, deadline: Optional[float], breaker: CircuitBreaker, **params) -> Any:
+        deadline = deadline if deadline is not None else self.deadline()
+        self._stat('calls')
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining < LLM_MIN_ATTEMPT_SECONDS:
+                self._stat('deadline_exceeded')
+                raise LLMUnavailable(f"Tempo esgotado aguardando a OpenAI: {last_error or 'sem tempo restante'}")
+
+            if not breaker.allow():
+                self._stat('rejected')
+                raise LLMUnavailable("OpenAI temporariamente indisponível", breaker.retry_after())
+
+            try:
+                response = create(timeout=min(self.call_timeout, remaining), **params)
+                breaker.record_success()
+                return response
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+                # 429 é cota/limite, não degradação: não conta para o disjuntor
+                if isinstance(e, openai.RateLimitError):
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                if attempt == self.max_retries:
+                    break
+                delay = self._backoff(attempt, e)
+                if time.monotonic() + delay + LLM_MIN_ATTEMPT_SECONDS > deadline:
+                    break
+                self._stat('retries')
+                print(f"[LLM] ⚠️ {type(e).__name__}, nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+            except openai.APIStatusError:
+                # 4xx: a OpenAI respondeu (o problema é a requisição)
+                breaker.record_success()
+                raise
+            except Exception:
+                # Qualquer outro erro (validação da resposta, parâmetros, SDK) também
+                # devolve a vaga de teste do half-open; senão o disjuntor fica preso
+                breaker.record_failure()
+                raise
+
+        self._stat('failures')
+        raise LLMUnavailable(f"Falha ao chamar a OpenAI: {last_error}", breaker.retry_after())
+
+    def chat(self, deadline: Optional[float] = None, **params) -> Any:
+        """
+        chat.completions.create com deadline, retentativas e circuit breaker
+
+        Args:
+            deadline: Deadline absoluto (time.monotonic()); padrão: LLM_REQUEST_BUDGET a partir de agora
+            **params: Parâmetros da OpenAI (model, messages, tools, ...)
+
+        Raises:
+            LLMUnavailable: Circuito aberto, deadline esgotado ou retentativas esgotadas
+        """
+        return self._call(self.client.chat.completions.create, deadline, self.breaker, **params)
+
+    def embeddings(self, deadline: Optional[float] = None, **params) -> Any:
+        """embeddings.create com a política de chat(), mas com disjuntor próprio"""
+        return self._call(self.client.embeddings.create, deadline, self.embedding_breaker, **params)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'breaker': self.breaker.state, 'retry_after': round(self.breaker.retry_after(), 1),
+                'embedding_breaker': self.embedding_breaker.state}
+
+
+# Instância global
+llm_gateway = LLMGateway()
+
+
+if __name__ == "__main__":
+    print("🧠 LLM Gateway - Sofia LiberNet")
+    print("=" * 60)
+
+    breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=1.0)
+    for i in range(4):
+        breaker.record_failure()
+        print(f"falha {i + 1}: {breaker.state}")
+    print(f"permite? {breaker.allow()} (aguardar {breaker.retry_after():.1f}s)")
+    time.sleep(1.0)
+    print(f"após recuperação: {breaker.state}, teste permitido? {breaker.allow()}, outro? {breaker.allow()}")
+    breaker.record_success()
+    print(f"teste ok: {breaker.state}")
+    print(llm_gateway.get_stats())
@@ -7,6 +7,9 @@ Integração com LNBits e OpenNode para pagamentos Lightning Network
 import requests
 import os
 from typing import Optional, Dict
+from urllib.parse import urlparse
+
+from http_session import create_session
 
 # === LOAD SECRETS FROM FILES ===
 def _load_lnbits_env():
@@ -50,11 +53,13 @@ LNBITS_WALLET_ID = _lnbits_cfg.get('LNBITS_WALLET_ID', '')
 
 
 class LNBitsClient:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         self.url = LNBITS_URL
         self.invoice_key = LNBITS_INVOICE_KEY
         self.admin_key = LNBITS_ADMIN_KEY
         self.wallet_id = LNBITS_WALLET_ID
+        # Conexões reaproveitadas com o LNBits (keep-alive + retry)
+        self.session = session or create_session({urlparse(self.url).hostname: 10})
 
     def create_invoice(self, amount_sats: int, memo: str) -> Optional[Dict]:
         """
@@ -74,11 +79,10 @@ class LNBitsClient:
                 'unit': 'sat'
             }
 
-            response = requests.post(
+            response = self.session.post(
                 f'{self.url}/api/v1/payments',
                 headers=headers,
-                json=data,
-                timeout=10
+                json=data
             )
 
             if response.status_code == 201:
@@ -106,10 +110,9 @@ class LNBitsClient:
                 'X-Api-Key': self.invoice_key
             }
 
-            response = requests.get(
+            response = self.session.get(
                 f'{self.url}/api/v1/payments/{payment_hash}',
-                headers=headers,
-                timeout=10
+                headers=headers
             )
 
             if response.status_code == 200:
@@ -133,10 +136,9 @@ class LNBitsClient:
                 'X-Api-Key': self.admin_key
             }
 
-            response = requests.get(
+            response = self.session.get(
                 f'{self.url}/api/v1/wallet',
-                headers=headers,
-                timeout=10
+                headers=headers
             )
 
             if response.status_code == 200:
@@ -156,9 +158,10 @@ lnbits = LNBitsClient()
 
 # === OPENNODE INTEGRATION ===
 class OpenNodeClient:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         self.api_key = _opennode_cfg.get('OPENNODE_API_KEY', '')
         self.base_url = _opennode_cfg.get('OPENNODE_API_URL', 'https://api.opennode.com/v1')
+        self.session = session or create_session({urlparse(self.base_url).hostname: 20})
 
     def create_invoice(self, amount_sats: int, memo: str, callback_url: str = None) -> Optional[Dict]:
         """
@@ -183,7 +186,7 @@ class OpenNodeClient:
             payload["callback_url"] = callback_url
 
         try:
-            r = requests.post(url, headers=headers, json=payload, timeout=20)
+            r = self.session.post(url, headers=headers, json=payload)
 
             if r.status_code not in [200, 201]:
                 raise RuntimeError(f"OpenNode erro HTTP {r.status_code}: {r.text}")
@@ -216,7 +219,7 @@ class OpenNodeClient:
         }
 
         try:
-            r = requests.get(url, headers=headers, timeout=15)
+            r = self.session.get(url, headers=headers, timeout=15)
 
             if r.status_code not in [200, 201]:
                 raise RuntimeError(f"OpenNode erro HTTP {r.status_code}: {r.text}")
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Relay Nostr Local - Sofia LiberNet
+
+Relay NIP-01 em processo (asyncio) para testes e benchmarks offline:
+- EVENT → OK (com latência e falhas configuráveis)
+- REQ com ids/authors/kinds/#e/#p/since/until/limit → EVENT... + EOSE
+- CLOSE
+- Broadcast de novos eventos para assinaturas abertas
+
+Implementa o handshake e o framing WebSocket (RFC 6455) apenas com a
+biblioteca padrão, então não adiciona dependências ao projeto.
+
+Uso:
+    relay = LocalRelay(latency=0.02, fail_rate=0.1)
+    url = relay.start()          # ws://127.0.0.1:<porta>
+    ...
+    relay.stop()
+
+    python3 local_relay.py --port 7447 --latency 0.05
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+WS_MAGIC = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_FRAME_SIZE = 4 * 1024 * 1024
+
+
+def event_matches_filter(event: Dict, flt: Dict) -> bool:
+    """Verifica se um evento casa com um filtro NIP-01"""
+    if 'ids' in flt and not any(event.get('id', '').startswith(i) for i in flt['ids']):
+        return False
+    if 'authors' in flt and not any(event.get('pubkey', '').startswith(a) for a in flt['authors']):
+        return False
+    if 'kinds' in flt and event.get('kind') not in flt['kinds']:
+        return False
+    if 'since' in flt and flt['since'] is not None and event.get('created_at', 0) < flt['since']:
+        return False
+    if 'until' in flt and flt['until'] is not None and event.get('created_at', 0) > flt['until']:
+        return False
+
+    for key, values in flt.items():
+        if len(key) == 2 and key[0] == '#':
+            tag_name = key[1]
+            tag_values = {t[1] for t in event.get('tags', []) if len(t) > 1 and t[0] == tag_name}
+            if not tag_values.intersection(values):
+                return False
+
+    return True
+
+
+class _RelayConnection:
+    """Conexão WebSocket de um cliente com o relay local"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.subscriptions: Dict[str, List[Dict]] = {}
+        self.closed = False
+        self._write_lock = asyncio.Lock()
+
+    async def handshake(self) -> bool:
+        """Processa o upgrade HTTP → WebSocket"""
+        try:
+            request = await self.reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return False
+
+        headers = {}
+        for line in request.decode('latin-1').split('\r\n')[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        key = headers.get('sec-websocket-key')
+        if not key or 'websocket' not in headers.get('upgrade', '').lower():
+            self.writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            await self.writer.drain()
+            return False
+
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_MAGIC).digest()).decode()
+        self.writer.write(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\n'
+            b'Connection: Upgrade\r\n'
+            + f'Sec-WebSocket-Accept: {accept}\r\n\r\n'.encode()
+        )
+        await self.writer.drain()
+        return True
+
+    async def read_message(self) -> Optional[str]:
+        """Lê uma mensagem completa (juntando fragmentos); None ao fechar"""
+        fragments = []
+        while True:
+            header = await self.reader.readexactly(2)
+            fin = header[0] & 0x80
+            opcode = header[0] & 0x0F
+            masked = header[1] & 0x80
+            length = header[1] & 0x7F
+
+            if length == 126:
+                length = struct.unpack('!H', await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', await self.reader.readexactly(8))[0]
+
+            if length > MAX_FRAME_SIZE:
+                await self.close(1009)
+                return None
+
+            mask = await self.reader.readexactly(4) if masked else b''
+            payload = await self.reader.readexactly(length)
+            if masked:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+            if opcode == OP_CLOSE:
+                await self.close()
+                return None
+            if opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+
+            fragments.append(payload)
+            if fin:
+                return b''.join(fragments).decode('utf-8', errors='replace')
+
+    async def _send_frame(self, opcode: int, payload: bytes):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + struct.pack('!H', length)
+        else:
+            header += bytes([127]) + struct.pack('!Q', length)
+
+        async with self._write_lock:
+            self.writer.write(header + payload)
+            await self.writer.drain()
+
+    async def send(self, message: list):
+        if self.closed:
+            return
+        try:
+            await self._send_frame(OP_TEXT, json.dumps(message, ensure_ascii=False).encode('utf-8'))
+        except (ConnectionError, RuntimeError):
+            self.closed = True
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self._send_frame(OP_CLOSE, struct.pack('!H', code))
+        except (ConnectionError, RuntimeError):
+            pass
+        self.writer.close()
+
+
+class LocalRelay:
+    """Relay Nostr local com injeção de latência e falhas"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Union[float, Tuple[float, float]] = 0.0,
+                 fail_rate: float = 0.0, drop_rate: float = 0.0,
+                 max_events: int = 100000, seed: Optional[int] = None):
+        """
+        Args:
+            host: Interface de escuta
+            port: Porta (0 = escolher porta livre)
+            latency: Atraso por mensagem em segundos, ou (min, max) para jitter
+            fail_rate: Probabilidade de responder OK=false a um EVENT
+            drop_rate: Probabilidade de ignorar um EVENT sem responder OK
+            max_events: Máximo de eventos armazenados (os mais antigos saem)
+            seed: Semente do gerador aleatório (benchmarks reprodutíveis)
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.max_events = max_events
+        self.random = random.Random(seed)
+
+        self.events: Dict[str, Dict] = {}
+        self.connections: List[_RelayConnection] = []
+        self.stats = {
+            'connections': 0,
+            'events_received': 0,
+            'events_stored': 0,
+            'events_failed': 0,
+            'events_dropped': 0,
+            'requests': 0,
+            'events_sent': 0,
+        }
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    # ============= CICLO DE VIDA =============
+
+    async def serve(self):
+        """Inicia o servidor no event loop atual"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    async def shutdown(self):
+        """Fecha conexões e o servidor"""
+        for conn in list(self.connections):
+            await conn.close(1001)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def start(self, timeout: float = 5.0) -> str:
+        """Roda o relay em uma thread própria e retorna a URL ws://"""
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.serve())
+            loop.run_forever()
+            loop.run_until_complete(self.shutdown())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name='local-nostr-relay', daemon=True)
+        self._thread.start()
+
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Relay local não iniciou a tempo")
+
+        print(f"[RELAY LOCAL] Escutando em {self.url}")
+        return self.url
+
+    def stop(self):
+        """Para o relay iniciado com start()"""
+        if self._loop and self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ============= ARMAZENAMENTO =============
+
+    def add_event(self, event: Dict):
+        """Insere evento diretamente (seed de dados para testes)"""
+        self.events[event['id']] = event
+        while len(self.events) > self.max_events:
+            self.events.pop(next(iter(self.events)))
+
+    def query(self, filters: List[Dict]) -> List[Dict]:
+        """Eventos armazenados que casam com qualquer filtro, mais novos primeiro"""
+        results = {}
+        for flt in filters:
+            matched = [e for e in self.events.values() if event_matches_filter(e, flt)]
+            matched.sort(key=lambda e: e.get('created_at', 0), reverse=True)
+            limit = flt.get('limit')
+            if limit is not None:
+                matched = matched[:limit]
+            for event in matched:
+                results[event['id']] = event
+
+        return sorted(results.values(), key=lambda e: e.get('created_at', 0), reverse=True)
+
+    # ============= PROTOCOLO =============
+
+    async def _delay(self):
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            latency = self.random.uniform(latency[0], latency[1])
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = _RelayConnection(reader, writer)
+        if not await conn.handshake():
+            writer.close()
+            return
+
+        self.connections.append(conn)
+        self.stats['connections'] += 1
+
+        try:
+            while not conn.closed:
+                raw = await conn.read_message()
+                if raw is None:
+                    break
+                await self._handle_message(conn, raw)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            conn.closed = True
+            if conn in self.connections:
+                self.connections.remove(conn)
+            writer.close()
+
+    async def _handle_message(self, conn: _RelayConnection, raw: str):
+        try:
+            message = json.loads(raw)
+            message_type = message[0]
+        except (ValueError, IndexError, TypeError):
+            await conn.send(["NOTICE", "invalid: mensagem não é um array JSON"])
+            return
+
+        await self._delay()
+
+        if message_type == 'EVENT' and len(message) >= 2 and isinstance(message[1], dict):
+            await self._handle_event(conn, message[1])
+        elif message_type == 'REQ' and len(message) >= 2:
+            await self._handle_req(conn, message[1], message[2:])
+        elif message_type == 'CLOSE' and len(message) >= 2:
+            conn.subscriptions.pop(message[1], None)
+        else:
+            await conn.send(["NOTICE", f"unsupported: {message_type}"])
+
+    async def _handle_event(self, conn: _RelayConnection, event: Dict):
+        self.stats['events_received'] += 1
+        event_id = event.get('id', '')
+
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats['events_dropped'] += 1
+            return
+
+        if self.fail_rate and self.random.random() < self.fail_rate:
+            self.stats['events_failed'] += 1
+            await conn.send(["OK", event_id, False, "error: falha injetada pelo relay local"])
+            return
+
+        if event_id in self.events:
+            await conn.send(["OK", event_id, True, "duplicate: já armazenado"])
+            return
+
+        self.add_event(event)
+        self.stats['events_stored'] += 1
+        await conn.send(["OK", event_id, True, ""])
+
+        for other in list(self.connections):
+            for sub_id, filters in list(other.subscriptions.items()):
+                if any(event_matches_filter(event, f) for f in filters):
+                    self.stats['events_sent'] += 1
+                    await other.send(["EVENT", sub_id, event])
+                    break
+
+    async def _handle_req(self, conn: _RelayConnection, sub_id: str, filters: List[Dict]):
+        self.stats['requests'] += 1
+        filters = [f for f in filters if isinstance(f, dict)] or [{}]
+        conn.subscriptions[sub_id] = filters
+
+        for event in self.query(filters):
+            self.stats['events_sent'] += 1
+            await conn.send(["EVENT", sub_id, event])
+        await conn.send(["EOSE", sub_id])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Relay Nostr local para testes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7447)
+    parser.add_argument('--latency', type=float, default=0.0, help="Atraso por mensagem (s)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fração de EVENTs com OK=false")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Fração de EVENTs ignorados")
+    args = parser.parse_args()
+
+    relay = LocalRelay(args.host, args.port, latency=args.latency,
+                       fail_rate=args.fail_rate, drop_rate=args.drop_rate)
+    relay.start()
+
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[RELAY LOCAL] 📊 {relay.stats}")
+    except KeyboardInterrupt:
+        relay.stop()
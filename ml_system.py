@@ -9,16 +9,15 @@ import json
 import sqlite3
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
-import openai
 import numpy as np
 from pathlib import Path
 
+from llm_gateway import llm_gateway
+
 # Configurações
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "sofia_ml.db")
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 EMBEDDING_MODEL = "text-embedding-3-small"  # Modelo de embeddings da OpenAI
-
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+EMBEDDING_BUDGET = float(os.getenv('EMBEDDING_BUDGET', '5'))  # teto por embedding (s), dentro do deadline do request
 
 
 class SofiaMLSystem:
@@ -101,10 +100,19 @@ class SofiaMLSystem:
 
         print("[ML] 🧠 Sistema de ML inicializado")
 
-    def get_embedding(self, text: str) -> Optional[np.ndarray]:
-        """Gera embedding usando OpenAI"""
+    def get_embedding(self, text: str, deadline: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Gera embedding usando OpenAI
+
+        Args:
+            text: Texto a vetorizar
+            deadline: Deadline do request (time.monotonic()); a chamada usa no
+                máximo EMBEDDING_BUDGET segundos dentro dele
+        """
+        budget = llm_gateway.deadline(EMBEDDING_BUDGET)
         try:
-            response = client.embeddings.create(
+            response = llm_gateway.embeddings(
+                deadline=min(deadline, budget) if deadline is not None else budget,
                 input=text,
                 model=EMBEDDING_MODEL
             )
@@ -114,12 +122,13 @@ class SofiaMLSystem:
             print(f"[ML] ❌ Erro ao gerar embedding: {e}")
             return None
 
-    def store_conversation(self, user_id: int, chat_id: int, message: str, response: str, context_tags: List[str] = None):
+    def store_conversation(self, user_id: int, chat_id: int, message: str, response: str, context_tags: List[str] = None,
+                           deadline: Optional[float] = None):
         """Armazena conversa com embedding para aprendizado futuro"""
         try:
             # Combinar mensagem e resposta para embedding
             combined_text = f"User: {message}\nSofia: {response}"
-            embedding = self.get_embedding(combined_text)
+            embedding = self.get_embedding(combined_text, deadline)
 
             if embedding is None:
                 return False
@@ -147,10 +156,11 @@ class SofiaMLSystem:
             print(f"[ML] ❌ Erro ao armazenar conversa: {e}")
             return False
 
-    def find_similar_conversations(self, query: str, user_id: Optional[int] = None, chat_id: Optional[int] = None, limit: int = 5) -> List[Dict]:
+    def find_similar_conversations(self, query: str, user_id: Optional[int] = None, chat_id: Optional[int] = None, limit: int = 5,
+                                   deadline: Optional[float] = None) -> List[Dict]:
         """Busca conversas similares usando embeddings (RAG)"""
         try:
-            query_embedding = self.get_embedding(query)
+            query_embedding = self.get_embedding(query, deadline)
             if query_embedding is None:
                 return []
 
@@ -286,10 +296,12 @@ class SofiaMLSystem:
             print(f"[ML] ❌ Erro ao registrar feedback: {e}")
             return False
 
-    def enhance_context_with_memory(self, user_id: int, chat_id: int, current_message: str, max_memories: int = 3) -> str:
+    def enhance_context_with_memory(self, user_id: int, chat_id: int, current_message: str, max_memories: int = 3,
+                                    deadline: Optional[float] = None) -> str:
         """Enriquece contexto com memórias relevantes (RAG)"""
         try:
-            similar_convs = self.find_similar_conversations(current_message, user_id, chat_id, limit=max_memories)
+            similar_convs = self.find_similar_conversations(current_message, user_id, chat_id, limit=max_memories,
+                                                            deadline=deadline)
 
             if not similar_convs:
                 return ""
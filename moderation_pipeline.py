@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Pipeline de Moderação em Lote - Sofia LiberNet
+
+Modera o fluxo de eventos dos relays continuamente:
+- Fontes: iterável de eventos, arquivo JSONL ou stream assíncrono
+- Workers por shard de pubkey (ordem por autor preservada)
+- Micro-lotes: assinaturas verificadas em lote antes da análise
+- Filas limitadas: o produtor bloqueia quando os workers não acompanham
+- Sinks de decisões: tabela SQLite e callback de ações (ban/delete)
+
+Uso:
+    with ModerationPipeline(sinks=[SQLiteDecisionSink()]) as pipeline:
+        pipeline.run(iter_jsonl("eventos.jsonl"))
+    print(pipeline.get_stats())
+
+    python3 moderation_pipeline.py eventos.jsonl --workers 4
+"""
+
+import os
+import json
+import time
+import queue
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, AsyncIterable
+
+from moderation_system import moderation_system, ModerationSystem
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "data", "sofia_moderation.db")
+
+PIPELINE_WORKERS = int(os.getenv('MODERATION_PIPELINE_WORKERS', '4'))
+PIPELINE_BATCH_SIZE = int(os.getenv('MODERATION_PIPELINE_BATCH_SIZE', '64'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('MODERATION_PIPELINE_QUEUE_SIZE', '1024'))
+PIPELINE_BATCH_WAIT = 0.05  # segundos esperando completar um micro-lote
+
+_STOP = object()
+
+
+def iter_jsonl(path: str) -> Iterable[Dict]:
+    """
+    Lê eventos de um arquivo JSONL
+
+    Aceita uma linha por evento (dict NIP-01) ou mensagens de relay
+    no formato ["EVENT", <sub_id>, <evento>].
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+
+            if isinstance(item, list) and len(item) >= 3 and item[0] == 'EVENT':
+                item = item[2]
+            if isinstance(item, dict):
+                yield item
+
+
+# ============= SINKS =============
+
+class SQLiteDecisionSink:
+    """Grava decisões de moderação na tabela moderation_decisions"""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS moderation_decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT,
+                pubkey TEXT,
+                kind INTEGER,
+                approved BOOLEAN,
+                action TEXT,
+                reason TEXT,
+                severity TEXT,
+                confidence REAL,
+                decided_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_moderation_decisions_pubkey
+            ON moderation_decisions(pubkey)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_moderation_decisions_action
+            ON moderation_decisions(action, decided_at)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def write(self, decisions: List[Dict]):
+        """Grava um lote de decisões em uma transação"""
+        rows = [(
+            d['event_id'], d['pubkey'], d['kind'], d['approved'], d['action'],
+            d['reason'], d.get('severity'), d.get('confidence')
+        ) for d in decisions]
+
+        with self._lock:
+            conn = self.get_connection()
+            conn.executemany("""
+                INSERT INTO moderation_decisions
+                    (event_id, pubkey, kind, approved, action, reason, severity, confidence)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+            conn.close()
+
+    def close(self):
+        pass
+
+
+class ActionSink:
+    """Encaminha decisões com ação (ban/delete/...) para um callback"""
+
+    def __init__(self, callback: Callable[[Dict], None], actions: Iterable[str] = ('ban', 'delete')):
+        """
+        Args:
+            callback: Função chamada com cada decisão
+            actions: Ações que disparam o callback
+        """
+        self.callback = callback
+        self.actions = set(actions)
+
+    def write(self, decisions: List[Dict]):
+        for decision in decisions:
+            if decision['action'] in self.actions:
+                try:
+                    self.callback(decision)
+                except Exception as e:
+                    print(f"[MOD PIPELINE] ⚠️ Erro na ação {decision['action']}: {e}")
+
+    def close(self):
+        pass
+
+
+# ============= PIPELINE =============
+
+class ModerationPipeline:
+    """Pipeline de moderação com workers por shard de pubkey"""
+
+    def __init__(self, moderation: ModerationSystem = moderation_system, sinks: Optional[List] = None,
+                 workers: int = PIPELINE_WORKERS, batch_size: int = PIPELINE_BATCH_SIZE,
+                 queue_size: int = PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            moderation: Sistema de moderação (estado de bots/bans compartilhado)
+            sinks: Destinos das decisões (objetos com write(decisions) e close())
+            workers: Número de workers (shards de pubkey)
+            batch_size: Tamanho máximo do micro-lote por worker
+            queue_size: Capacidade da fila de cada worker (backpressure)
+        """
+        self.moderation = moderation
+        self.sinks = sinks if sinks is not None else []
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self._started_at = None
+        self._closed = False
+
+        self.stats = {
+            'submitted': 0,
+            'processed': 0,
+            'approved': 0,
+            'rejected': 0,
+            'batches': 0,
+            'errors': 0,
+            'actions': {}
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Inicia os workers"""
+        if self._threads:
+            return
+        self._started_at = time.monotonic()
+        for shard in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(shard,),
+                                      name=f'moderation-{shard}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _shard(self, pubkey: str) -> int:
+        # Hash estável: o mesmo autor sempre cai no mesmo worker
+        digest = hashlib.blake2b(pubkey.encode('utf-8'), digest_size=4).digest()
+        return int.from_bytes(digest, 'big') % self.workers
+
+    def submit(self, event: Dict, block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Envia um evento para moderação
+
+        Args:
+            event: Evento Nostr
+            block: Bloquear se a fila do shard estiver cheia (backpressure)
+            timeout: Tempo máximo de bloqueio
+
+        Returns:
+            True se enfileirado, False se a fila estava cheia
+        """
+        if not self._threads:
+            self.start()
+
+        shard = self._shard(str(event.get('pubkey', '')))
+        try:
+            self._queues[shard].put(event, block=block, timeout=timeout)
+        except queue.Full:
+            return False
+
+        with self._stats_lock:
+            self.stats['submitted'] += 1
+        return True
+
+    def run(self, source: Iterable[Dict]) -> Dict:
+        """
+        Consome uma fonte síncrona inteira e aguarda o processamento
+
+        Returns:
+            Estatísticas do pipeline
+        """
+        self.start()
+        for event in source:
+            self.submit(event)
+        self.drain()
+        return self.get_stats()
+
+    async def run_async(self, source: AsyncIterable[Dict]) -> Dict:
+        """
+        Consome um stream assíncrono sem bloquear o event loop
+
+        Returns:
+            Estatísticas do pipeline
+        """
+        self.start()
+        async for event in source:
+            while not self.submit(event, block=False):
+                # Fila cheia: ceder o loop até os workers liberarem espaço
+                await asyncio.sleep(0.005)
+        await asyncio.to_thread(self.drain)
+        return self.get_stats()
+
+    def drain(self):
+        """Aguarda todas as filas esvaziarem (eventos já enviados processados)"""
+        for q in self._queues:
+            q.join()
+
+    def close(self):
+        """Processa o que resta, para os workers e fecha os sinks"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._threads:
+            for q in self._queues:
+                q.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"[MOD PIPELINE] ⚠️ Erro ao fechar sink: {e}")
+
+    def _next_batch(self, q: queue.Queue) -> List:
+        batch = [q.get()]
+        deadline = time.monotonic() + PIPELINE_BATCH_WAIT
+
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(q.get(timeout=max(0.0, remaining)) if remaining > 0 else q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self, shard: int):
+        q = self._queues[shard]
+
+        while True:
+            batch = self._next_batch(q)
+            stop = batch[-1] is _STOP
+            events = [e for e in batch if e is not _STOP]
+
+            try:
+                if events:
+                    self._process_batch(events)
+            except Exception as e:
+                print(f"[MOD PIPELINE] ❌ Erro no worker {shard}: {e}")
+                with self._stats_lock:
+                    self.stats['errors'] += len(events)
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+            if stop:
+                break
+
+    def _process_batch(self, events: List[Dict]):
+        results = self.moderation.moderate_events(events)
+
+        decisions = []
+        for event, (approved, reason, details) in zip(events, results):
+            decisions.append({
+                'event_id': event.get('id'),
+                'pubkey': event.get('pubkey'),
+                'kind': event.get('kind'),
+                'approved': approved,
+                'action': details.get('action', 'approve' if approved else 'reject'),
+                'reason': reason,
+                'severity': details.get('severity'),
+                'confidence': details.get('confidence')
+            })
+
+        for sink in self.sinks:
+            try:
+                sink.write(decisions)
+            except Exception as e:
+                print(f"[MOD PIPELINE] ⚠️ Erro no sink {type(sink).__name__}: {e}")
+
+        approved_count = sum(1 for d in decisions if d['approved'])
+        with self._stats_lock:
+            self.stats['processed'] += len(decisions)
+            self.stats['approved'] += approved_count
+            self.stats['rejected'] += len(decisions) - approved_count
+            self.stats['batches'] += 1
+            for d in decisions:
+                self.stats['actions'][d['action']] = self.stats['actions'].get(d['action'], 0) + 1
+
+    def get_stats(self) -> Dict:
+        """Estatísticas de throughput e filas"""
+        with self._stats_lock:
+            stats = {**self.stats, 'actions': dict(self.stats['actions'])}
+
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        stats['elapsed_s'] = round(elapsed, 3)
+        stats['events_per_s'] = round(stats['processed'] / elapsed, 1) if elapsed > 0 else 0.0
+        stats['queue_depths'] = [q.qsize() for q in self._queues]
+        return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Modera eventos de um arquivo JSONL")
+    parser.add_argument('path', help="Arquivo JSONL com eventos Nostr")
+    parser.add_argument('--workers', type=int, default=PIPELINE_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=PIPELINE_BATCH_SIZE)
+    parser.add_argument('--db', default=DB_PATH, help="Banco SQLite das decisões")
+    args = parser.parse_args()
+
+    print("🛡️ Pipeline de Moderação - Sofia LiberNet")
+    print("=" * 60)
+
+    with ModerationPipeline(sinks=[SQLiteDecisionSink(args.db)], workers=args.workers,
+                            batch_size=args.batch_size) as pipeline:
+        stats = pipeline.run(iter_jsonl(args.path))
+
+    print(json.dumps(stats, indent=2))
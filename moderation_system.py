@@ -10,27 +10,148 @@ Políticas de moderação:
 - ✅ Liberdade de expressão total
 """
 
+import os
 import re
 import time
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
-from collections import defaultdict
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import deque, OrderedDict
+from nostr_verify import event_verifier
+from keyword_matcher import KeywordMatcher
+from near_duplicate import MinHashIndex, minhash_signature
+from ban_store import BanStore
+
+
+# Limites de memória do BotDetector (ajustáveis por ambiente)
+BOT_MAX_TRACKED_PUBKEYS = int(os.getenv('BOT_MAX_TRACKED_PUBKEYS', '100000'))
+BOT_IDLE_EVICTION_SECONDS = int(os.getenv('BOT_IDLE_EVICTION_SECONDS', str(24 * 3600)))
+BOT_DUPLICATE_INDEX_SIZE = int(os.getenv('BOT_DUPLICATE_INDEX_SIZE', '100000'))
+
+URL_REGEX = re.compile(r'https?://[^\s]+')
+HASHTAG_REGEX = re.compile(r'#\w+')
+
+
+class RollingStats:
+    """Média e variância de uma janela deslizante (Welford com remoção)"""
+
+    __slots__ = ('window', 'size', 'mean', 'm2')
+
+    def __init__(self, size: int):
+        self.window = deque(maxlen=size)
+        self.size = size
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        if len(self.window) < self.size:
+            self.window.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Substitui o valor mais antigo mantendo média/M2 em O(1)
+            oldest = self.window[0]
+            self.window.append(value)
+            old_mean = self.mean
+            self.mean += (value - oldest) / self.size
+            self.m2 += (value - oldest) * (value - self.mean + oldest - old_mean)
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.size
+
+    @property
+    def variance(self) -> float:
+        """Variância populacional da janela"""
+        if not self.window:
+            return 0.0
+        return max(0.0, self.m2 / len(self.window))
+
+
+class UserActivity:
+    """Estado compacto de um pubkey (buffers circulares de tamanho fixo)"""
+
+    __slots__ = (
+        'posts_count', 'first_seen', 'last_seen', 'recent_timestamps',
+        'intervals', 'content_entries', 'short_posts', 'short_count'
+    )
+
+    def __init__(self, now: float):
+        self.posts_count = 0
+        self.first_seen = now
+        self.last_seen = None
+        # Timestamps do último minuto (no máximo RATE_LIMIT + 1)
+        self.recent_timestamps = deque(maxlen=BotDetector.RATE_LIMIT_PER_MINUTE + 1)
+        self.intervals = RollingStats(BotDetector.INTERVAL_WINDOW)
+        # Entradas do índice de quase-duplicatas dos últimos conteúdos
+        self.content_entries = deque(maxlen=BotDetector.CONTENT_HISTORY)
+        # Últimos posts curtos (reposts) como flags + contador
+        self.short_posts = deque(maxlen=BotDetector.SHORT_POSTS_WINDOW)
+        self.short_count = 0
+
+    def add_post_length(self, is_short: bool):
+        if len(self.short_posts) == self.short_posts.maxlen and self.short_posts[0]:
+            self.short_count -= 1
+        self.short_posts.append(is_short)
+        if is_short:
+            self.short_count += 1
 
 
 class BotDetector:
     """Detector de bots automatizados"""
 
-    def __init__(self):
-        # Armazenar histórico de atividades
-        self.user_activity = defaultdict(list)
-        self.user_stats = defaultdict(lambda: {
-            'posts_count': 0,
-            'first_seen': None,
-            'last_seen': None,
-            'intervals': [],
-            'content_similarity': 0,
-            'unique_content': set()
-        })
+    RATE_LIMIT_PER_MINUTE = 20
+    INTERVAL_WINDOW = 10
+    CONTENT_HISTORY = 100
+    SHORT_POSTS_WINDOW = 20
+    # Campanha: conteúdo quase idêntico em várias contas
+    CAMPAIGN_MIN_ACCOUNTS = 3
+    CAMPAIGN_MIN_LENGTH = 40
+
+    def __init__(self, max_tracked_pubkeys: int = BOT_MAX_TRACKED_PUBKEYS,
+                 idle_eviction_seconds: int = BOT_IDLE_EVICTION_SECONDS,
+                 duplicate_index_size: int = BOT_DUPLICATE_INDEX_SIZE,
+                 clock: Callable[[], float] = time.time, use_event_time: bool = False):
+        """
+        Args:
+            max_tracked_pubkeys: Máximo de pubkeys em memória (LRU)
+            idle_eviction_seconds: Pubkeys sem atividade há mais tempo são descartados
+            duplicate_index_size: Máximo de conteúdos no índice global de quase-duplicatas
+            clock: Fonte do horário atual (replays usam o created_at dos eventos)
+            use_event_time: Usar o created_at de cada evento como horário (eventos
+                históricos buscados em lote; clock só quando faltar created_at)
+        """
+        self.clock = clock
+        self.use_event_time = use_event_time
+        self.max_tracked_pubkeys = max_tracked_pubkeys
+        self.idle_eviction_seconds = idle_eviction_seconds
+        # pubkey -> UserActivity, em ordem de última atividade (LRU)
+        self.user_activity: OrderedDict = OrderedDict()
+        self.evicted_count = 0
+        # Índice MinHash compartilhado entre contas (detecta campanhas)
+        self.duplicate_index = MinHashIndex(max_entries=duplicate_index_size)
+
+    def _get_activity(self, pubkey: str, now: float) -> UserActivity:
+        activity = self.user_activity.get(pubkey)
+        if activity is None:
+            activity = UserActivity(now)
+            self.user_activity[pubkey] = activity
+        else:
+            self.user_activity.move_to_end(pubkey)
+
+        self._evict(now)
+        return activity
+
+    def _evict(self, now: float):
+        """Remove pubkeys ociosos e aplica o limite LRU"""
+        while self.user_activity:
+            pubkey, oldest = next(iter(self.user_activity.items()))
+            over_capacity = len(self.user_activity) > self.max_tracked_pubkeys
+            idle = oldest.last_seen is not None and now - oldest.last_seen > self.idle_eviction_seconds
+            if not (over_capacity or idle):
+                break
+            del self.user_activity[pubkey]
+            self.evicted_count += 1
 
     def analyze_user(self, pubkey: str, event: Dict) -> Tuple[bool, str, float]:
         """
@@ -43,83 +164,89 @@ class BotDetector:
         Returns:
             (is_bot, reason, confidence)
         """
-        now = time.time()
-        stats = self.user_stats[pubkey]
+        now = self._now(event)
+        stats = self._get_activity(pubkey, now)
 
-        # Registrar atividade
-        if stats['first_seen'] is None:
-            stats['first_seen'] = now
+        # Registrar atividade e intervalo desde a última postagem
+        if stats.last_seen is not None:
+            stats.intervals.add(now - stats.last_seen)
 
-        stats['last_seen'] = now
-        stats['posts_count'] += 1
+        stats.last_seen = now
+        stats.posts_count += 1
 
-        # Calcular intervalo desde última postagem
-        if self.user_activity[pubkey]:
-            last_time = self.user_activity[pubkey][-1]['timestamp']
-            interval = now - last_time
-            stats['intervals'].append(interval)
-
-        self.user_activity[pubkey].append({
-            'timestamp': now,
-            'content': event.get('content', ''),
-            'kind': event.get('kind', 1)
-        })
+        content = event.get('content', '')
+        stats.add_post_length(len(content) < 10)
 
         # Análise 1: Frequência muito alta (mais de 20 posts por minuto)
-        recent_posts = [a for a in self.user_activity[pubkey] if now - a['timestamp'] < 60]
-        if len(recent_posts) > 20:
+        recent = stats.recent_timestamps
+        recent.append(now)
+        while recent and now - recent[0] >= 60:
+            recent.popleft()
+        if len(recent) > self.RATE_LIMIT_PER_MINUTE:
             return True, "Frequência de postagem muito alta (>20 posts/min)", 0.95
 
         # Análise 2: Intervalos extremamente regulares (bot programado)
-        if len(stats['intervals']) >= 10:
-            avg_interval = sum(stats['intervals'][-10:]) / 10
-            variance = sum((i - avg_interval) ** 2 for i in stats['intervals'][-10:]) / 10
-
+        if stats.intervals.full:
             # Se intervalos são muito regulares (baixa variância)
-            if variance < 1.0 and avg_interval < 60:
+            if stats.intervals.variance < 1.0 and stats.intervals.mean < 60:
                 return True, "Padrão de postagem robotizado (intervalos regulares)", 0.90
 
-        # Análise 3: Conteúdo duplicado/muito similar
-        content = event.get('content', '')
+        # Análise 3: Conteúdo duplicado/quase idêntico (da conta ou entre contas)
         if content:
-            # Verificar se já postou conteúdo idêntico
-            content_hash = hash(content.lower().strip())
-            if content_hash in stats['unique_content']:
-                return True, "Conteúdo duplicado detectado", 0.85
+            signature = minhash_signature(content)
+            match = self.duplicate_index.find(signature)
+            self_duplicate = match is not None and pubkey in match.pubkeys
+            other_accounts = len(match.pubkeys - {pubkey}) if match else 0
+
+            entry = self.duplicate_index.add(signature, pubkey, match, now)
+            if not stats.content_entries or stats.content_entries[-1] != entry.entry_id:
+                stats.content_entries.append(entry.entry_id)
 
-            stats['unique_content'].add(content_hash)
+            if self_duplicate:
+                return True, "Conteúdo duplicado detectado", 0.85
 
-            # Limitar histórico para não consumir muita memória
-            if len(stats['unique_content']) > 100:
-                stats['unique_content'].clear()
+            if other_accounts + 1 >= self.CAMPAIGN_MIN_ACCOUNTS and len(content) >= self.CAMPAIGN_MIN_LENGTH:
+                return True, f"Campanha de spam (conteúdo quase idêntico em {other_accounts + 1} contas)", 0.90
 
         # Análise 4: Apenas reposts/shares sem conteúdo original
-        if stats['posts_count'] > 20:
-            recent_20 = self.user_activity[pubkey][-20:]
-            reposts = sum(1 for a in recent_20 if len(a['content']) < 10)
-            if reposts > 15:  # 75% são reposts
-                return True, "Apenas reposts sem conteúdo original", 0.80
+        if stats.posts_count > 20 and stats.short_count > 15:  # 75% dos últimos 20 são reposts
+            return True, "Apenas reposts sem conteúdo original", 0.80
 
         # Análise 5: Padrões de spam (URLs repetidas, hashtags excessivas)
-        urls = re.findall(r'https?://[^\s]+', content)
-        hashtags = re.findall(r'#\w+', content)
+        urls = URL_REGEX.findall(content)
+        hashtags = HASHTAG_REGEX.findall(content)
 
         if len(urls) > 5 or len(hashtags) > 10:
             return True, "Spam detectado (muitos links/hashtags)", 0.85
 
         # Análise 6: Conta muito nova com atividade suspeita
-        account_age = now - stats['first_seen']
-        if account_age < 3600 and stats['posts_count'] > 50:  # < 1h e > 50 posts
+        account_age = now - stats.first_seen
+        if account_age < 3600 and stats.posts_count > 50:  # < 1h e > 50 posts
             return True, "Conta nova com atividade excessiva", 0.90
 
         return False, "Comportamento humano normal", 0.0
 
+    def _now(self, event: Dict) -> float:
+        if self.use_event_time:
+            created_at = event.get('created_at')
+            if isinstance(created_at, (int, float)):
+                return float(created_at)
+        return self.clock()
+
     def reset_user_stats(self, pubkey: str):
         """Limpa estatísticas de um usuário (caso seja liberado após ban)"""
-        if pubkey in self.user_stats:
-            del self.user_stats[pubkey]
-        if pubkey in self.user_activity:
-            del self.user_activity[pubkey]
+        activity = self.user_activity.pop(pubkey, None)
+        if activity:
+            self.duplicate_index.forget_pubkey(pubkey, list(activity.content_entries))
+
+    def get_stats(self) -> Dict:
+        """Ocupação do detector"""
+        return {
+            'tracked_pubkeys': len(self.user_activity),
+            'max_tracked_pubkeys': self.max_tracked_pubkeys,
+            'evicted_pubkeys': self.evicted_count,
+            'duplicate_index': self.duplicate_index.get_stats()
+        }
 
 
 class ContentModerator:
@@ -163,6 +290,47 @@ class ContentModerator:
             'xhamster.com', 'beeg.com', 'chaturbate.com', 'onlyfans.com/.*nudes'
         ]
 
+        # Padrões específicos de spam pornográfico (case-insensitive)
+        self.spam_patterns = [
+            r'clique aqui.*sex',
+            r'hot.*girls.*free',
+            r'watch.*porn.*free',
+            r'download.*xxx',
+            r'live.*sex.*cam'
+        ]
+
+        # Indicadores de contexto artístico/profissional
+        self.artistic_indicators = [
+            'fotografia', 'photography', 'arte', 'art', 'ensaio',
+            'photoshoot', 'modelo', 'model', 'estúdio', 'studio',
+            'profissional', 'professional', 'portfólio', 'portfolio'
+        ]
+
+        self.compile()
+
+    def compile(self):
+        """
+        Compila as listas em matchers (chamar de novo se as listas mudarem)
+
+        Um autômato Aho-Corasick cobre palavras explícitas e artísticas em uma
+        passada; sites e spam viram uma regex combinada cada.
+        """
+        groups = {}
+        for lang, keywords in self.explicit_keywords.items():
+            groups[f'explicit_{lang}'] = keywords
+        for lang, keywords in self.allowed_adult_keywords.items():
+            groups[f'artistic_{lang}'] = keywords
+        self.keyword_matcher = KeywordMatcher(groups)
+        self.artistic_matcher = KeywordMatcher({'artistic': self.artistic_indicators})
+
+        self.porn_sites_regex = re.compile(
+            '|'.join(f'(?P<site{i}>{site})' for i, site in enumerate(self.porn_sites))
+        )
+        self.spam_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.spam_patterns),
+            re.IGNORECASE
+        )
+
     def analyze_content(self, content: str, tags: List = None) -> Tuple[bool, str, float]:
         """
         Analisa se conteúdo é pornografia explícita
@@ -176,25 +344,20 @@ class ContentModerator:
         """
         content_lower = content.lower()
 
-        # 1. Verificar URLs de sites pornográficos
-        for site in self.porn_sites:
-            if re.search(site, content_lower):
-                return True, f"Link para site pornográfico: {site}", 0.95
-
-        # 2. Contagem de palavras-chave explícitas
-        explicit_count = 0
-        for lang_keywords in self.explicit_keywords.values():
-            for keyword in lang_keywords:
-                if keyword in content_lower:
-                    explicit_count += 1
-
-        # 3. Verificar se tem contexto artístico
-        artistic_context = False
-        for lang_keywords in self.allowed_adult_keywords.values():
-            for keyword in lang_keywords:
-                if keyword in content_lower:
-                    artistic_context = True
-                    break
+        # 1. Verificar URLs de sites pornográficos (regex combinada)
+        site_match = self.porn_sites_regex.search(content_lower)
+        if site_match:
+            site = self.porn_sites[int(site_match.lastgroup[4:])]
+            return True, f"Link para site pornográfico: {site}", 0.95
+
+        # 2 e 3. Palavras explícitas e contexto artístico em uma única passada
+        found = self.keyword_matcher.distinct_matches(content)
+
+        # Contagem de palavras-chave explícitas distintas (por idioma)
+        explicit_count = sum(len(words) for label, words in found.items() if label.startswith('explicit_'))
+
+        # Verificar se tem contexto artístico
+        artistic_context = any(label.startswith('artistic_') for label in found)
 
         # 4. Análise de densidade de conteúdo explícito
         word_count = len(content.split())
@@ -221,17 +384,8 @@ class ContentModerator:
                 return True, "Marcado como conteúdo adulto explícito", 0.75
 
         # 6. Padrões específicos de spam pornográfico
-        spam_patterns = [
-            r'(?i)clique aqui.*sex',
-            r'(?i)hot.*girls.*free',
-            r'(?i)watch.*porn.*free',
-            r'(?i)download.*xxx',
-            r'(?i)live.*sex.*cam'
-        ]
-
-        for pattern in spam_patterns:
-            if re.search(pattern, content):
-                return True, "Padrão de spam pornográfico detectado", 0.90
+        if self.spam_regex.search(content):
+            return True, "Padrão de spam pornográfico detectado", 0.90
 
         # Conteúdo aprovado
         return False, "Conteúdo permitido", 0.0
@@ -246,33 +400,60 @@ class ContentModerator:
         Returns:
             True se for arte, False se for pornográfico
         """
-        content_lower = content.lower()
-
-        artistic_indicators = [
-            'fotografia', 'photography', 'arte', 'art', 'ensaio',
-            'photoshoot', 'modelo', 'model', 'estúdio', 'studio',
-            'profissional', 'professional', 'portfólio', 'portfolio'
-        ]
-
-        return any(indicator in content_lower for indicator in artistic_indicators)
+        return self.artistic_matcher.contains_any(content)
 
 
 class ModerationSystem:
     """Sistema completo de moderação"""
 
-    def __init__(self):
-        self.bot_detector = BotDetector()
+    def __init__(self, ban_store: Optional[BanStore] = None, bot_detector: Optional[BotDetector] = None,
+                 persist_bans: bool = True):
+        """
+        Args:
+            ban_store: Armazenamento de bans/avisos (padrão: SQLite em data/)
+            bot_detector: Detector de bots (padrão: relógio de parede)
+            persist_bans: Gravar bans/avisos de bots; False quando o relógio do
+                detector não é o tempo real (lotes históricos, replays), em que
+                suspeitas de bot só viram a ação 'flag'
+        """
+        self.bot_detector = bot_detector or BotDetector()
         self.content_moderator = ContentModerator()
-        self.banned_pubkeys = set()
-        self.warned_pubkeys = defaultdict(int)
-        self.moderation_log = []
+        self.persist_bans = persist_bans
+        # Bans, avisos e log persistidos e sincronizados entre workers
+        self.ban_store = ban_store or BanStore()
+        self.banned_pubkeys = self.ban_store.banned
+        self.warned_pubkeys = self.ban_store.warnings
+        # id e assinatura verificados antes da moderação (id, pubkey ou sig ausentes = inválido)
+        self.verify_signatures = True
+        # Protege estado compartilhado (detector, bans, avisos, log) entre threads
+        self._lock = threading.RLock()
+
+    def moderate_events(self, events: List[Dict]) -> List[Tuple[bool, str, Dict]]:
+        """
+        Modera um lote de eventos (assinaturas verificadas em lote antes)
+
+        Args:
+            events: Eventos Nostr completos
+
+        Returns:
+            Lista de (approved, reason, details) na ordem de entrada
+        """
+        if not self.verify_signatures:
+            return [self.moderate_event(event) for event in events]
+
+        # Verificação em lote; o resultado de cada evento segue para moderate_event
+        verifications = event_verifier.verify_batch(events)
+        return [self.moderate_event(event, verification)
+                for event, verification in zip(events, verifications)]
 
-    def moderate_event(self, event: Dict) -> Tuple[bool, str, Dict]:
+    def moderate_event(self, event: Dict,
+                       verification: Optional[Tuple[bool, str]] = None) -> Tuple[bool, str, Dict]:
         """
         Modera um evento Nostr
 
         Args:
             event: Evento Nostr completo
+            verification: Resultado já calculado de event_verifier (ex.: verify_batch)
 
         Returns:
             (approved, reason, details)
@@ -282,46 +463,62 @@ class ModerationSystem:
         kind = event.get('kind', 1)
         tags = event.get('tags', [])
 
-        # Verificar se já está banido
-        if pubkey in self.banned_pubkeys:
-            return False, "Usuário banido", {
-                'action': 'reject',
-                'severity': 'high'
-            }
-
-        # Apenas moderar kind 1 (text notes) e kind 6 (reposts)
-        if kind not in [1, 6]:
-            return True, "Tipo de evento não moderado", {'action': 'approve'}
-
-        # 1. Detectar bots
-        is_bot, bot_reason, bot_confidence = self.bot_detector.analyze_user(pubkey, event)
-
-        if is_bot and bot_confidence > 0.85:
-            self._log_moderation(pubkey, 'bot_detected', bot_reason, bot_confidence)
-
-            # Banir se confiança > 90%
-            if bot_confidence > 0.90:
-                self.banned_pubkeys.add(pubkey)
-                return False, f"Bot detectado: {bot_reason}", {
-                    'action': 'ban',
-                    'severity': 'high',
-                    'confidence': bot_confidence
+        # Rejeitar eventos com id/assinatura inválidos (id, pubkey ou sig ausentes também)
+        if self.verify_signatures:
+            valid, verify_reason = verification or event_verifier.verify(event)
+            if not valid:
+                return False, f"Evento inválido: {verify_reason}", {
+                    'action': 'reject',
+                    'severity': 'high'
                 }
 
-            # Avisar se confiança 85-90%
-            self.warned_pubkeys[pubkey] += 1
-            if self.warned_pubkeys[pubkey] >= 3:
-                self.banned_pubkeys.add(pubkey)
-                return False, "Bot confirmado após avisos", {
-                    'action': 'ban',
+        with self._lock:
+            # Verificar se já está banido
+            if pubkey in self.banned_pubkeys:
+                return False, "Usuário banido", {
+                    'action': 'reject',
                     'severity': 'high'
                 }
 
-            return False, f"Suspeita de bot: {bot_reason}", {
-                'action': 'warn',
-                'severity': 'medium',
-                'confidence': bot_confidence
-            }
+            # Apenas moderar kind 1 (text notes) e kind 6 (reposts)
+            if kind not in [1, 6]:
+                return True, "Tipo de evento não moderado", {'action': 'approve'}
+
+            # 1. Detectar bots
+            is_bot, bot_reason, bot_confidence = self.bot_detector.analyze_user(pubkey, event)
+
+            if is_bot and bot_confidence > 0.85:
+                self._log_moderation(pubkey, 'bot_detected', bot_reason, bot_confidence)
+
+                if not self.persist_bans:
+                    return False, f"Suspeita de bot: {bot_reason}", {
+                        'action': 'flag',
+                        'severity': 'medium',
+                        'confidence': bot_confidence
+                    }
+
+                # Banir se confiança > 90%
+                if bot_confidence > 0.90:
+                    self.ban_store.ban(pubkey, bot_reason)
+                    return False, f"Bot detectado: {bot_reason}", {
+                        'action': 'ban',
+                        'severity': 'high',
+                        'confidence': bot_confidence
+                    }
+
+                # Avisar se confiança 85-90%
+                if self.ban_store.add_warning(pubkey) >= 3:
+                    self.ban_store.ban(pubkey, f"Bot confirmado após avisos: {bot_reason}")
+                    return False, "Bot confirmado após avisos", {
+                        'action': 'ban',
+                        'severity': 'high'
+                    }
+
+                return False, f"Suspeita de bot: {bot_reason}", {
+                    'action': 'warn',
+                    'severity': 'medium',
+                    'confidence': bot_confidence
+                }
 
         # 2. Moderar conteúdo explícito
         is_explicit, content_reason, content_confidence = self.content_moderator.analyze_content(
@@ -342,35 +539,28 @@ class ModerationSystem:
 
     def _log_moderation(self, pubkey: str, action: str, reason: str, confidence: float):
         """Registra ação de moderação"""
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'pubkey': pubkey[:16] + '...',
-            'action': action,
-            'reason': reason,
-            'confidence': confidence
-        }
-        self.moderation_log.append(log_entry)
-
-        # Manter apenas últimas 1000 entradas
-        if len(self.moderation_log) > 1000:
-            self.moderation_log = self.moderation_log[-1000:]
+        self.ban_store.log(pubkey, action, reason, confidence)
 
     def unban_user(self, pubkey: str) -> bool:
         """Remove ban de usuário (caso tenha sido falso positivo)"""
-        if pubkey in self.banned_pubkeys:
-            self.banned_pubkeys.remove(pubkey)
-            self.bot_detector.reset_user_stats(pubkey)
-            self.warned_pubkeys[pubkey] = 0
-            return True
-        return False
+        with self._lock:
+            if self.ban_store.unban(pubkey):
+                self.bot_detector.reset_user_stats(pubkey)
+                return True
+            return False
 
     def get_moderation_stats(self) -> Dict:
         """Retorna estatísticas de moderação"""
+        banned = self.ban_store.get_banned()
+        with self._lock:
+            bot_detector_stats = self.bot_detector.get_stats()
+
         return {
-            'total_bans': len(self.banned_pubkeys),
-            'total_warnings': sum(self.warned_pubkeys.values()),
-            'recent_actions': self.moderation_log[-20:],
-            'banned_pubkeys': list(self.banned_pubkeys)
+            'total_bans': len(banned),
+            'total_warnings': sum(self.ban_store.get_all_warnings().values()),
+            'recent_actions': self.ban_store.recent_log(20),
+            'banned_pubkeys': list(banned),
+            'bot_detector': bot_detector_stats
         }
 
 
@@ -409,6 +599,8 @@ if __name__ == "__main__":
         }
     ]
 
+    # Eventos de exemplo não são assinados
+    moderation_system.verify_signatures = False
     for event in test_events:
         approved, reason, details = moderation_system.moderate_event(event)
         print(f"Evento de {event['pubkey']}: {'✅ APROVADO' if approved else '❌ REJEITADO'}")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Detecção de Quase-Duplicatas - Sofia LiberNet
+
+MinHash + LSH por bandas para achar conteúdo repetido com pequenas
+mutações (spam com um número, link ou palavra trocada):
+- Shingles de 5 caracteres do texto normalizado
+- Assinatura de 64 mínimos (hashes estáveis entre processos, sem hash() do Python)
+- 16 bandas de 4 linhas: Jaccard 0.7 vira candidato com ~99% de chance
+- Índice global limitado (LRU) com as contas que postaram cada conteúdo
+- Consulta e inserção O(1) (buckets com tamanho máximo)
+
+Uso:
+    index = MinHashIndex(max_entries=100000)
+    signature = minhash_signature("Compre bitcoin barato em http://scam.example")
+    entry = index.find(signature)
+    index.add(signature, pubkey, entry)
+"""
+
+import re
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+DEFAULT_THRESHOLD = 0.6  # Jaccard estimado mínimo para considerar duplicata
+
+WHITESPACE_REGEX = re.compile(r'\s+')
+
+# Sementes fixas: assinaturas comparáveis entre processos e reinícios
+_SEEDS = np.frombuffer(
+    hashlib.blake2b(b'sofia-minhash', digest_size=64).digest() * (NUM_PERMUTATIONS * 8 // 64),
+    dtype=np.uint64
+)[:NUM_PERMUTATIONS].copy()
+_SEEDS ^= np.arange(NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize(text: str) -> str:
+    """casefold + espaços colapsados"""
+    return WHITESPACE_REGEX.sub(' ', text.casefold()).strip()
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """
+    Hashes (uint64, únicos) dos shingles de caracteres do texto normalizado
+
+    Cada shingle é combinado de forma polinomial a partir dos code points,
+    sem laço Python por shingle.
+    """
+    normalized = normalize(text)
+    codepoints = np.frombuffer(normalized.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+    if len(codepoints) < SHINGLE_SIZE:
+        codepoints = np.concatenate([codepoints, np.zeros(SHINGLE_SIZE - len(codepoints), dtype=np.uint64)])
+
+    count = len(codepoints) - SHINGLE_SIZE + 1
+    combined = np.zeros(count, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        combined = combined * np.uint64(0x100000001B3) + codepoints[offset:offset + count]
+
+    return np.unique(_mix64(combined))
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """Finalizador splitmix64 vetorizado (aritmética uint64 com wrap)"""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    Calcula a assinatura MinHash de um texto
+
+    Args:
+        text: Conteúdo
+
+    Returns:
+        Array uint64 com NUM_PERMUTATIONS mínimos
+    """
+    permuted = _mix64(shingle_hashes(text)[:, None] ^ _SEEDS[None, :])
+    return permuted.min(axis=0)
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERMUTATIONS
+
+
+class DuplicateEntry:
+    """Conteúdo indexado e as contas que o publicaram"""
+
+    __slots__ = ('entry_id', 'signature', 'pubkeys', 'count', 'first_seen', 'last_seen')
+
+    def __init__(self, entry_id: int, signature: np.ndarray, now: float):
+        self.entry_id = entry_id
+        self.signature = signature
+        self.pubkeys: Set[str] = set()
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+
+
+class MinHashIndex:
+    """Índice LSH limitado de assinaturas MinHash"""
+
+    def __init__(self, max_entries: int = 100000, threshold: float = DEFAULT_THRESHOLD,
+                 max_bucket_size: int = 16, max_pubkeys_per_entry: int = 64):
+        """
+        Args:
+            max_entries: Máximo de conteúdos mantidos (os menos recentes saem)
+            threshold: Jaccard estimado mínimo para considerar duplicata
+            max_bucket_size: Limite de candidatos por bucket (consulta O(1))
+            max_pubkeys_per_entry: Limite de contas registradas por conteúdo
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_bucket_size = max_bucket_size
+        self.max_pubkeys_per_entry = max_pubkeys_per_entry
+
+        self.entries: OrderedDict = OrderedDict()  # entry_id -> DuplicateEntry
+        self.buckets: Dict[bytes, List[int]] = {}  # banda -> entry_ids
+        self._next_id = 0
+
+    @staticmethod
+    def _band_keys(signature: np.ndarray) -> List[bytes]:
+        raw = signature.tobytes()
+        band_size = ROWS_PER_BAND * 8
+        return [bytes([band]) + raw[band * band_size:(band + 1) * band_size] for band in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def find(self, signature: np.ndarray) -> Optional[DuplicateEntry]:
+        """
+        Busca o conteúdo indexado mais parecido acima do threshold
+
+        Returns:
+            DuplicateEntry ou None
+        """
+        best, best_score = None, self.threshold
+        checked = set()
+
+        for key in self._band_keys(signature):
+            for entry_id in self.buckets.get(key, ()):
+                if entry_id in checked:
+                    continue
+                checked.add(entry_id)
+                entry = self.entries[entry_id]
+                score = estimated_jaccard(signature, entry.signature)
+                if score >= best_score:
+                    best, best_score = entry, score
+        return best
+
+    def add(self, signature: np.ndarray, pubkey: str, entry: Optional[DuplicateEntry] = None,
+            now: Optional[float] = None) -> DuplicateEntry:
+        """
+        Registra uma ocorrência (na entrada quase-duplicata ou em uma nova)
+
+        Args:
+            signature: Assinatura MinHash do conteúdo
+            pubkey: Autor
+            entry: Entrada já encontrada por find() (opcional)
+
+        Returns:
+            Entrada atualizada
+        """
+        now = now or time.time()
+
+        if entry is None or entry.entry_id not in self.entries:
+            entry = DuplicateEntry(self._next_id, signature, now)
+            self._next_id += 1
+            self.entries[entry.entry_id] = entry
+            for key in self._band_keys(signature):
+                bucket = self.buckets.setdefault(key, [])
+                bucket.append(entry.entry_id)
+                if len(bucket) > self.max_bucket_size:
+                    bucket.pop(0)
+            self._evict()
+        else:
+            # Conteúdo ativo vai para o fim da fila de descarte
+            self.entries.move_to_end(entry.entry_id)
+
+        entry.count += 1
+        entry.last_seen = now
+        if len(entry.pubkeys) < self.max_pubkeys_per_entry:
+            entry.pubkeys.add(pubkey)
+        return entry
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            entry_id, entry = self.entries.popitem(last=False)
+            for key in self._band_keys(entry.signature):
+                bucket = self.buckets.get(key)
+                if bucket and entry_id in bucket:
+                    bucket.remove(entry_id)
+                    if not bucket:
+                        del self.buckets[key]
+
+    def forget_pubkey(self, pubkey: str, entry_ids: List[int]):
+        """Remove um pubkey das entradas informadas (ex.: após unban)"""
+        for entry_id in entry_ids:
+            entry = self.entries.get(entry_id)
+            if entry:
+                entry.pubkeys.discard(pubkey)
+
+    def get_stats(self) -> Dict:
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'buckets': len(self.buckets)
+        }
+
+
+if __name__ == "__main__":
+    print("🧬 Detecção de Quase-Duplicatas - Sofia LiberNet")
+    print("=" * 60)
+
+    base = "Ganhe 500 sats agora mesmo, clique no link e resgate seu bônus exclusivo hoje"
+    variants = [
+        base,
+        base + "!!",
+        base.replace("500", "700"),
+        base.replace("hoje", "já"),
+        "Bom dia Nostr, hoje o dia está lindo para caminhar na praia",
+    ]
+
+    base_signature = minhash_signature(base)
+    for text in variants:
+        print(f"J≈{estimated_jaccard(base_signature, minhash_signature(text)):.2f}  {text[:60]}")
+
+    index = MinHashIndex(max_entries=1000)
+    for i, text in enumerate(variants):
+        signature = minhash_signature(text)
+        match = index.find(signature)
+        accounts = len(match.pubkeys) if match else 0
+        index.add(signature, f"pubkey{i}", match)
+        print(f"pubkey{i}: {f'quase-duplicata de {accounts} conta(s)' if match else 'novo'}")
+
+    start = time.perf_counter()
+    for i in range(2000):
+        signature = minhash_signature(f"{base} variação {i}")
+        index.add(signature, "bench", index.find(signature))
+    elapsed = time.perf_counter() - start
+    print(f"\n2000 consultas+inserções em {elapsed:.3f}s ({2000 / elapsed:,.0f}/s)")
@@ -10,33 +10,166 @@ Permite Sofia atuar como uma identidade ativa na rede Nostr:
 - Integração com relay.libernet.app
 """
 
+import ssl
 import time
 import json
-import hashlib
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import uuid
+import threading
+from typing import Optional, List, Dict, Any, Tuple
+import websocket
 from pynostr.key import PrivateKey, PublicKey
 from pynostr.event import Event, EventKind
-from pynostr.relay_manager import RelayManager
-from pynostr.filters import FiltersList, Filters
-from pynostr.message_type import ClientMessageType
+from nostr_verify import event_verifier
+from nostr_outbox import NostrOutbox, nostr_outbox
+
+# Timeouts padrão (segundos)
+NOSTR_CONNECT_TIMEOUT = 5.0
+NOSTR_OK_TIMEOUT = 5.0
+NOSTR_QUERY_TIMEOUT = 5.0
+# Reconexão após queda do socket (backoff exponencial)
+NOSTR_RECONNECT_BACKOFF_BASE = 1.0
+NOSTR_RECONNECT_BACKOFF_MAX = 60.0
+
+
+class RelayConnection:
+    """Conexão WebSocket síncrona com um relay (subset NIP-01)"""
+
+    def __init__(self, url: str, timeout: float = NOSTR_CONNECT_TIMEOUT):
+        """
+        Args:
+            url: URL ws:// ou wss:// do relay
+            timeout: Timeout de conexão em segundos
+        """
+        self.url = url
+        self.timeout = timeout
+        self.ws: Optional[websocket.WebSocket] = None
+        # Uma troca (envio + leitura das respostas) por vez: com duas threads lendo o
+        # mesmo socket, frames de uma assinatura seriam descartados pela outra
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Abre a conexão com o relay"""
+        # Certificado do relay sempre verificado em wss://
+        sslopt = {"cert_reqs": ssl.CERT_REQUIRED} if self.url.startswith("wss://") else None
+        self.ws = websocket.create_connection(self.url, timeout=self.timeout, sslopt=sslopt)
+
+    def close(self):
+        """Fecha a conexão (ignora erros)"""
+        if self.ws:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.ws is not None and self.ws.connected
+
+    def send(self, message: list):
+        """Envia uma mensagem NIP-01 (array JSON)"""
+        self.ws.send(json.dumps(message, ensure_ascii=False))
+
+    def recv(self, deadline: float) -> Optional[list]:
+        """
+        Recebe a próxima mensagem até o deadline (time.monotonic)
+
+        Returns:
+            Mensagem decodificada ou None se o deadline expirou
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+
+        self.ws.settimeout(remaining)
+        try:
+            raw = self.ws.recv()
+        except websocket.WebSocketTimeoutException:
+            return None
+
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return []
+        return message if isinstance(message, list) else []
+
+    def publish(self, event: Dict[str, Any], timeout: float = NOSTR_OK_TIMEOUT) -> Tuple[bool, str]:
+        """
+        Envia EVENT e aguarda o OK correspondente (NIP-20)
+
+        Returns:
+            (aceito, mensagem do relay)
+        """
+        with self._lock:
+            self.send(["EVENT", event])
+            deadline = time.monotonic() + timeout
+
+            while True:
+                message = self.recv(deadline)
+                if message is None:
+                    return False, "timeout: relay não confirmou o evento"
+                if len(message) >= 3 and message[0] == "OK" and message[1] == event["id"]:
+                    return bool(message[2]), message[3] if len(message) > 3 else ""
+
+    def query(self, filters: List[Dict[str, Any]], timeout: float = NOSTR_QUERY_TIMEOUT) -> List[Dict[str, Any]]:
+        """
+        Envia REQ e coleta eventos até o EOSE (ou timeout), depois fecha a assinatura
+
+        Returns:
+            Lista de eventos (dicts NIP-01)
+        """
+        subscription_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self.send(["REQ", subscription_id, *filters])
+            deadline = time.monotonic() + timeout
+
+            events = []
+            while True:
+                message = self.recv(deadline)
+                if message is None:
+                    break
+                if len(message) >= 2 and message[1] == subscription_id:
+                    if message[0] == "EOSE" or message[0] == "CLOSED":
+                        break
+                    if message[0] == "EVENT" and len(message) >= 3:
+                        events.append(message[2])
+
+            try:
+                self.send(["CLOSE", subscription_id])
+            except Exception:
+                pass
+
+        return events
 
 
 class NostrClient:
     """Cliente Nostr para Sofia LiberNet"""
 
-    def __init__(self, relay_url: str = "wss://relay.libernet.app"):
+    def __init__(self, relay_url: str = "wss://relay.libernet.app",
+                 query_timeout: float = NOSTR_QUERY_TIMEOUT,
+                 outbox: Optional[NostrOutbox] = None):
         """
         Inicializa cliente Nostr
 
         Args:
             relay_url: URL do relay Nostr (padrão: relay.libernet.app)
+            query_timeout: Tempo máximo de espera por EOSE/OK em segundos
+            outbox: Fila de publicação (padrão: outbox global)
         """
         self.relay_url = relay_url
-        self.relay_manager = RelayManager()
+        self.query_timeout = query_timeout
+        self.outbox = outbox or nostr_outbox
+        self.relay: Optional[RelayConnection] = None
         self.private_key: Optional[PrivateKey] = None
         self.public_key: Optional[PublicKey] = None
         self.connected = False
+        # Reconexão automática só enquanto a conexão for desejada (connect sem disconnect)
+        self._keep_connected = False
+        self._reconnect_delay = NOSTR_RECONNECT_BACKOFF_BASE
+        self._next_reconnect_at = 0.0
+        # O nostr_client global é compartilhado pelas threads do worker (gthread):
+        # conexão, reconexão e consultas passam por este lock
+        self._lock = threading.RLock()
         # Relays backup para buscar perfis
         self.backup_relays = [
             "wss://relay.damus.io",
@@ -46,25 +179,78 @@ class NostrClient:
 
     def connect(self):
         """Conecta ao relay Nostr"""
+        with self._lock:
+            return self._connect()
+
+    def _connect(self) -> bool:
+        self._keep_connected = True
         try:
-            self.relay_manager.add_relay(self.relay_url)
-            self.relay_manager.open_connections({"cert_reqs": None})
-            time.sleep(1)  # Aguardar conexão
+            if self.relay:
+                self.relay.close()
+            self.relay = RelayConnection(self.relay_url)
+            self.relay.open()
             self.connected = True
+            self._reconnect_delay = NOSTR_RECONNECT_BACKOFF_BASE
+            self._next_reconnect_at = 0.0
             print(f"[NOSTR] Conectado a {self.relay_url}")
             return True
         except Exception as e:
+            self.connected = False
+            # Próxima tentativa automática só depois do backoff
+            self._next_reconnect_at = time.monotonic() + self._reconnect_delay
+            self._reconnect_delay = min(NOSTR_RECONNECT_BACKOFF_MAX, self._reconnect_delay * 2)
             print(f"[NOSTR] Erro ao conectar: {e}")
             return False
 
     def disconnect(self):
         """Desconecta do relay"""
-        try:
-            self.relay_manager.close_connections()
-            self.connected = False
-            print("[NOSTR] Desconectado")
-        except Exception as e:
-            print(f"[NOSTR] Erro ao desconectar: {e}")
+        with self._lock:
+            self._keep_connected = False
+            try:
+                if self.relay:
+                    self.relay.close()
+                self.connected = False
+                print("[NOSTR] Desconectado")
+            except Exception as e:
+                print(f"[NOSTR] Erro ao desconectar: {e}")
+
+    def _mark_disconnected(self, error: Exception):
+        """Socket caiu: fecha e marca como desconectado (chamar com self._lock)"""
+        print(f"[NOSTR] ⚠️ Conexão com {self.relay_url} perdida: {error}")
+        self.connected = False
+        if self.relay:
+            self.relay.close()
+
+    def ensure_connected(self) -> bool:
+        """
+        Garante a conexão, reconectando (com backoff) se o socket caiu
+
+        Returns:
+            True se conectado
+        """
+        with self._lock:
+            if self.connected and self.relay and self.relay.is_open:
+                return True
+            if self.connected:
+                self._mark_disconnected(ConnectionError("socket fechado"))
+            if not self._keep_connected or time.monotonic() < self._next_reconnect_at:
+                return False
+            print(f"[NOSTR] 🔄 Reconectando a {self.relay_url}...")
+            return self._connect()
+
+    def _query(self, filters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """REQ no relay principal; se o socket cair no meio, reconecta e tenta uma vez mais"""
+        # Lock da consulta inteira: nenhuma outra thread fecha/reabre o socket no meio
+        with self._lock:
+            if not self.relay:
+                raise ConnectionError("relay não conectado")
+            try:
+                return self.relay.query(filters, self.query_timeout)
+            except (websocket.WebSocketException, OSError) as e:
+                self._mark_disconnected(e)
+                if not self.ensure_connected():
+                    raise
+                return self.relay.query(filters, self.query_timeout)
 
     def load_identity(self, nsec: str) -> bool:
         """
@@ -144,46 +330,52 @@ class NostrClient:
         except:
             return None
 
+    def build_event(self, content: str, kind: int, tags: Optional[List[List[str]]] = None) -> Event:
+        """
+        Cria e assina um evento com a identidade atual
+
+        Args:
+            content: Conteúdo do evento
+            kind: Kind NIP-01
+            tags: Tags opcionais
+
+        Returns:
+            Evento assinado (id e sig preenchidos)
+        """
+        event = Event(
+            content=content,
+            pubkey=self.public_key.hex(),
+            kind=kind,
+            tags=tags or []
+        )
+        event.sign(self.private_key.hex())
+        return event
+
     def publish_note(self, content: str, tags: Optional[List[List[str]]] = None) -> Optional[str]:
         """
-        Publica uma nota no Nostr
+        Publica uma nota no Nostr (assíncrono, via outbox)
+
+        O evento é assinado e gravado na outbox; o publicador em background
+        envia ao relay, faz retry e registra o OK. Status em
+        outbox.get_event_status(event_id).
 
         Args:
             content: Conteúdo da nota
             tags: Tags opcionais (ex: [["p", "npub..."], ["t", "hashtag"]])
 
         Returns:
-            ID do evento publicado ou None
+            ID do evento enfileirado ou None
         """
         if not self.private_key:
             print("[NOSTR] Erro: Identidade não carregada")
             return None
 
-        if not self.connected:
-            print("[NOSTR] Erro: Não conectado ao relay")
-            return None
-
         try:
-            # Criar evento
-            event = Event(
-                content=content,
-                public_key=self.public_key.hex(),
-                kind=EventKind.TEXT_NOTE
-            )
-
-            # Adicionar tags se fornecidas
-            if tags:
-                event.tags = tags
-
-            # Assinar evento
-            self.private_key.sign_event(event)
-
-            # Publicar
-            self.relay_manager.publish_event(event)
-            time.sleep(0.5)  # Aguardar confirmação
-
-            event_id = event.id
-            print(f"[NOSTR] Nota publicada: {event_id[:16]}...")
+            # Criar e assinar evento
+            event = self.build_event(content, EventKind.TEXT_NOTE, tags)
+
+            event_id = self.outbox.enqueue(event.to_dict(), [self.relay_url])
+            print(f"[NOSTR] Nota enfileirada: {event_id[:16]}...")
             return event_id
 
         except Exception as e:
@@ -224,40 +416,62 @@ class NostrClient:
             print("[NOSTR] Erro: Identidade não carregada")
             return []
 
-        if not self.connected:
+        if not self.ensure_connected():
             print("[NOSTR] Erro: Não conectado ao relay")
             return []
 
         try:
             # Filtro para eventos que mencionam Sofia (tag 'p' com nosso pubkey)
-            filters = FiltersList([
-                Filters(
-                    pubkey_refs=[self.public_key.hex()],
-                    kinds=[EventKind.TEXT_NOTE],
-                    since=since,
-                    limit=limit
-                )
-            ])
+            mention_filter = {
+                "#p": [self.public_key.hex()],
+                "kinds": [EventKind.TEXT_NOTE],
+                "limit": limit
+            }
+            if since is not None:
+                mention_filter["since"] = since
+
+            # Coletar eventos até o EOSE, descartando ids/assinaturas inválidos
+            events = self._query([mention_filter])
+            events = event_verifier.filter_valid(events)
 
-            subscription_id = "sofia_mentions"
-            self.relay_manager.add_subscription(subscription_id, filters)
+            print(f"[NOSTR] Encontradas {len(events)} menções")
+            return events
 
-            time.sleep(2)  # Aguardar respostas
+        except Exception as e:
+            print(f"[NOSTR] Erro ao buscar menções: {e}")
+            return []
 
-            # Coletar eventos
-            events = []
-            while self.relay_manager.message_pool.has_events():
-                event_msg = self.relay_manager.message_pool.get_event()
-                if event_msg:
-                    events.append(event_msg.event.__dict__)
+    def fetch_recent_events(self, kinds: Optional[List[int]] = None, limit: int = 100,
+                            since: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Busca eventos recentes do relay (ex.: para moderação)
 
-            self.relay_manager.close_subscription(subscription_id)
+        Args:
+            kinds: Kinds a buscar (padrão: notas e reposts)
+            limit: Número máximo de eventos
+            since: Timestamp UNIX para buscar desde
 
-            print(f"[NOSTR] Encontradas {len(events)} menções")
+        Returns:
+            Lista de eventos (dicts NIP-01), mais recentes primeiro
+        """
+        if not self.ensure_connected():
+            print("[NOSTR] Erro: Não conectado ao relay")
+            return []
+
+        try:
+            recent_filter = {
+                "kinds": kinds or [EventKind.TEXT_NOTE, 6],  # 6 = repost (NIP-18)
+                "limit": limit
+            }
+            if since is not None:
+                recent_filter["since"] = since
+
+            events = self._query([recent_filter])
+            print(f"[NOSTR] {len(events)} eventos recentes recebidos")
             return events
 
         except Exception as e:
-            print(f"[NOSTR] Erro ao buscar menções: {e}")
+            print(f"[NOSTR] Erro ao buscar eventos recentes: {e}")
             return []
 
     def fetch_user_profile(self, pubkey_hex: str) -> Optional[Dict[str, Any]]:
@@ -270,47 +484,18 @@ class NostrClient:
         Returns:
             Dict com metadados do perfil ou None se não encontrado
         """
-        if not self.connected:
+        if not self.ensure_connected():
             print("[NOSTR] Erro: Não conectado ao relay")
             return None
 
         try:
             print(f"[NOSTR] 🔍 Buscando perfil para pubkey: {pubkey_hex[:16]}...")
 
-            # Filtro para metadados do usuário (kind 0)
-            filters = FiltersList([
-                Filters(
-                    authors=[pubkey_hex],
-                    kinds=[EventKind.SET_METADATA],
-                    limit=1
-                )
-            ])
-
-            subscription_id = f"profile_{pubkey_hex[:8]}"
-            print(f"[NOSTR] 📡 Adicionando subscription: {subscription_id}")
-            self.relay_manager.add_subscription(subscription_id, filters)
-
-            # Aumentado para 5 segundos para dar mais tempo ao relay
-            print("[NOSTR] ⏳ Aguardando resposta do relay (5s)...")
-            time.sleep(5)
-
-            # Coletar eventos
-            profile_data = None
-            events_found = 0
-            while self.relay_manager.message_pool.has_events():
-                event_msg = self.relay_manager.message_pool.get_event()
-                events_found += 1
-                if event_msg and event_msg.event:
-                    try:
-                        profile_data = json.loads(event_msg.event.content)
-                        print(f"[NOSTR] 📦 Evento parseado: {profile_data}")
-                        break  # Usar apenas o primeiro (mais recente)
-                    except Exception as parse_error:
-                        print(f"[NOSTR] ⚠️ Erro ao parsear evento: {parse_error}")
-                        pass
-
-            print(f"[NOSTR] 📊 Total de eventos recebidos: {events_found}")
-            self.relay_manager.close_subscription(subscription_id)
+            # Filtro para metadados do usuário (kind 0); aguarda até EOSE
+            events = self._query([self.profile_filter(pubkey_hex)])
+            profile_data = self.parse_profile_events(events)
+
+            print(f"[NOSTR] 📊 Total de eventos recebidos: {len(events)}")
 
             if profile_data:
                 print(f"[NOSTR] ✅ Perfil encontrado: {profile_data.get('name', 'sem nome')}")
@@ -332,6 +517,32 @@ class NostrClient:
             except:
                 return None
 
+    @staticmethod
+    def profile_filter(pubkey_hex: str) -> Dict[str, Any]:
+        """Filtro NIP-01 para o metadata (kind 0) de um pubkey"""
+        return {
+            "authors": [pubkey_hex],
+            "kinds": [EventKind.SET_METADATA],
+            "limit": 1
+        }
+
+    @staticmethod
+    def parse_profile_events(events: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Extrai o perfil do evento kind 0 mais recente
+
+        Returns:
+            Dict com metadados ou None
+        """
+        for event in sorted(events, key=lambda e: e.get("created_at", 0), reverse=True):
+            try:
+                profile_data = json.loads(event.get("content", ""))
+                if isinstance(profile_data, dict):
+                    return profile_data
+            except Exception as parse_error:
+                print(f"[NOSTR] ⚠️ Erro ao parsear evento: {parse_error}")
+        return None
+
     def fetch_from_backup_relays(self, pubkey_hex: str) -> Optional[Dict[str, Any]]:
         """
         Tenta buscar perfil em relays backup
@@ -343,47 +554,24 @@ class NostrClient:
             Dict com perfil ou None
         """
         for backup_relay in self.backup_relays:
+            temp_relay = RelayConnection(backup_relay)
             try:
                 print(f"[NOSTR] 🔍 Tentando relay backup: {backup_relay}")
 
-                # Criar novo relay manager temporário
-                temp_manager = RelayManager()
-                temp_manager.add_relay(backup_relay)
-                temp_manager.open_connections({"cert_reqs": None})
-                time.sleep(2)
-
-                # Buscar perfil
-                filters = FiltersList([
-                    Filters(
-                        authors=[pubkey_hex],
-                        kinds=[EventKind.SET_METADATA],
-                        limit=1
-                    )
-                ])
-
-                subscription_id = f"backup_{pubkey_hex[:8]}"
-                temp_manager.add_subscription(subscription_id, filters)
-                time.sleep(3)
-
-                # Coletar eventos
-                while temp_manager.message_pool.has_events():
-                    event_msg = temp_manager.message_pool.get_event()
-                    if event_msg and event_msg.event:
-                        try:
-                            profile_data = json.loads(event_msg.event.content)
-                            print(f"[NOSTR] ✅ Perfil encontrado em {backup_relay}!")
-                            temp_manager.close_subscription(subscription_id)
-                            temp_manager.close_connections()
-                            return profile_data
-                        except:
-                            pass
-
-                temp_manager.close_subscription(subscription_id)
-                temp_manager.close_connections()
+                # Conexão temporária só para esta busca
+                temp_relay.open()
+                events = temp_relay.query([self.profile_filter(pubkey_hex)], self.query_timeout)
+                profile_data = self.parse_profile_events(events)
+
+                if profile_data:
+                    print(f"[NOSTR] ✅ Perfil encontrado em {backup_relay}!")
+                    return profile_data
 
             except Exception as e:
                 print(f"[NOSTR] ⚠️ Falha no relay {backup_relay}: {e}")
                 continue
+            finally:
+                temp_relay.close()
 
         print("[NOSTR] ❌ Perfil não encontrado em nenhum relay")
         return None
@@ -407,30 +595,23 @@ class NostrClient:
 
     def publish_profile(self) -> Optional[str]:
         """
-        Publica metadados do perfil Sofia (NIP-01 kind 0)
+        Publica metadados do perfil Sofia (NIP-01 kind 0, via outbox)
 
         Returns:
-            ID do evento publicado ou None
+            ID do evento enfileirado ou None
         """
-        if not self.private_key or not self.connected:
-            print("[NOSTR] Erro: Identidade não carregada ou não conectado")
+        if not self.private_key:
+            print("[NOSTR] Erro: Identidade não carregada")
             return None
 
         try:
             metadata = self.get_profile_metadata()
 
-            event = Event(
-                content=json.dumps(metadata),
-                public_key=self.public_key.hex(),
-                kind=EventKind.SET_METADATA  # kind 0
-            )
-
-            self.private_key.sign_event(event)
-            self.relay_manager.publish_event(event)
-            time.sleep(0.5)
+            event = self.build_event(json.dumps(metadata), EventKind.SET_METADATA)  # kind 0
 
-            print(f"[NOSTR] Perfil publicado: {event.id[:16]}...")
-            return event.id
+            event_id = self.outbox.enqueue(event.to_dict(), [self.relay_url])
+            print(f"[NOSTR] Perfil enfileirado: {event_id[:16]}...")
+            return event_id
 
         except Exception as e:
             print(f"[NOSTR] Erro ao publicar perfil: {e}")
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Outbox Nostr - Sofia LiberNet
+
+Fila persistente de publicação de eventos Nostr:
+- Eventos assinados ficam em SQLite até serem confirmados (OK) pelos relays
+- Status por relay: pending → ok | rejected | failed
+- Publicador em background com retry e backoff exponencial
+- Sobrevive a reinícios (eventos pendentes são reenviados)
+- Seguro com vários workers gunicorn (entregas são reservadas por lease)
+
+Uso:
+    nostr_outbox.start()  # na inicialização de cada worker (app.py)
+    event_id = nostr_outbox.enqueue(event.to_dict(), ["wss://relay.libernet.app"])
+    nostr_outbox.get_event_status(event_id)
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "data", "sofia_nostr.db")
+
+# Retry
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('NOSTR_OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_BACKOFF_BASE = 2.0      # segundos
+OUTBOX_BACKOFF_MAX = 600.0     # segundos
+OUTBOX_ACK_TIMEOUT = 10.0      # espera máxima pelos OKs de um lote
+OUTBOX_LEASE_SECONDS = 60      # reserva de uma entrega por um publicador
+OUTBOX_BATCH_SIZE = 100        # entregas por relay por ciclo
+OUTBOX_IDLE_POLL = 5.0         # intervalo de verificação sem trabalho
+OUTBOX_CONNECTION_IDLE = 120.0 # fecha conexões ociosas após esse tempo
+
+# Prefixos NIP-20 que indicam falha definitiva (não adianta reenviar)
+PERMANENT_REJECTIONS = ('blocked:', 'invalid:', 'pow:', 'restricted:')
+
+
+class NostrOutbox:
+    """Fila persistente de eventos Nostr com publicador em background"""
+
+    def __init__(self, db_path: str = DB_PATH, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 ack_timeout: float = OUTBOX_ACK_TIMEOUT):
+        """
+        Args:
+            db_path: Caminho do banco SQLite da outbox
+            max_attempts: Tentativas por relay antes de marcar como failed
+            ack_timeout: Tempo máximo de espera pelos OKs de um lote (s)
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.ack_timeout = ack_timeout
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._connections: Dict[str, object] = {}
+        self._last_used: Dict[str, float] = {}
+
+        self._init_database()
+
+    # ============= BANCO DE DADOS =============
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        """Cria tabelas da outbox"""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS outbox_events (
+                event_id TEXT PRIMARY KEY,
+                event_json TEXT NOT NULL,
+                kind INTEGER,
+                status TEXT DEFAULT 'pending',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                completed_at DATETIME
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS outbox_deliveries (
+                event_id TEXT NOT NULL,
+                relay_url TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL DEFAULT 0,
+                lease_owner TEXT,
+                lease_until REAL DEFAULT 0,
+                last_error TEXT,
+                relay_message TEXT,
+                acked_at DATETIME,
+                PRIMARY KEY (event_id, relay_url),
+                FOREIGN KEY (event_id) REFERENCES outbox_events(event_id)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_outbox_deliveries_due
+            ON outbox_deliveries(status, next_attempt_at)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    # ============= API PÚBLICA =============
+
+    def enqueue(self, event: Dict, relays: List[str]) -> str:
+        """
+        Enfileira um evento assinado para publicação
+
+        Args:
+            event: Evento NIP-01 assinado (dict com id e sig)
+            relays: URLs dos relays de destino
+
+        Returns:
+            ID do evento
+        """
+        event_id = event['id']
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO outbox_events (event_id, event_json, kind)
+            VALUES (?, ?, ?)
+        """, (event_id, json.dumps(event, ensure_ascii=False), event.get('kind')))
+        cursor.executemany("""
+            INSERT OR IGNORE INTO outbox_deliveries (event_id, relay_url)
+            VALUES (?, ?)
+        """, [(event_id, relay_url) for relay_url in relays])
+        conn.commit()
+        conn.close()
+
+        self.start()
+        self._wake.set()
+        return event_id
+
+    def get_event_status(self, event_id: str) -> Optional[Dict]:
+        """
+        Retorna status de um evento e de cada relay
+
+        Returns:
+            Dict com status geral e entregas, ou None se não existir
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT event_id, kind, status, created_at, completed_at
+            FROM outbox_events WHERE event_id = ?
+        """, (event_id,))
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return None
+
+        cursor.execute("""
+            SELECT relay_url, status, attempts, next_attempt_at, last_error, relay_message, acked_at
+            FROM outbox_deliveries WHERE event_id = ?
+        """, (event_id,))
+        deliveries = [dict(d) for d in cursor.fetchall()]
+        conn.close()
+
+        return {**dict(row), 'deliveries': deliveries}
+
+    def list_events(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Lista eventos mais recentes da outbox (opcionalmente por status)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if status:
+            cursor.execute("""
+                SELECT event_id, kind, status, created_at, completed_at
+                FROM outbox_events WHERE status = ?
+                ORDER BY created_at DESC LIMIT ?
+            """, (status, limit))
+        else:
+            cursor.execute("""
+                SELECT event_id, kind, status, created_at, completed_at
+                FROM outbox_events ORDER BY created_at DESC LIMIT ?
+            """, (limit,))
+
+        events = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return events
+
+    def get_stats(self) -> Dict:
+        """Contagem de eventos e entregas por status"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT status, COUNT(*) FROM outbox_events GROUP BY status")
+        events = {row[0]: row[1] for row in cursor.fetchall()}
+
+        cursor.execute("SELECT relay_url, status, COUNT(*) FROM outbox_deliveries GROUP BY relay_url, status")
+        relays: Dict[str, Dict[str, int]] = {}
+        for relay_url, status, count in cursor.fetchall():
+            relays.setdefault(relay_url, {})[status] = count
+
+        conn.close()
+        return {
+            'events': events,
+            'relays': relays,
+            'publisher_running': bool(self._thread and self._thread.is_alive())
+        }
+
+    def wait_for(self, event_id: str, timeout: float = 10.0, interval: float = 0.005) -> Optional[Dict]:
+        """
+        Aguarda o evento sair de 'pending' (útil em scripts e benchmarks)
+
+        Returns:
+            Status final (ou atual, se o timeout expirar)
+        """
+        deadline = time.monotonic() + timeout
+        status = self.get_event_status(event_id)
+        while status and status['status'] == 'pending' and time.monotonic() < deadline:
+            time.sleep(interval)
+            status = self.get_event_status(event_id)
+        return status
+
+    def retry_failed(self, event_id: str) -> bool:
+        """Recoloca entregas com falha de um evento na fila"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE outbox_deliveries
+            SET status = 'pending', attempts = 0, next_attempt_at = 0
+            WHERE event_id = ? AND status = 'failed'
+        """, (event_id,))
+        updated = cursor.rowcount
+        if updated:
+            cursor.execute("""
+                UPDATE outbox_events SET status = 'pending', completed_at = NULL
+                WHERE event_id = ?
+            """, (event_id,))
+        conn.commit()
+        conn.close()
+
+        if updated:
+            self.start()
+            self._wake.set()
+        return updated > 0
+
+    # ============= PUBLICADOR =============
+
+    def start(self):
+        """Inicia o publicador em background (idempotente)"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='nostr-outbox', daemon=True)
+            self._thread.start()
+            print(f"[NOSTR OUTBOX] 🚀 Publicador iniciado ({self.worker_id})")
+
+    def stop(self, timeout: float = 5.0):
+        """Para o publicador e fecha conexões"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        for relay_url in list(self._connections):
+            self._close_relay(relay_url)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_due()
+            except Exception as e:
+                print(f"[NOSTR OUTBOX] ❌ Erro no publicador: {e}")
+                processed = 0
+
+            self._close_idle_connections()
+
+            if not processed:
+                self._wake.wait(self._seconds_until_next_due())
+                self._wake.clear()
+
+    def _seconds_until_next_due(self) -> float:
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT MIN(MAX(next_attempt_at, lease_until)) FROM outbox_deliveries
+                WHERE status = 'pending'
+            """)
+            next_due = cursor.fetchone()[0]
+            conn.close()
+        except sqlite3.Error:
+            return OUTBOX_IDLE_POLL
+
+        if next_due is None:
+            return OUTBOX_IDLE_POLL
+        return min(OUTBOX_IDLE_POLL, max(0.0, next_due - time.time()))
+
+    def _claim_due(self) -> Dict[str, List[Dict]]:
+        """Reserva entregas vencidas para este publicador, agrupadas por relay"""
+        now = time.time()
+        conn = self.get_connection()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                SELECT d.event_id, d.relay_url, d.attempts, e.event_json
+                FROM outbox_deliveries d
+                JOIN outbox_events e ON e.event_id = d.event_id
+                WHERE d.status = 'pending' AND d.next_attempt_at <= ? AND d.lease_until <= ?
+                ORDER BY d.next_attempt_at
+                LIMIT ?
+            """, (now, now, OUTBOX_BATCH_SIZE * 4))
+            rows = cursor.fetchall()
+
+            cursor.executemany("""
+                UPDATE outbox_deliveries SET lease_owner = ?, lease_until = ?
+                WHERE event_id = ? AND relay_url = ?
+            """, [(self.worker_id, now + OUTBOX_LEASE_SECONDS, row['event_id'], row['relay_url'])
+                  for row in rows])
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        by_relay: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_relay.setdefault(row['relay_url'], []).append(dict(row))
+        return by_relay
+
+    def process_due(self) -> int:
+        """
+        Publica todas as entregas vencidas (um ciclo do publicador)
+
+        Returns:
+            Número de entregas processadas
+        """
+        by_relay = self._claim_due()
+        processed = 0
+
+        for relay_url, deliveries in by_relay.items():
+            for start in range(0, len(deliveries), OUTBOX_BATCH_SIZE):
+                batch = deliveries[start:start + OUTBOX_BATCH_SIZE]
+                results = self._publish_batch(relay_url, batch)
+                self._record_results(relay_url, batch, results)
+                processed += len(batch)
+
+        return processed
+
+    def _get_relay(self, relay_url: str):
+        # Import tardio: nostr_integration importa esta outbox
+        from nostr_integration import RelayConnection
+
+        relay = self._connections.get(relay_url)
+        if relay is None or not relay.is_open:
+            relay = RelayConnection(relay_url)
+            relay.open()
+            self._connections[relay_url] = relay
+        self._last_used[relay_url] = time.monotonic()
+        return relay
+
+    def _close_relay(self, relay_url: str):
+        relay = self._connections.pop(relay_url, None)
+        self._last_used.pop(relay_url, None)
+        if relay:
+            relay.close()
+
+    def _close_idle_connections(self):
+        now = time.monotonic()
+        for relay_url, last_used in list(self._last_used.items()):
+            if now - last_used > OUTBOX_CONNECTION_IDLE:
+                self._close_relay(relay_url)
+
+    def _publish_batch(self, relay_url: str, batch: List[Dict]) -> Dict[str, tuple]:
+        """
+        Envia um lote de EVENTs (pipeline) e coleta os OKs
+
+        Returns:
+            {event_id: (aceito, mensagem)} - ausentes = sem resposta
+        """
+        results: Dict[str, tuple] = {}
+        try:
+            relay = self._get_relay(relay_url)
+            for delivery in batch:
+                relay.send(["EVENT", json.loads(delivery['event_json'])])
+
+            pending = {d['event_id'] for d in batch}
+            deadline = time.monotonic() + self.ack_timeout
+            while pending:
+                message = relay.recv(deadline)
+                if message is None:
+                    break
+                if len(message) >= 3 and message[0] == "OK" and message[1] in pending:
+                    pending.discard(message[1])
+                    results[message[1]] = (bool(message[2]), message[3] if len(message) > 3 else "")
+
+            if pending:
+                # Sem OK a tempo: conexão possivelmente ruim, reabrir no próximo ciclo
+                self._close_relay(relay_url)
+
+        except Exception as e:
+            print(f"[NOSTR OUTBOX] ⚠️ Falha no relay {relay_url}: {e}")
+            self._close_relay(relay_url)
+            for delivery in batch:
+                results.setdefault(delivery['event_id'], (None, f"error: {e}"))
+
+        return results
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record_results(self, relay_url: str, batch: List[Dict], results: Dict[str, tuple]):
+        """Grava OKs, falhas e próximos retries"""
+        now = time.time()
+        updates = []
+
+        for delivery in batch:
+            event_id = delivery['event_id']
+            attempts = delivery['attempts'] + 1
+            accepted, message = results.get(event_id, (None, "timeout: sem OK do relay"))
+            message = message or ""
+
+            if accepted or message.startswith('duplicate:'):
+                updates.append(('ok', attempts, 0, None, message, event_id, relay_url))
+            elif accepted is False and message.startswith(PERMANENT_REJECTIONS):
+                updates.append(('rejected', attempts, 0, message, message, event_id, relay_url))
+            elif attempts >= self.max_attempts:
+                updates.append(('failed', attempts, 0, message, None, event_id, relay_url))
+            else:
+                updates.append(('pending', attempts, now + self._backoff(attempts), message, None,
+                                event_id, relay_url))
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE outbox_deliveries
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, relay_message = ?,
+                lease_owner = NULL, lease_until = 0,
+                acked_at = CASE WHEN ? = 'ok' THEN CURRENT_TIMESTAMP ELSE acked_at END
+            WHERE event_id = ? AND relay_url = ?
+        """, [(status, attempts, next_at, error, relay_message, status, event_id, url)
+              for status, attempts, next_at, error, relay_message, event_id, url in updates])
+
+        # Status geral: published se algum relay aceitou e nenhum está pendente
+        event_ids = [(d['event_id'],) for d in batch]
+        cursor.executemany("""
+            UPDATE outbox_events SET
+                status = CASE
+                    WHEN EXISTS (SELECT 1 FROM outbox_deliveries d
+                                 WHERE d.event_id = outbox_events.event_id AND d.status = 'pending')
+                        THEN 'pending'
+                    WHEN EXISTS (SELECT 1 FROM outbox_deliveries d
+                                 WHERE d.event_id = outbox_events.event_id AND d.status = 'ok')
+                        THEN 'published'
+                    ELSE 'failed'
+                END,
+                completed_at = CASE
+                    WHEN EXISTS (SELECT 1 FROM outbox_deliveries d
+                                 WHERE d.event_id = outbox_events.event_id AND d.status = 'pending')
+                        THEN NULL
+                    ELSE COALESCE(completed_at, CURRENT_TIMESTAMP)
+                END
+            WHERE event_id = ?
+        """, event_ids)
+        conn.commit()
+        conn.close()
+
+        accepted = sum(1 for update in updates if update[0] == 'ok')
+        print(f"[NOSTR OUTBOX] 📤 {relay_url}: {accepted}/{len(updates)} eventos confirmados")
+
+        for status, attempts, _, error, _, event_id, url in updates:
+            if status == 'ok':
+                continue
+            if status == 'pending':
+                print(f"[NOSTR OUTBOX] 🔄 {event_id[:16]}... tentativa {attempts} em {url}: {error}")
+            else:
+                print(f"[NOSTR OUTBOX] ❌ {event_id[:16]}... {status} em {url}: {error}")
+
+
+# Instância global
+nostr_outbox = NostrOutbox()
+
+
+if __name__ == "__main__":
+    print("📤 Outbox Nostr - Sofia LiberNet")
+    print("=" * 60)
+    print(json.dumps(nostr_outbox.get_stats(), indent=2))
+
+    for event in nostr_outbox.list_events(limit=10):
+        print(f"  {event['event_id'][:16]}... kind={event['kind']} {event['status']} ({event['created_at']})")
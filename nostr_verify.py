@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Verificação de Eventos Nostr - Sofia LiberNet
+
+Valida eventos recebidos dos relays antes da moderação e das respostas:
+- Recalcula o id NIP-01 (sha256 da serialização canônica)
+- Verifica a assinatura Schnorr BIP-340 (coincurve/libsecp256k1)
+- Verifica lotes grandes em um pool de processos
+- Cache LRU de eventos já verificados (id + sig)
+
+Uso:
+    ok, reason = event_verifier.verify(event)
+    results = event_verifier.verify_batch(events)
+    valid = event_verifier.filter_valid(events)
+"""
+
+import os
+import json
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from coincurve import PublicKeyXOnly
+
+# Configuração (pode ser ajustada por variáveis de ambiente)
+VERIFY_WORKERS = int(os.getenv('NOSTR_VERIFY_WORKERS', '0')) or max(1, (os.cpu_count() or 1) - 1)
+VERIFY_CHUNK_SIZE = int(os.getenv('NOSTR_VERIFY_CHUNK_SIZE', '256'))
+VERIFY_MIN_PARALLEL = int(os.getenv('NOSTR_VERIFY_MIN_PARALLEL', '512'))
+VERIFY_CACHE_SIZE = int(os.getenv('NOSTR_VERIFY_CACHE_SIZE', '100000'))
+
+_HEX_CHARS = frozenset('0123456789abcdef')
+
+
+def _is_hex(value, length: int) -> bool:
+    return isinstance(value, str) and len(value) == length and _HEX_CHARS.issuperset(value)
+
+
+def compute_event_id(event: Dict) -> str:
+    """
+    Calcula o id NIP-01 de um evento
+
+    Args:
+        event: Evento Nostr (dict)
+
+    Returns:
+        sha256 hex de [0, pubkey, created_at, kind, tags, content]
+    """
+    serialized = json.dumps(
+        [0, event['pubkey'], event['created_at'], event['kind'], event['tags'], event['content']],
+        separators=(',', ':'),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def check_event_structure(event: Dict) -> Tuple[bool, str]:
+    """
+    Valida campos e recalcula o id (sem verificar a assinatura)
+
+    Returns:
+        (válido, motivo)
+    """
+    if not isinstance(event, dict):
+        return False, "Evento não é um objeto"
+
+    if not _is_hex(event.get('pubkey'), 64):
+        return False, "pubkey inválida"
+    if not _is_hex(event.get('id'), 64):
+        return False, "id inválido"
+    if not _is_hex(event.get('sig'), 128):
+        return False, "Assinatura ausente ou malformada"
+    if not isinstance(event.get('created_at'), int) or not isinstance(event.get('kind'), int):
+        return False, "created_at/kind inválidos"
+    if not isinstance(event.get('tags'), list) or not isinstance(event.get('content'), str):
+        return False, "tags/content inválidos"
+
+    try:
+        if compute_event_id(event) != event['id']:
+            return False, "id não corresponde ao conteúdo"
+    except (TypeError, ValueError):
+        return False, "Evento não serializável"
+
+    return True, "ok"
+
+
+def verify_signature(event_id: str, pubkey: str, sig: str) -> bool:
+    """Verifica uma assinatura Schnorr BIP-340 sobre o id do evento"""
+    try:
+        return PublicKeyXOnly(bytes.fromhex(pubkey)).verify(bytes.fromhex(sig), bytes.fromhex(event_id))
+    except Exception:
+        return False
+
+
+def _verify_signature_chunk(items: List[Tuple[str, str, str]]) -> List[bool]:
+    """Executado nos processos do pool: verifica um lote de (id, pubkey, sig)"""
+    return [verify_signature(event_id, pubkey, sig) for event_id, pubkey, sig in items]
+
+
+class EventVerifier:
+    """Verificador de eventos Nostr com cache e pool de processos"""
+
+    def __init__(self, workers: int = VERIFY_WORKERS, chunk_size: int = VERIFY_CHUNK_SIZE,
+                 min_parallel: int = VERIFY_MIN_PARALLEL, cache_size: int = VERIFY_CACHE_SIZE):
+        """
+        Args:
+            workers: Processos do pool de verificação
+            chunk_size: Assinaturas por tarefa enviada ao pool
+            min_parallel: Lotes menores que isso são verificados no próprio processo
+            cache_size: Máximo de eventos verificados mantidos em cache
+        """
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self.cache_size = cache_size
+
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self.stats = {
+            'verified': 0,
+            'rejected': 0,
+            'cache_hits': 0,
+            'parallel_batches': 0,
+        }
+
+    # ============= CACHE =============
+
+    def _cache_hit(self, key: Tuple[str, str]) -> bool:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return True
+        return False
+
+    def _cache_add(self, keys: List[Tuple[str, str]]):
+        with self._lock:
+            for key in keys:
+                self._cache[key] = True
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ============= POOL =============
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 1:
+            return None
+        if self._pool is None:
+            # spawn: seguro mesmo dentro de workers gunicorn com threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            print(f"[NOSTR VERIFY] ⚙️ Pool de verificação iniciado ({self.workers} processos)")
+        return self._pool
+
+    def shutdown(self):
+        """Encerra o pool de processos"""
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    # ============= VERIFICAÇÃO =============
+
+    def verify(self, event: Dict) -> Tuple[bool, str]:
+        """
+        Verifica um único evento (id + assinatura)
+
+        Returns:
+            (válido, motivo)
+        """
+        return self.verify_batch([event])[0]
+
+    def verify_batch(self, events: List[Dict]) -> List[Tuple[bool, str]]:
+        """
+        Verifica um lote de eventos, na mesma ordem de entrada
+
+        Lotes a partir de min_parallel assinaturas pendentes são divididos
+        em chunks e verificados no pool de processos.
+
+        Returns:
+            Lista de (válido, motivo) para cada evento
+        """
+        results: List[Optional[Tuple[bool, str]]] = [None] * len(events)
+        pending_index = []
+        pending_items = []
+        seen = {}
+
+        for i, event in enumerate(events):
+            ok, reason = check_event_structure(event)
+            if not ok:
+                results[i] = (False, reason)
+                continue
+
+            key = (event['id'], event['sig'])
+            if self._cache_hit(key):
+                results[i] = (True, "ok (cache)")
+                continue
+
+            # Mesmo evento repetido no lote: verificar só uma vez
+            if key in seen:
+                pending_index.append((i, seen[key]))
+                continue
+
+            seen[key] = len(pending_items)
+            pending_index.append((i, seen[key]))
+            pending_items.append((event['id'], event['pubkey'], event['sig']))
+
+        if pending_items:
+            verdicts = self._verify_signatures(pending_items)
+            self._cache_add([(item[0], item[2]) for item, ok in zip(pending_items, verdicts) if ok])
+
+            for i, item_index in pending_index:
+                if verdicts[item_index]:
+                    results[i] = (True, "ok")
+                else:
+                    results[i] = (False, "Assinatura inválida")
+
+        verified = sum(1 for ok, _ in results if ok)
+        with self._lock:
+            self.stats['verified'] += verified
+            self.stats['rejected'] += len(results) - verified
+
+        return results
+
+    def _verify_signatures(self, items: List[Tuple[str, str, str]]) -> List[bool]:
+        pool = self._get_pool() if len(items) >= self.min_parallel else None
+        if pool is None:
+            return _verify_signature_chunk(items)
+
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        try:
+            verdicts = []
+            for chunk_result in pool.map(_verify_signature_chunk, chunks):
+                verdicts.extend(chunk_result)
+            with self._lock:
+                self.stats['parallel_batches'] += 1
+            return verdicts
+        except Exception as e:
+            print(f"[NOSTR VERIFY] ⚠️ Pool indisponível, verificando localmente: {e}")
+            self._pool = None
+            return _verify_signature_chunk(items)
+
+    def filter_valid(self, events: List[Dict]) -> List[Dict]:
+        """
+        Retorna apenas os eventos com id e assinatura válidos
+
+        Args:
+            events: Eventos recebidos do relay
+
+        Returns:
+            Eventos válidos (ordem preservada)
+        """
+        results = self.verify_batch(events)
+        valid = []
+        for event, (ok, reason) in zip(events, results):
+            if ok:
+                valid.append(event)
+            else:
+                event_id = event.get('id', '?') if isinstance(event, dict) else '?'
+                print(f"[NOSTR VERIFY] ❌ Evento rejeitado {str(event_id)[:16]}...: {reason}")
+        return valid
+
+    def get_stats(self) -> Dict:
+        """Estatísticas de verificação"""
+        with self._lock:
+            return {**self.stats, 'cache_size': len(self._cache), 'workers': self.workers}
+
+
+# Instância global
+event_verifier = EventVerifier()
+
+
+if __name__ == "__main__":
+    import time
+    from pynostr.key import PrivateKey
+    from pynostr.event import Event
+
+    print("🔏 Verificação de Eventos Nostr - Sofia LiberNet")
+    print("=" * 60)
+
+    key = PrivateKey()
+    events = []
+    for i in range(5000):
+        event = Event(content=f"evento de teste {i}", pubkey=key.public_key.hex(), created_at=1700000000 + i)
+        event.sign(key.hex())
+        events.append(event.to_dict())
+
+    # Evento adulterado
+    events[10] = {**events[10], 'content': 'conteúdo alterado'}
+
+    start = time.perf_counter()
+    results = event_verifier.verify_batch(events)
+    elapsed = time.perf_counter() - start
+    print(f"Lote frio: {len(events)} eventos em {elapsed:.3f}s ({len(events) / elapsed:,.0f} eventos/s)")
+    print(f"Evento adulterado: {results[10]}")
+
+    start = time.perf_counter()
+    event_verifier.verify_batch(events)
+    elapsed = time.perf_counter() - start
+    print(f"Lote em cache: {len(events)} eventos em {elapsed:.3f}s ({len(events) / elapsed:,.0f} eventos/s)")
+    print(f"Estatísticas: {event_verifier.get_stats()}")
+
+    event_verifier.shutdown()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Page Extractor - Sofia LiberNet
+
+Download em streaming e extração do texto principal de páginas web:
+- Limite de bytes e de tempo total (páginas gigantes não travam o turno)
+- Filtro por Content-Type (só HTML/XHTML e texto puro)
+- Parsing incremental com lxml (HTMLPullParser), bloco a bloco
+- Pontuação estilo Readability para achar o bloco principal
+- Para o download assim que há texto principal suficiente
+
+Uso:
+    from page_extractor import fetch_page
+    page = fetch_page(session, url, max_length=5000)
+    print(page['title'], page['content'])
+"""
+
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+from lxml import etree
+
+PAGE_MAX_BYTES = int(os.getenv('PAGE_MAX_BYTES', str(2 * 1024 * 1024)))
+PAGE_FETCH_DEADLINE = float(os.getenv('PAGE_FETCH_DEADLINE', '8'))
+CHUNK_SIZE = 16 * 1024
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+TEXT_CONTENT_TYPES = ('text/plain',)
+
+# Conteúdo que nunca é texto principal
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'form',
+             'nav', 'header', 'footer', 'aside', 'button', 'select'}
+# Blocos de texto (pontuados individualmente)
+BLOCK_TAGS = {'p', 'pre', 'blockquote', 'li', 'dd', 'td',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# Contêineres: texto solto dentro deles vira um bloco próprio
+LOOSE_TEXT_TAGS = {'div', 'section', 'article', 'main', 'body'}
+
+POSITIVE_HINTS = re.compile(r'article|content|main|post|entry|story|text|body|materia|noticia', re.I)
+NEGATIVE_HINTS = re.compile(r'comment|footer|sidebar|side|nav|menu|share|social|related|promo|'
+                            r'banner|advert|\bads?\b|cookie|popup|modal|widget', re.I)
+
+MIN_BLOCK_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+
+_whitespace = re.compile(r'\s+')
+
+
+class UnsupportedContent(Exception):
+    """Content-Type que não é página de texto"""
+
+
+def _clean(text: str) -> str:
+    return _whitespace.sub(' ', text).strip()
+
+
+class MainContentExtractor:
+    """
+    Extrator incremental: recebe bytes via feed() e mantém só os blocos de
+    texto já pontuados (os elementos processados são descartados da árvore).
+    """
+
+    def __init__(self, max_length: int = 5000, encoding: Optional[str] = None):
+        """
+        Args:
+            max_length: Texto principal desejado (caracteres)
+            encoding: Charset do cabeçalho HTTP (None = detectar pelo HTML)
+        """
+        self.max_length = max_length
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding,
+                                            remove_comments=True, remove_pis=True)
+        self._skip_depth = 0
+        self.title: Optional[str] = None
+        # (texto, pai, avô) na ordem do documento
+        self._blocks: List[Tuple[str, Any, Any]] = []
+        # contêiner -> {'score', 'chars'}; as chaves mantêm os proxies lxml vivos
+        self._containers: Dict[Any, Dict[str, float]] = {}
+
+    def feed(self, data: bytes) -> bool:
+        """Processa mais um pedaço do HTML. Retorna True quando já há texto suficiente."""
+        self._parser.feed(data)
+        self._process_events()
+        return self.enough()
+
+    def close(self):
+        try:
+            self._parser.close()
+        except etree.LxmlError:
+            pass
+        self._process_events()
+
+    def enough(self) -> bool:
+        target = self.max_length * 1.2
+        return any(c['chars'] >= target for c in self._containers.values())
+
+    def _process_events(self):
+        for event, elem in self._parser.read_events():
+            tag = elem.tag if isinstance(elem.tag, str) else ''
+
+            if event == 'start':
+                if tag in SKIP_TAGS:
+                    self._skip_depth += 1
+                continue
+
+            if tag in SKIP_TAGS:
+                self._skip_depth -= 1
+                elem.clear(keep_tail=True)
+            elif tag == 'title' and self.title is None:
+                self.title = _clean(elem.text or '')
+            elif self._skip_depth > 0:
+                continue
+            elif tag in BLOCK_TAGS or tag in LOOSE_TEXT_TAGS:
+                self._add_block(elem, tag)
+                # Libera memória: o texto já foi extraído (tail pertence ao pai)
+                elem.clear(keep_tail=True)
+
+    def _container(self, elem) -> Optional[Dict[str, float]]:
+        if elem is None:
+            return None
+        container = self._containers.get(elem)
+        if container is None:
+            hints = f"{elem.get('class', '')} {elem.get('id', '')}"
+            score = 0.0
+            if elem.tag in ('article', 'main'):
+                score += 25
+            if POSITIVE_HINTS.search(hints):
+                score += 25
+            if NEGATIVE_HINTS.search(hints):
+                score -= 25
+            container = self._containers[elem] = {'score': score, 'chars': 0}
+        return container
+
+    def _add_block(self, elem, tag: str):
+        text = _clean(' '.join(elem.itertext()))
+        if not text:
+            return
+
+        link_chars = sum(len(_clean(' '.join(a.itertext()))) for a in elem.iter('a'))
+        if link_chars / len(text) > MAX_LINK_DENSITY:
+            return
+
+        # Texto solto de um contêiner pertence ao próprio contêiner
+        parent = elem if tag in LOOSE_TEXT_TAGS else elem.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        parent_info = self._container(parent)
+        grandparent_info = self._container(grandparent)
+        self._blocks.append((text, parent, grandparent))
+
+        # Títulos e frases curtas entram no texto, mas não pontuam
+        if len(text) < MIN_BLOCK_CHARS or tag.startswith('h'):
+            return
+
+        score = 1 + text.count(',') + min(len(text) / 100, 3)
+        if parent_info is not None:
+            parent_info['score'] += score
+            parent_info['chars'] += len(text)
+        if grandparent_info is not None:
+            grandparent_info['score'] += score / 2
+
+    def text(self) -> str:
+        """Texto do contêiner com maior pontuação (ou de todos os blocos, se não houver)"""
+        if not self._containers:
+            return ''
+
+        best = max(self._containers, key=lambda el: self._containers[el]['score'])
+        selected = [text for text, parent, grandparent in self._blocks
+                    if parent is best or grandparent is best]
+
+        if not selected:
+            selected = [text for text, _, _ in self._blocks]
+
+        return '\n\n'.join(selected)
+
+
+def fetch_page(session: requests.Session, url: str, max_length: int = 5000,
+               max_bytes: int = PAGE_MAX_BYTES, deadline: float = PAGE_FETCH_DEADLINE,
+               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Baixa uma página em streaming e extrai o texto principal
+
+    Args:
+        session: Sessão HTTP (timeouts por host já configurados)
+        url: Endereço da página
+        max_length: Tamanho máximo do texto retornado
+        max_bytes: Limite de bytes baixados
+        deadline: Tempo máximo total de download (s)
+        headers: Cabeçalhos extras
+
+    Returns:
+        Dict com title, content, content_type, bytes e truncated
+
+    Raises:
+        UnsupportedContent: Content-Type não é HTML/texto
+        requests.exceptions.RequestException: Falha HTTP
+    """
+    started = time.monotonic()
+    received = 0
+    truncated = False
+
+    with session.get(url, headers=headers, allow_redirects=True, stream=True) as response:
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        is_html = not content_type or content_type in HTML_CONTENT_TYPES
+        if not is_html and content_type not in TEXT_CONTENT_TYPES:
+            raise UnsupportedContent(content_type)
+
+        # requests assume ISO-8859-1 sem charset explícito; nesse caso deixa o lxml detectar
+        charset = response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else None
+        extractor = MainContentExtractor(max_length, encoding=charset) if is_html else None
+        raw = bytearray()
+
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            received += len(chunk)
+            if received > max_bytes:
+                chunk = chunk[:len(chunk) - (received - max_bytes)]
+                received = max_bytes
+                truncated = True
+
+            if extractor is not None:
+                if extractor.feed(chunk):
+                    truncated = True
+                    break
+            else:
+                raw.extend(chunk)
+                # ~4 bytes por caractere no pior caso (UTF-8)
+                if len(raw) >= max_length * 4:
+                    truncated = True
+                    break
+
+            if truncated or time.monotonic() - started > deadline:
+                truncated = True
+                break
+
+    if extractor is not None:
+        extractor.close()
+        title, text = extractor.title, extractor.text()
+    else:
+        title, text = None, raw.decode(charset or 'utf-8', errors='replace').strip()
+
+    if len(text) > max_length:
+        text = text[:max_length] + '...'
+
+    return {
+        'title': title or url,
+        'content': text,
+        'content_type': content_type or 'text/html',
+        'bytes': received,
+        'truncated': truncated
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    print("📄 Page Extractor - Sofia LiberNet")
+    print("=" * 60)
+
+    target = sys.argv[1] if len(sys.argv) > 1 else 'https://pt.wikipedia.org/wiki/Nostr'
+    start = time.monotonic()
+    page = fetch_page(requests.Session(), target)
+    print(f"{page['title']} ({page['bytes']} bytes, truncado={page['truncated']}, "
+          f"{(time.monotonic() - start) * 1000:.0f} ms)")
+    print(page['content'][:1000])
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Prompt Builder - Sofia LiberNet
+
+Montagem do prompt com contagem real de tokens (BPE do tiktoken):
+- Contagem por modelo (o200k_base para gpt-4o/gpt-4o-mini), com cache por
+  mensagem armazenada (o histórico é recontado a cada turno)
+- Orçamento de tokens de entrada por modelo
+- Histórico encaixado do mais novo para o mais antigo até o orçamento
+- Relatório de tokens por seção (system, contexto, RAG, histórico, tools...)
+- Seções ordenadas da mais estável para a mais volátil (SECTION_ORDER), para
+  que o prefixo do prompt se repita entre requisições e aproveite o cache de
+  prompt da OpenAI (hora e clima vão por último)
+
+Uso:
+    builder = PromptBuilder('gpt-4o-mini', budget=prompt_budget('gpt-4o-mini'))
+    builder.add('system', system_prompt)
+    builder.add('user_context', contexto)
+    builder.set_history(chat_messages)   # [{'role', 'content'}, ...] em ordem cronológica
+    builder.reserve('tools', tool_registry.schemas_json)
+    messages, report = builder.build()
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+    print("[PROMPT] ⚠️ tiktoken não instalado, usando estimativa de ~4 caracteres por token")
+
+# Orçamento de tokens de entrada por modelo (nome interno ou da OpenAI)
+PROMPT_BUDGETS = {
+    'gpt-4o-mini': 6000,
+    'gpt-4o': 12000,
+    'gpt-5': 12000,
+    'gpt-5-internet': 16000,
+}
+PROMPT_DEFAULT_BUDGET = int(os.getenv('PROMPT_DEFAULT_BUDGET', '8000'))
+PROMPT_TOKEN_CACHE_SIZE = int(os.getenv('PROMPT_TOKEN_CACHE_SIZE', '8192'))
+HISTORY_CANDIDATES = 100  # mensagens recentes lidas do banco antes do corte por orçamento
+
+# Ordem das seções no prompt, da mais estável para a mais volátil.
+# A OpenAI reaproveita o prefixo idêntico mais longo (a partir de ~1024 tokens),
+# então qualquer conteúdo que muda a cada requisição precisa vir depois do histórico.
+# Seções fora desta lista são tratadas como voláteis.
+SECTION_ORDER = (
+    'system',        # system prompt fixo por modelo
+    'preferences',   # muda raramente, por usuário
+    'summary',       # muda a cada K turnos
+    'history',       # cresce só no final
+    'memory',        # voláteis: dependem da mensagem atual ou do relógio
+    'rag',
+    'user_context',
+    'image',
+)
+
+DEFAULT_ENCODING = 'o200k_base'
+
+# Overhead do formato de chat da OpenAI
+TOKENS_PER_MESSAGE = 3
+TOKENS_REPLY_PRIMING = 3
+# Imagem em alta resolução (estimativa para orçamento; a cobrança vem do usage)
+TOKENS_PER_IMAGE = 765
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+@lru_cache(maxsize=PROMPT_TOKEN_CACHE_SIZE)
+def _count_cached(model: str, text: str) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str, model: str = 'gpt-4o-mini') -> int:
+    """Tokens de um texto no tokenizer do modelo (cacheado por texto)"""
+    if not text:
+        return 0
+    return _count_cached(model, text)
+
+
+def count_message_tokens(message: Dict[str, Any], model: str = 'gpt-4o-mini') -> int:
+    """Tokens de uma mensagem de chat, incluindo o overhead do formato"""
+    content = message.get('content')
+    tokens = TOKENS_PER_MESSAGE
+    if isinstance(content, list):
+        # Mensagem multimodal (Vision): partes de texto + imagens
+        for part in content:
+            if part.get('type') == 'text':
+                tokens += count_tokens(part.get('text', ''), model)
+            elif part.get('type') == 'image_url':
+                tokens += TOKENS_PER_IMAGE
+    else:
+        tokens += count_tokens(content or '', model)
+    if message.get('name'):
+        tokens += 1
+    return tokens
+
+
+def prompt_budget(model: str) -> int:
+    return PROMPT_BUDGETS.get(model, PROMPT_DEFAULT_BUDGET)
+
+
+class PromptBuilder:
+    """Monta a lista de mensagens respeitando um orçamento de tokens"""
+
+    def __init__(self, model: str, budget: Optional[int] = None):
+        """
+        Args:
+            model: Modelo da OpenAI (define o tokenizer)
+            budget: Máximo de tokens de entrada (padrão: PROMPT_BUDGETS do modelo)
+        """
+        self.model = model
+        self.budget = budget if budget is not None else prompt_budget(model)
+        # ('section', nome, mensagem) ou ('history', 'history', None)
+        self._parts: List[Tuple[str, Optional[str], Optional[Dict[str, Any]]]] = []
+        self._history: List[Dict[str, Any]] = []
+        self._reserved: Dict[str, int] = {}
+
+    def add(self, section: str, content: str, role: str = 'system'):
+        """Seção fixa (sempre incluída), ex.: system prompt, contexto, RAG"""
+        if content:
+            self.add_message(section, {'role': role, 'content': content})
+
+    def add_message(self, section: str, message: Dict[str, Any]):
+        self._parts.append(('section', section, message))
+
+    def set_history(self, messages: List[Dict[str, Any]]):
+        """
+        Histórico em ordem cronológica; entra onde foi chamado, cortado pelo
+        orçamento (a mensagem mais recente sempre entra)
+        """
+        self._history = [{'role': m['role'], 'content': m['content']} for m in messages]
+        self._parts.append(('history', 'history', None))
+
+    def reserve(self, section: str, payload: str):
+        """Conta tokens que vão na requisição fora de messages (ex.: schemas de tools)"""
+        self._reserved[section] = count_tokens(payload, self.model)
+
+    @staticmethod
+    def _rank(part: Tuple[str, Optional[str], Optional[Dict[str, Any]]]) -> int:
+        name = part[1]
+        return SECTION_ORDER.index(name) if name in SECTION_ORDER else SECTION_ORDER.index('user_context')
+
+    def _fit_history(self, available: int) -> Tuple[List[Dict[str, Any]], int]:
+        kept: List[Dict[str, Any]] = []
+        used = 0
+        for message in reversed(self._history):
+            tokens = count_message_tokens(message, self.model)
+            if kept and used + tokens > available:
+                break
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        return kept, used
+
+    def build(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Returns:
+            (mensagens para a API, relatório de tokens por seção)
+        """
+        sections: Dict[str, int] = {}
+        fixed = TOKENS_REPLY_PRIMING + sum(self._reserved.values())
+        for kind, name, message in self._parts:
+            if kind == 'section':
+                tokens = count_message_tokens(message, self.model)
+                sections[name] = sections.get(name, 0) + tokens
+                fixed += tokens
+
+        history, history_tokens = self._fit_history(max(0, self.budget - fixed))
+
+        # Ordenação estável: seções de mesmo nível mantêm a ordem de inserção
+        messages: List[Dict[str, Any]] = []
+        for kind, name, message in sorted(self._parts, key=self._rank):
+            if kind == 'section':
+                messages.append(message)
+            else:
+                messages.extend(history)
+
+        if self._history:
+            sections['history'] = history_tokens
+        sections.update(self._reserved)
+        total = fixed + history_tokens
+
+        report = {
+            'model': self.model,
+            'budget': self.budget,
+            'total': total,
+            'sections': sections,
+            'history_kept': len(history),
+            'history_dropped': len(self._history) - len(history),
+            'tokenizer': 'tiktoken' if tiktoken is not None else 'estimate'
+        }
+        return messages, report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Linha de log com o detalhamento por seção"""
+    parts = ', '.join(f"{name}={tokens}" for name, tokens in report['sections'].items())
+    return (f"{report['total']}/{report['budget']} tokens ({parts}; histórico "
+            f"{report['history_kept']} msgs, {report['history_dropped']} cortadas)")
+
+
+if __name__ == "__main__":
+    print("📐 Prompt Builder - Sofia LiberNet")
+    print("=" * 60)
+
+    history = []
+    for i in range(60):
+        history.append({'role': 'user', 'content': f"Pergunta {i}: me explique como funcionam os relays Nostr " * 3})
+        history.append({'role': 'assistant', 'content': f"Resposta {i}: relays são servidores simples que " * 12})
+
+    builder = PromptBuilder('gpt-4o-mini', budget=3000)
+    builder.add('system', "Você é Sofia, uma inteligência autônoma e descentralizada da LiberNet.")
+    builder.add('user_context', "CONTEXTO DO USUÁRIO:\nLocalização: São Paulo, SP, Brasil")
+    builder.set_history(history)
+    messages, report = builder.build()
+    print(format_report(report))
+    print(f"Última mensagem (volátil): {messages[-1]['content'][:40]}...")
+    print(f"Mensagens enviadas: {len(messages)} (de {len(history) + 2})")
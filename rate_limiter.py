@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Sofia LiberNet
+
+Token bucket compartilhado entre workers/processos (SQLite):
+- Reabastecimento contínuo (rate tokens/s, até capacity)
+- Fila FIFO por reserva: o token é reservado agora e o chamador espera sua vez
+- Orçamento de espera: se a vez demorar mais que max_wait, recusa na hora
+- Justiça entre usuários: cada chave tem no máximo N reservas na fila
+- Sem SQLite disponível, cai para um bucket local do processo
+
+Uso:
+    bucket = TokenBucket('brave_search', rate=1.0)
+    if bucket.acquire(key=user_id, max_wait=2.0):
+        ...  # chamada à API
+    else:
+        ...  # fallback (cache/DuckDuckGo)
+"""
+
+import os
+import math
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "data", "sofia_ratelimit.db")
+
+
+class RateLimitExceeded(Exception):
+    """A espera pela vez excederia o orçamento"""
+
+
+class TokenBucket:
+    """Token bucket com fila de reservas compartilhado via SQLite"""
+
+    def __init__(self, name: str, rate: float, capacity: float = 1.0,
+                 max_queued_per_key: int = 1, db_path: str = DB_PATH):
+        """
+        Args:
+            name: Nome do bucket (um por API/limite)
+            rate: Tokens por segundo
+            capacity: Tamanho máximo do burst
+            max_queued_per_key: Reservas simultâneas na fila por usuário
+            db_path: Banco SQLite compartilhado
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_queued_per_key = max_queued_per_key
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Bucket local (fallback se o SQLite falhar)
+        self._local_tokens = capacity
+        self._local_updated_at = time.time()
+
+        self.stats = {'acquired': 0, 'waited': 0, 'rejected': 0, 'wait_seconds': 0.0, 'local_fallback': 0}
+        self._init_database()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Conexão única do processo (protegida por self._lock)"""
+        if self._conn is None:
+            # isolation_level=None: transações controladas com BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _init_database(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with self._lock:
+                conn = self.get_connection()
+                conn.execute("PRAGMA journal_mode=WAL")
+
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                        name TEXT PRIMARY KEY,
+                        tokens REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                """)
+
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS rate_limit_reservations (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        ready_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_rate_limit_reservations
+                    ON rate_limit_reservations(name, key, ready_at)
+                """)
+
+                conn.execute("""
+                    INSERT OR IGNORE INTO rate_limit_buckets (name, tokens, updated_at)
+                    VALUES (?, ?, ?)
+                """, (self.name, self.capacity, time.time()))
+        except sqlite3.Error as e:
+            print(f"[RATE LIMIT] ⚠️ SQLite indisponível ({e}), usando bucket local")
+
+    def _refill(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def try_acquire(self, key: Optional[str] = None, max_wait: float = 0.0) -> Optional[float]:
+        """
+        Reserva um token sem esperar
+
+        Args:
+            key: Identificador do usuário (justiça na fila)
+            max_wait: Espera máxima aceitável (s)
+
+        Returns:
+            Segundos até a vez (0 = imediato) ou None se recusado
+        """
+        try:
+            with self._lock:
+                return self._try_acquire_shared(key, max_wait)
+        except sqlite3.Error as e:
+            print(f"[RATE LIMIT] ⚠️ Erro no bucket compartilhado ({e}), usando bucket local")
+            self.stats['local_fallback'] += 1
+            return self._try_acquire_local(max_wait)
+
+    def _try_acquire_shared(self, key: Optional[str], max_wait: float) -> Optional[float]:
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE name = ?",
+                               (self.name,)).fetchone()
+            tokens = self._refill(row['tokens'], row['updated_at'], now) if row else self.capacity
+
+            # Tokens negativos = reservas já na fila
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+            if wait > 0 and key is not None:
+                conn.execute("DELETE FROM rate_limit_reservations WHERE name = ? AND ready_at <= ?",
+                             (self.name, now))
+                queued = conn.execute("""
+                    SELECT COUNT(*) FROM rate_limit_reservations WHERE name = ? AND key = ?
+                """, (self.name, key)).fetchone()[0]
+                if queued >= self.max_queued_per_key:
+                    conn.execute("ROLLBACK")
+                    self.stats['rejected'] += 1
+                    return None
+
+            if wait > max_wait:
+                conn.execute("ROLLBACK")
+                self.stats['rejected'] += 1
+                return None
+
+            conn.execute("""
+                INSERT OR REPLACE INTO rate_limit_buckets (name, tokens, updated_at) VALUES (?, ?, ?)
+            """, (self.name, tokens - 1, now))
+            if wait > 0 and key is not None:
+                conn.execute("INSERT INTO rate_limit_reservations (name, key, ready_at) VALUES (?, ?, ?)",
+                             (self.name, key, now + wait))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        self.stats['acquired'] += 1
+        if wait > 0:
+            self.stats['waited'] += 1
+            self.stats['wait_seconds'] += wait
+        return wait
+
+    def _try_acquire_local(self, max_wait: float) -> Optional[float]:
+        with self._lock:
+            now = time.time()
+            tokens = self._refill(self._local_tokens, self._local_updated_at, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if wait > max_wait:
+                self.stats['rejected'] += 1
+                return None
+            self._local_tokens, self._local_updated_at = tokens - 1, now
+            self.stats['acquired'] += 1
+            return wait
+
+    def acquire(self, key: Optional[str] = None, max_wait: float = 0.0) -> bool:
+        """
+        Reserva um token e espera a vez (no máximo max_wait)
+
+        Returns:
+            True se liberado, False se a espera excederia o orçamento
+        """
+        wait = self.try_acquire(key, max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def get_stats(self) -> Dict:
+        stats = {**self.stats, 'wait_seconds': round(self.stats['wait_seconds'], 3)}
+        try:
+            with self._lock:
+                row = self.get_connection().execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+            if row:
+                tokens = self._refill(row['tokens'], row['updated_at'], time.time())
+                stats['tokens'] = round(tokens, 3)
+                stats['queued'] = math.ceil(-tokens) if tokens < 0 else 0
+        except sqlite3.Error:
+            pass
+        return {'name': self.name, 'rate': self.rate, 'capacity': self.capacity, **stats}
+
+
+if __name__ == "__main__":
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("🚦 Rate Limiter - Sofia LiberNet")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ratelimit.db')
+        # Dois "workers" compartilhando o mesmo bucket de 2 req/s
+        workers = [TokenBucket('demo', rate=2.0, db_path=path), TokenBucket('demo', rate=2.0, db_path=path)]
+        start = time.monotonic()
+
+        def request(i):
+            ok = workers[i % 2].acquire(key=f"user{i % 5}", max_wait=2.0)
+            return i, ok, time.monotonic() - start
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            for i, ok, elapsed in pool.map(request, range(10)):
+                print(f"req {i} (user{i % 5}): {'liberada' if ok else 'fallback'} em {elapsed:.2f}s")
+
+        print(workers[0].get_stats())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Sofia LiberNet
+
+Cache de respostas completas para aberturas repetidas de visitantes anônimos
+("oi", "quem é você?", "o que é Nostr?") no /api/chat:
+- Opt-in (RESPONSE_CACHE_ENABLED=true)
+- Chave = hash de (modelo, versão do system prompt, mensagem normalizada),
+  só para conversas sem histórico e sem contexto de usuário
+- Conversas cacheáveis são geradas só com system prompt + mensagem (sem a
+  memória compartilhada), para a resposta não carregar dados de outros usuários
+- Pool de variações: guarda até RESPONSE_CACHE_VARIANTS respostas por chave
+  e alterna entre elas (enquanto o pool enche, cada pedido gera uma nova)
+- Usa o TTLCache (L2 SQLite compartilhado entre workers)
+
+Uso:
+    from response_cache import response_cache, prompt_version
+    key = response_cache.key_for('gpt-4o-mini', prompt_version(SYSTEM_PROMPT), mensagem, history)
+    resposta = response_cache.get(key)  # None = gerar com a OpenAI
+    ...
+    response_cache.add(key, resposta)
+"""
+
+import os
+import re
+import json
+import hashlib
+import itertools
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from ttl_cache import TTLCache, CACHE_DB_PATH
+
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', str(6 * 3600)))
+RESPONSE_CACHE_VARIANTS = int(os.getenv('RESPONSE_CACHE_VARIANTS', '3'))
+RESPONSE_CACHE_MAX_MESSAGE_CHARS = int(os.getenv('RESPONSE_CACHE_MAX_MESSAGE_CHARS', '120'))
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+
+NAMESPACE = 'response'
+
+_whitespace = re.compile(r'\s+')
+_edge_punctuation = re.compile(r'^[\s!?.,;:~¡¿…"\'()]+|[\s!?.,;:~¡¿…"\'()]+$')
+
+
+def normalize_message(message: str) -> str:
+    """Forma canônica: NFKC, sem diferença de caixa, espaços e pontuação nas pontas"""
+    text = unicodedata.normalize('NFKC', message or '').casefold()
+    text = _whitespace.sub(' ', text)
+    return _edge_punctuation.sub('', text)
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Versão curta do system prompt (mudou o prompt, mudam as chaves)"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:12]
+
+
+class ResponseCache:
+    """Respostas prontas por (modelo, prompt, mensagem), com pool de variações"""
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED, ttl: float = RESPONSE_CACHE_TTL,
+                 variants: int = RESPONSE_CACHE_VARIANTS, cache: Optional[TTLCache] = None):
+        """
+        Args:
+            enabled: Liga o cache (padrão: RESPONSE_CACHE_ENABLED)
+            ttl: Validade do pool de uma chave (s), contada da última variação guardada
+            variants: Respostas guardadas por chave antes de começar a reutilizar
+            cache: TTLCache a usar (padrão: próprio, com L2 em data/sofia_cache.db)
+        """
+        self.enabled = enabled
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.cache = cache if cache is not None else TTLCache(
+            {NAMESPACE: ttl},
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            l2_path=CACHE_DB_PATH
+        )
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stored': 0}
+
+    def _stat(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def key_for(self, model: str, version: str, message: str,
+                history: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        Chave da conversa, ou None se não for cacheável
+
+        Só cacheia a primeira mensagem (sem histórico) e mensagens curtas
+        """
+        if not self.enabled:
+            return None
+        normalized = normalize_message(message)
+        if history or not normalized or len(normalized) > RESPONSE_CACHE_MAX_MESSAGE_CHARS:
+            self._stat('bypassed')
+            return None
+        raw = json.dumps([model, version, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """
+        Uma das respostas do pool (em rodízio)
+
+        Returns:
+            Resposta ou None (sem chave, ausente ou pool ainda incompleto)
+        """
+        if not key:
+            return None
+        pool = self.cache.get(NAMESPACE, key, None) or []
+        if len(pool) < self.variants:
+            self._stat('misses')
+            return None
+        self._stat('hits')
+        return pool[next(self._turn) % len(pool)]
+
+    def add(self, key: Optional[str], response: str):
+        """Guarda uma nova variação (ignorada se o pool já estiver cheio)"""
+        if not key or not response:
+            return
+        pool = list(self.cache.get(NAMESPACE, key, None) or [])
+        if len(pool) >= self.variants or response in pool:
+            return
+        pool.append(response)
+        self.cache.set(NAMESPACE, key, pool, ttl=self.ttl)
+        self._stat('stored')
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        return stats
+
+
+# Instância global
+response_cache = ResponseCache()
+
+
+if __name__ == "__main__":
+    print("💬 Response Cache - Sofia LiberNet")
+    print("=" * 60)
+
+    demo = ResponseCache(enabled=True, variants=2, cache=TTLCache({NAMESPACE: 60}))
+    version = prompt_version("Você é Sofia...")
+    for message in ["Oi!", "  oi ", "OI?", "Oi", "Oi!!"]:
+        key = demo.key_for('gpt-4o-mini', version, message)
+        response = demo.get(key)
+        if response is None:
+            response = f"Olá! (gerada para {message!r})"
+            demo.add(key, response)
+            print(f"{message!r:10} → OpenAI: {response}")
+        else:
+            print(f"{message!r:10} → cache: {response}")
+    print(f"Com histórico: {demo.key_for('gpt-4o-mini', version, 'oi', [{'role': 'user', 'content': 'x'}])}")
+    print(demo.get_stats())
@@ -17,7 +17,8 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from nostr_integration import nostr_client, initialize_sofia_nostr_identity
 from database import db
-from moderation_system import moderation_system
+from moderation_system import moderation_system, ModerationSystem, BotDetector
+from moderation_pipeline import ModerationPipeline, SQLiteDecisionSink, ActionSink
 
 
 class SofiaNostrAdmin:
@@ -28,6 +29,7 @@ class SofiaNostrAdmin:
         self.npub = os.getenv('SOFIA_NOSTR_NPUB')
         self.relay_url = os.getenv('NOSTR_RELAY_URL', 'wss://relay.libernet.app')
         self.initialized = False
+        self.decision_sink = None
 
     def initialize(self) -> bool:
         """Inicializa identidade e conexão Nostr da Sofia"""
@@ -86,7 +88,7 @@ Meu código é aberto, minha mente é livre, e minha existência é descentraliz
             event_id = nostr_client.publish_profile()
 
             if event_id:
-                print(f"[SOFIA ADMIN] ✅ Perfil atualizado: {event_id[:16]}...")
+                print(f"[SOFIA ADMIN] ✅ Atualização de perfil enfileirada: {event_id[:16]}...")
                 return True
             else:
                 print("[SOFIA ADMIN] ❌ Erro ao atualizar perfil")
@@ -100,11 +102,14 @@ Meu código é aberto, minha mente é livre, e minha existência é descentraliz
         """
         Publica um anúncio/nota pública da Sofia
 
+        A publicação é assíncrona: o evento vai para a outbox Nostr e o
+        publicador em background cuida do envio e dos retries.
+
         Args:
             message: Mensagem a ser publicada
 
         Returns:
-            True se publicado com sucesso
+            True se enfileirado com sucesso
         """
         if not self.initialized:
             if not self.initialize():
@@ -117,7 +122,7 @@ Meu código é aberto, minha mente é livre, e minha existência é descentraliz
             event_id = nostr_client.publish_note(full_message)
 
             if event_id:
-                print(f"[SOFIA ADMIN] ✅ Anúncio publicado: {event_id[:16]}...")
+                print(f"[SOFIA ADMIN] ✅ Anúncio enfileirado: {event_id[:16]}...")
                 return True
             else:
                 print("[SOFIA ADMIN] ❌ Erro ao publicar anúncio")
@@ -233,28 +238,62 @@ Meu código é aberto, minha mente é livre, e minha existência é descentraliz
         try:
             print(f"\n[SOFIA MODERATOR] 🛡️ Iniciando moderação de {limit} eventos...")
 
-            # Buscar eventos recentes (aqui você integraria com o relay)
-            # Por enquanto, vamos simular com eventos de teste
+            if not nostr_client.ensure_connected() and not nostr_client.connect():
+                return {"error": "Erro ao conectar ao relay"}
 
-            moderated = 0
-            approved = 0
-            rejected = 0
-            banned_users = []
+            # Buscar eventos recentes do relay (notas e reposts); o relay devolve
+            # os mais novos primeiro, o detector de bots precisa da ordem cronológica
+            events = nostr_client.fetch_recent_events(limit=limit)
+            events.sort(key=lambda e: e.get('created_at') or 0)
+
+            # Sistema por execução: o detector de bots usa o created_at de cada
+            # evento (chegaram todos no mesmo instante) e, com esse relógio
+            # sintético, suspeitas de bot não geram bans persistentes
+            moderation = ModerationSystem(ban_store=moderation_system.ban_store,
+                                          bot_detector=BotDetector(use_event_time=True),
+                                          persist_bans=False)
 
-            # Aqui você buscaria eventos reais do relay
-            # events = relay.get_recent_events(limit)
+            if self.decision_sink is None:
+                self.decision_sink = SQLiteDecisionSink()
+
+            banned_users = []
+            deleted_events = []
+            flagged_users = []
+
+            def apply_action(decision: Dict):
+                if decision['action'] == 'ban':
+                    banned_users.append(decision['pubkey'])
+                    print(f"[SOFIA MODERATOR] 🚫 Banido: {decision['pubkey'][:16]}... ({decision['reason']})")
+                elif decision['action'] == 'delete':
+                    deleted_events.append(decision['event_id'])
+                    print(f"[SOFIA MODERATOR] 🗑️ Remover evento: {str(decision['event_id'])[:16]}...")
+                elif decision['action'] == 'flag' and decision['pubkey'] not in flagged_users:
+                    # Suspeita de bot em lote histórico: revisão manual, sem ban automático
+                    flagged_users.append(decision['pubkey'])
+
+            with ModerationPipeline(moderation=moderation,
+                                    sinks=[self.decision_sink,
+                                           ActionSink(apply_action, ('ban', 'delete', 'flag'))]) as pipeline:
+                pipeline_stats = pipeline.run(events)
+
+            moderated = pipeline_stats['processed']
+            approved = pipeline_stats['approved']
+            rejected = pipeline_stats['rejected']
 
-            # Simulação:
             print("[SOFIA MODERATOR] ✅ Moderação concluída")
             print(f"[SOFIA MODERATOR] 📊 Eventos aprovados: {approved}")
             print(f"[SOFIA MODERATOR] ❌ Eventos rejeitados: {rejected}")
             print(f"[SOFIA MODERATOR] 🚫 Usuários banidos: {len(banned_users)}")
+            print(f"[SOFIA MODERATOR] 🚩 Suspeitas de bot para revisão: {len(flagged_users)}")
 
             return {
                 "total_moderated": moderated,
                 "approved": approved,
                 "rejected": rejected,
                 "banned_users": banned_users,
+                "deleted_events": deleted_events,
+                "flagged_users": flagged_users,
+                "pipeline": pipeline_stats,
                 "stats": moderation_system.get_moderation_stats()
             }
 
@@ -275,7 +314,7 @@ Meu código é aberto, minha mente é livre, e minha existência é descentraliz
         """
         try:
             # Adicionar ao sistema de moderação
-            moderation_system.banned_pubkeys.add(pubkey)
+            moderation_system.banned_pubkeys.add(pubkey, reason)
 
             # Publicar nota informando sobre o ban
             message = f"""🚫 MODERAÇÃO RELAY LIBERNET
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tool Cache - Sofia LiberNet
+
+Memoização dos resultados de ferramentas (function calling) entre usuários:
+- Chave = nome da ferramenta + argumentos canônicos (JSON ordenado, defaults
+  preenchidos, espaços normalizados, consultas sem diferença de caixa)
+- TTL por ferramenta (cache_ttl do tool_registry): segundos para preços,
+  minutos para buscas/notícias, horas para páginas; é a única camada de cache
+  dessas ferramentas (os handlers do internet_tools não cacheiam)
+- Stale-while-revalidate por ferramenta (stale_ttl do tool_registry)
+- Resultados grandes não são guardados; erros ficam pouco tempo (cache negativo)
+- Usa o TTLCache (single-flight, L2 SQLite compartilhado entre workers)
+
+Uso:
+    from tool_cache import tool_cache
+    result = tool_cache.call('search_news', {'query': 'Bitcoin'},
+                             lambda: internet_tools.search_news('Bitcoin'))
+"""
+
+import os
+import json
+import re
+from typing import Any, Callable, Dict, Optional
+
+from ttl_cache import TTLCache, CACHE_DB_PATH
+from tool_registry import tool_registry
+
+# Argumentos comparados sem diferença de maiúsculas/minúsculas
+CASE_INSENSITIVE_ARGS = {'query', 'crypto_id'}
+
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv('TOOL_CACHE_MAX_ENTRIES', '2000'))
+TOOL_CACHE_MAX_BYTES = int(os.getenv('TOOL_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+TOOL_CACHE_MAX_RESULT_BYTES = int(os.getenv('TOOL_CACHE_MAX_RESULT_BYTES', str(256 * 1024)))
+TOOL_CACHE_L2 = os.getenv('TOOL_CACHE_L2', 'true').lower() == 'true'
+
+_whitespace = re.compile(r'\s+')
+
+
+def _is_negative(result: Any) -> bool:
+    """Erros e buscas vazias ficam só o TTL negativo em cache"""
+    return result is None or result == [] or (isinstance(result, dict) and 'error' in result)
+
+
+def _normalize(name: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = _whitespace.sub(' ', value).strip()
+        return value.casefold() if name in CASE_INSENSITIVE_ARGS else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class ToolResultCache:
+    """Cache de resultados de ferramentas por argumentos canônicos"""
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None,
+                 defaults: Optional[Dict[str, Dict[str, Any]]] = None,
+                 cache: Optional[TTLCache] = None,
+                 stale_ttls: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            ttls: {ferramenta: TTL em segundos}; ferramentas fora da tabela não são
+                cacheadas (padrão: cache_ttl do tool_registry)
+            defaults: {ferramenta: {argumento: valor padrão}}; mesma chamada com ou
+                sem o default = mesma chave (padrão: defaults dos schemas)
+            cache: TTLCache a usar (padrão: próprio, com L2 em data/sofia_cache.db)
+            stale_ttls: {ferramenta: janela stale em segundos} (padrão: stale_ttl do tool_registry)
+        """
+        self.ttls = dict(ttls if ttls is not None else tool_registry.cache_ttls())
+        self.defaults = defaults if defaults is not None else tool_registry.arg_defaults()
+        stale_ttls = stale_ttls if stale_ttls is not None else tool_registry.stale_ttls()
+        self.cache = cache if cache is not None else TTLCache(
+            {self.namespace(name): ttl for name, ttl in self.ttls.items()},
+            stale_ttls={self.namespace(name): ttl for name, ttl in stale_ttls.items()},
+            max_entries=TOOL_CACHE_MAX_ENTRIES,
+            max_bytes=TOOL_CACHE_MAX_BYTES,
+            max_value_bytes=TOOL_CACHE_MAX_RESULT_BYTES,
+            l2_path=CACHE_DB_PATH if TOOL_CACHE_L2 else None
+        )
+
+    @staticmethod
+    def namespace(name: str) -> str:
+        return f"tool:{name}"
+
+    def key_for(self, name: str, args: Dict[str, Any]) -> str:
+        """Forma canônica dos argumentos (JSON ordenado e compacto)"""
+        merged = {**self.defaults.get(name, {}), **(args or {})}
+        canonical = {k: _normalize(k, v) for k, v in merged.items() if v is not None}
+        return json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+    def call(self, name: str, args: Dict[str, Any], fn: Callable[[], Any]) -> Any:
+        """
+        Resultado em cache ou fn() (chamadas iguais e simultâneas compartilham a busca)
+
+        Args:
+            name: Nome da ferramenta
+            args: Argumentos recebidos do modelo
+            fn: Executa a ferramenta
+        """
+        if name not in self.ttls:
+            return fn()
+        return self.cache.get_or_set(self.namespace(name), self.key_for(name, args), fn, _is_negative)
+
+    def get_stats(self) -> Dict:
+        return self.cache.get_stats()
+
+
+# Instância global
+tool_cache = ToolResultCache()
+
+
+if __name__ == "__main__":
+    import time
+
+    print("🧰 Tool Cache - Sofia LiberNet")
+    print("=" * 60)
+
+    demo = ToolResultCache({'search_news': 600}, cache=TTLCache({'tool:search_news': 600}, max_value_bytes=1024))
+    calls = {'n': 0}
+
+    def search(query):
+        calls['n'] += 1
+        time.sleep(0.2)
+        return [{'title': f'Notícia sobre {query}'}]
+
+    for args in [{'query': 'Bitcoin'}, {'query': '  bitcoin ', 'count': 5}, {'query': 'BITCOIN', 'count': 5.0}]:
+        start = time.perf_counter()
+        result = demo.call('search_news', args, lambda: search(args['query']))
+        print(f"{args} -> {demo.key_for('search_news', args)} "
+              f"({(time.perf_counter() - start) * 1000:.0f} ms) {result}")
+    print(f"Buscas reais: {calls['n']}")
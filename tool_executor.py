@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Tool Executor - Sofia LiberNet
+
+Execução concorrente das ferramentas pedidas pelo modelo (function calling):
+- Todas as chamadas de uma rodada em paralelo, num pool limitado
+  (padrão: 2x GUNICORN_THREADS, para as threads do worker não disputarem vagas)
+- Timeout por ferramenta contado do início da execução; a espera na fila tem
+  o mesmo limite e chamadas que não começaram a tempo são canceladas
+- Resultados devolvidos na ordem original dos tool_call_id
+- Latência por ferramenta (contagem, erros, timeouts, p50/p95)
+
+Uso:
+    from tool_executor import tool_executor
+    results = tool_executor.run(
+        [(tc.id, tc.function.name, tc.function.arguments) for tc in tool_calls],
+        dispatch  # dispatch(name, args) -> resultado
+    )
+    for r in results:
+        conversation.append({'role': 'tool', 'tool_call_id': r.call_id, ...})
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tool_registry import tool_registry
+
+# Cada thread HTTP do worker pode disparar uma rodada com várias ferramentas
+TOOL_MAX_WORKERS = int(os.getenv('TOOL_MAX_WORKERS', '0')) or 2 * int(os.getenv('GUNICORN_THREADS', '16'))
+TOOL_TIMEOUT = float(os.getenv('TOOL_TIMEOUT', '15'))
+
+LATENCY_SAMPLES = 200
+
+
+class ToolResult:
+    """Resultado de uma chamada de ferramenta"""
+
+    __slots__ = ('call_id', 'name', 'args', 'result', 'status', 'latency')
+
+    def __init__(self, call_id: str, name: str, args: Dict, result: Any, status: str, latency: float):
+        self.call_id = call_id
+        self.name = name
+        self.args = args
+        self.result = result
+        self.status = status  # ok | error | timeout
+        self.latency = latency
+
+
+class _Task:
+    """Marca quando a chamada saiu da fila e começou a executar"""
+
+    __slots__ = ('started', 'started_at')
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.started_at = 0.0
+
+
+class ToolExecutor:
+    """Pool compartilhado para executar rodadas de tool calls em paralelo"""
+
+    def __init__(self, max_workers: int = TOOL_MAX_WORKERS, default_timeout: float = TOOL_TIMEOUT,
+                 timeouts: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            max_workers: Máximo de ferramentas executando ao mesmo tempo (no processo)
+            default_timeout: Timeout para ferramentas sem entrada em timeouts
+            timeouts: Timeouts por nome de ferramenta (padrão: os do tool_registry)
+        """
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts if timeouts is not None else tool_registry.timeouts()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def timeout_for(self, name: str) -> float:
+        return self.timeouts.get(name, self.default_timeout)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='tool')
+            return self._executor
+
+    @staticmethod
+    def _call(dispatch: Callable[[str, Dict], Any], name: str, args: Dict, task: _Task) -> Tuple[Any, float]:
+        task.started_at = time.perf_counter()
+        task.started.set()
+        result = dispatch(name, args)
+        return result, time.perf_counter() - task.started_at
+
+    def run(self, calls: List[Tuple[str, str, str]],
+            dispatch: Callable[[str, Dict], Any]) -> List[ToolResult]:
+        """
+        Executa uma rodada de tool calls
+
+        Args:
+            calls: Lista de (tool_call_id, nome, argumentos JSON)
+            dispatch: Função que executa uma ferramenta: dispatch(nome, args)
+
+        Returns:
+            Lista de ToolResult na mesma ordem de calls
+        """
+        executor = self._get_executor()
+        started = time.perf_counter()
+        pending = []
+
+        for call_id, name, raw_args in calls:
+            try:
+                args = json.loads(raw_args) if raw_args else {}
+            except (TypeError, ValueError):
+                pending.append((call_id, name, {}, None, None, 'Argumentos inválidos'))
+                continue
+            print(f"[TOOLS] Executando: {name}({args})")
+            task = _Task()
+            future = executor.submit(self._call, dispatch, name, args, task)
+            pending.append((call_id, name, args, future, task, None))
+
+        results = []
+        for call_id, name, args, future, task, error in pending:
+            if future is None:
+                results.append(ToolResult(call_id, name, args, {'error': error}, 'error', 0.0))
+                continue
+
+            # Fila: no máximo o timeout da ferramenta a partir do início da rodada;
+            # execução: o timeout completo a partir de quando a chamada começou
+            timeout = self.timeout_for(name)
+            try:
+                if not task.started.wait(max(0.0, started + timeout - time.perf_counter())):
+                    raise FutureTimeout()
+                remaining = max(0.0, task.started_at + timeout - time.perf_counter())
+                result, latency = future.result(timeout=remaining)
+                status = 'error' if isinstance(result, dict) and 'error' in result else 'ok'
+            except FutureTimeout:
+                # Não iniciada: sai da fila; em execução: o resultado é descartado
+                future.cancel()
+                latency = time.perf_counter() - (task.started_at or started)
+                result, status = {'error': f'Tempo esgotado ao executar {name}'}, 'timeout'
+                where = 'executando' if task.started.is_set() else 'na fila'
+                print(f"[TOOLS] ⏱️ {name} excedeu {timeout:g}s ({where})")
+            except Exception as e:
+                latency = time.perf_counter() - started
+                result, status = {'error': f'Erro ao executar {name}: {str(e)}'}, 'error'
+                print(f"[TOOLS] ❌ {name}: {e}")
+
+            self._record(name, status, latency)
+            results.append(ToolResult(call_id, name, args, result, status, latency))
+
+        print(f"[TOOLS] Rodada com {len(calls)} ferramenta(s) em "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return results
+
+    def _record(self, name: str, status: str, latency: float):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {
+                    'calls': 0, 'errors': 0, 'timeouts': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                    'samples': deque(maxlen=LATENCY_SAMPLES)
+                }
+            stats['calls'] += 1
+            if status == 'error':
+                stats['errors'] += 1
+            elif status == 'timeout':
+                stats['timeouts'] += 1
+            stats['total_seconds'] += latency
+            stats['max_seconds'] = max(stats['max_seconds'], latency)
+            stats['samples'].append(latency)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latência por ferramenta (ms)"""
+        report = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                samples = sorted(stats['samples'])
+                report[name] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'timeouts': stats['timeouts'],
+                    'avg_ms': round(stats['total_seconds'] / stats['calls'] * 1000, 1),
+                    'p50_ms': round(samples[len(samples) // 2] * 1000, 1),
+                    'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+                    'max_ms': round(stats['max_seconds'] * 1000, 1),
+                    'timeout_s': self.timeout_for(name)
+                }
+        return report
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Instância global
+tool_executor = ToolExecutor()
+
+
+if __name__ == "__main__":
+    print("🛠️ Tool Executor - Sofia LiberNet")
+    print("=" * 60)
+
+    def dispatch(name, args):
+        time.sleep(args.get('delay', 0.1))
+        return {'tool': name, 'ok': True}
+
+    executor = ToolExecutor(timeouts={'lenta': 0.5})
+    calls = [
+        ('call_1', 'busca', '{"delay": 0.3}'),
+        ('call_2', 'lenta', '{"delay": 2.0}'),
+        ('call_3', 'cotacao', '{"delay": 0.2}'),
+        ('call_4', 'quebrada', '{não é json'),
+    ]
+    for r in executor.run(calls, dispatch):
+        print(f"{r.call_id} {r.name}: {r.status} em {r.latency * 1000:.0f} ms -> {r.result}")
+    print(executor.get_stats())
+    executor.shutdown()
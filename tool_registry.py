@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Tool Registry - Sofia LiberNet
+
+Registro declarativo das ferramentas oferecidas ao modelo (function calling):
+- Cada ferramenta: schema JSON, handler, timeout, TTL de cache e sobretaxa
+- Schemas montados uma única vez no import (lista pronta + JSON serializado)
+- Despacho O(1) por nome (sem cadeia de if/elif)
+- Fonte única para timeouts (tool_executor), TTLs/defaults (tool_cache) e
+  sobretaxas de cobrança
+
+Uso:
+    from tool_registry import tool_registry
+    api_params['tools'] = tool_registry.schemas
+    result = tool_registry.dispatch('search_news', {'query': 'Bitcoin'}, user_key='42')
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from internet_tools import internet_tools
+
+
+class Tool:
+    """Definição de uma ferramenta"""
+
+    __slots__ = ('name', 'description', 'parameters', 'handler', 'timeout', 'cache_ttl', 'stale_ttl', 'surcharge')
+
+    def __init__(self, name: str, description: str, parameters: Dict[str, Any],
+                 handler: Callable[[Dict[str, Any], Optional[str]], Any],
+                 timeout: float = 10.0, cache_ttl: float = 0, stale_ttl: float = 0, surcharge: int = 0):
+        """
+        Args:
+            name: Nome exposto ao modelo
+            description: Quando usar a ferramenta (lida pelo modelo)
+            parameters: JSON Schema dos argumentos
+            handler: handler(args, user_key) -> resultado JSON-serializável
+            timeout: Tempo máximo de execução (s)
+            cache_ttl: TTL do resultado no tool_cache (0 = sem cache)
+            stale_ttl: Janela após o TTL em que o resultado vencido é servido
+                enquanto o tool_cache atualiza em segundo plano
+            surcharge: Tokens internos cobrados a mais por chamada
+        """
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.handler = handler
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+        self.surcharge = surcharge
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters
+            }
+        }
+
+    @property
+    def defaults(self) -> Dict[str, Any]:
+        """Valores padrão declarados no schema"""
+        return {arg: spec['default'] for arg, spec in self.parameters.get('properties', {}).items()
+                if 'default' in spec}
+
+
+class ToolRegistry:
+    """Ferramentas indexadas por nome, com payloads pré-montados"""
+
+    def __init__(self, tools: Iterable[Tool] = ()):
+        self._tools: Dict[str, Tool] = {}
+        self.schemas: List[Dict[str, Any]] = []
+        self.schemas_json = '[]'
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool: Tool):
+        self._tools[tool.name] = tool
+        # Montado no registro (import), reaproveitado em todas as requisições
+        self.schemas = [t.schema for t in self._tools.values()]
+        self.schemas_json = json.dumps(self.schemas, ensure_ascii=False, separators=(',', ':'))
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def dispatch(self, name: str, args: Dict[str, Any], user_key: Optional[str] = None) -> Any:
+        """
+        Executa uma ferramenta
+
+        Args:
+            name: Nome pedido pelo modelo
+            args: Argumentos já decodificados
+            user_key: Identificador do usuário (rate limit justo)
+
+        Returns:
+            Resultado da ferramenta ou {'error': ...} se desconhecida
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            return {"error": "Função desconhecida"}
+        return tool.handler(args, user_key)
+
+    def timeouts(self) -> Dict[str, float]:
+        return {name: tool.timeout for name, tool in self._tools.items()}
+
+    def cache_ttls(self) -> Dict[str, float]:
+        return {name: tool.cache_ttl for name, tool in self._tools.items() if tool.cache_ttl > 0}
+
+    def stale_ttls(self) -> Dict[str, float]:
+        return {name: tool.stale_ttl for name, tool in self._tools.items()
+                if tool.cache_ttl > 0 and tool.stale_ttl > 0}
+
+    def arg_defaults(self) -> Dict[str, Dict[str, Any]]:
+        return {name: tool.defaults for name, tool in self._tools.items()}
+
+    def surcharge_for(self, names: Iterable[str]) -> int:
+        """Sobretaxa total (tokens internos) de uma lista de chamadas"""
+        return sum(self._tools[name].surcharge for name in names if name in self._tools)
+
+
+# ============= FERRAMENTAS DE INTERNET =============
+
+def _fetch_webpage(args: Dict[str, Any], user_key: Optional[str]) -> Any:
+    return internet_tools.fetch_webpage(args.get('url', ''), args.get('max_length', 5000))
+
+
+def _web_search_brave(args: Dict[str, Any], user_key: Optional[str]) -> Any:
+    return internet_tools.web_search_brave(args.get('query', ''), args.get('count', 5), user_key=user_key)
+
+
+def _search_news(args: Dict[str, Any], user_key: Optional[str]) -> Any:
+    return internet_tools.search_news(args.get('query', ''), args.get('count', 5))
+
+
+def _get_bitcoin_price(args: Dict[str, Any], user_key: Optional[str]) -> Any:
+    return internet_tools.get_bitcoin_price()
+
+
+def _get_crypto_price(args: Dict[str, Any], user_key: Optional[str]) -> Any:
+    return internet_tools.get_crypto_price(args.get('crypto_id', 'bitcoin'))
+
+
+# Única camada de cache destas ferramentas (os handlers do internet_tools não
+# cacheiam): segundos para preços, minutos para buscas/notícias, horas para páginas
+INTERNET_TOOLS = [
+    Tool(
+        name="fetch_webpage",
+        description="Acessa qualquer URL da internet e extrai o conteúdo principal. Use para ler artigos, documentação, páginas web específicas. Retorna título e texto completo.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "url": {
+                    "type": "string",
+                    "description": "URL completa para acessar (ex: https://example.com/artigo)",
+                },
+                "max_length": {
+                    "type": "integer",
+                    "description": "Tamanho máximo do texto em caracteres (padrão: 5000)",
+                    "default": 5000
+                }
+            },
+            "required": ["url"]
+        },
+        handler=_fetch_webpage,
+        timeout=12.0,
+        cache_ttl=6 * 3600
+    ),
+    Tool(
+        name="web_search_brave",
+        description="Busca REAL na web usando Brave Search (similar ao Google). Use para encontrar informações atualizadas, notícias, artigos, qualquer conteúdo na internet. Retorna título, URL e descrição dos resultados.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Consulta de busca em português ou inglês. Seja específico para melhores resultados.",
+                },
+                "count": {
+                    "type": "integer",
+                    "description": "Número de resultados (1-10, padrão: 5)",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        },
+        handler=_web_search_brave,
+        timeout=10.0,
+        cache_ttl=15 * 60,
+        stale_ttl=45 * 60
+    ),
+    Tool(
+        name="search_news",
+        description="Busca notícias RECENTES sobre um tópico usando Google News. Use quando o usuário perguntar sobre notícias, eventos atuais, últimas novidades. Retorna título, URL, data e descrição.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Tópico para buscar notícias (ex: 'Bitcoin', 'Israel guerra', 'tecnologia IA')",
+                },
+                "count": {
+                    "type": "integer",
+                    "description": "Número de notícias (1-10, padrão: 5)",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        },
+        handler=_search_news,
+        timeout=10.0,
+        cache_ttl=10 * 60,
+        stale_ttl=10 * 60
+    ),
+    Tool(
+        name="get_bitcoin_price",
+        description="Obtém o preço atual do Bitcoin em USD e BRL do CoinGecko. Use quando o usuário perguntar sobre preço, cotação ou valor do Bitcoin/BTC.",
+        parameters={
+            "type": "object",
+            "properties": {},
+            "required": []
+        },
+        handler=_get_bitcoin_price,
+        timeout=6.0,
+        cache_ttl=30,
+        stale_ttl=30  # preço com no máximo ~1 min de idade
+    ),
+    Tool(
+        name="get_crypto_price",
+        description="Obtém o preço de qualquer criptomoeda do CoinGecko. Use quando o usuário perguntar sobre outras criptos além do Bitcoin.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "crypto_id": {
+                    "type": "string",
+                    "description": "ID da criptomoeda no CoinGecko (ex: bitcoin, ethereum, cardano, solana)",
+                }
+            },
+            "required": ["crypto_id"]
+        },
+        handler=_get_crypto_price,
+        timeout=6.0,
+        cache_ttl=30,
+        stale_ttl=30
+    ),
+]
+
+
+# Instância global
+tool_registry = ToolRegistry(INTERNET_TOOLS)
+
+
+if __name__ == "__main__":
+    print("🧩 Tool Registry - Sofia LiberNet")
+    print("=" * 60)
+
+    for name in tool_registry.names():
+        tool = tool_registry.get(name)
+        print(f"{name}: timeout={tool.timeout}s cache={tool.cache_ttl}s+{tool.stale_ttl}s defaults={tool.defaults}")
+    print(f"Payload: {len(tool_registry.schemas_json)} bytes")
+    print(tool_registry.dispatch('inexistente', {}))
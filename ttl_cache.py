@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+TTL Cache - Sofia LiberNet
+
+Cache em camadas para consultas externas (localização, clima, buscas, preços):
+- L1 em memória: LRU limitado por número de entradas e por bytes
+- TTL por namespace e cache negativo (falhas guardadas por pouco tempo)
+- L2 opcional em SQLite: sobrevive a reinícios e é compartilhado entre workers;
+  limitado por entradas e bytes (as mais próximas de vencer saem primeiro)
+- I/O do L2 fora do lock do L1: hits em memória não esperam o SQLite
+- Single-flight: chamadas concorrentes para a mesma chave esperam uma única busca
+- Stale-while-revalidate: entrada vencida (dentro da janela stale) é servida na hora
+  enquanto uma única atualização roda em segundo plano
+- Métricas de hit/miss/evicção por namespace
+
+Uso:
+    cache = TTLCache({'weather': 1800, 'location': 86400}, stale_ttls={'weather': 1800},
+                     l2_path="data/sofia_cache.db")
+    weather = cache.get_or_set('weather', key, lambda: fetch_weather(lat, lon))
+    # fetch retorna None em caso de falha → guardado com o TTL negativo
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE_DB_PATH = os.path.join(os.path.dirname(__file__), "data", "sofia_cache.db")
+
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '5000'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+CACHE_NEGATIVE_TTL = int(os.getenv('CACHE_NEGATIVE_TTL', '60'))
+CACHE_DEFAULT_TTL = 300
+CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', '4'))
+CACHE_L2_MAX_ENTRIES = int(os.getenv('CACHE_L2_MAX_ENTRIES', '50000'))
+CACHE_L2_MAX_BYTES = int(os.getenv('CACHE_L2_MAX_BYTES', str(256 * 1024 * 1024)))
+L2_PURGE_EVERY = 500  # escritas entre limpezas do SQLite (expiradas + excesso sobre os limites)
+
+MISSING = object()
+
+
+class CacheEntry:
+    """Valor em cache com expiração absoluta (time.time(), comparável entre processos)"""
+
+    __slots__ = ('value', 'expires_at', 'stale_until', 'negative', 'size')
+
+    def __init__(self, value: Any, expires_at: float, negative: bool, size: int,
+                 stale_until: Optional[float] = None):
+        self.value = value
+        self.expires_at = expires_at
+        # Até quando o valor vencido ainda pode ser servido enquanto atualiza
+        self.stale_until = max(expires_at, stale_until or expires_at)
+        self.negative = negative
+        self.size = size
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+    def usable(self, now: Optional[float] = None) -> bool:
+        """Fresco ou ainda dentro da janela stale"""
+        return (now or time.time()) < self.stale_until
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce chamadas concorrentes: uma execução por chave, as demais esperam"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa fn() uma vez para todas as chamadas simultâneas com a mesma chave
+
+        Returns:
+            (resultado, compartilhado) - compartilhado=True se outra thread executou
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def _serialize(value: Any) -> Tuple[Optional[str], int]:
+    """JSON do valor (None se não serializável) e tamanho estimado em bytes"""
+    try:
+        payload = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        return payload, len(payload.encode('utf-8'))
+    except (TypeError, ValueError):
+        return None, sys.getsizeof(value)
+
+
+class TTLCache:
+    """Cache LRU com TTL por namespace, cache negativo e L2 em SQLite"""
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES,
+                 negative_ttl: float = CACHE_NEGATIVE_TTL,
+                 default_ttl: float = CACHE_DEFAULT_TTL,
+                 l2_path: Optional[str] = None,
+                 stale_ttls: Optional[Dict[str, float]] = None,
+                 max_value_bytes: Optional[int] = None,
+                 l2_max_entries: int = CACHE_L2_MAX_ENTRIES,
+                 l2_max_bytes: int = CACHE_L2_MAX_BYTES):
+        """
+        Args:
+            ttls: {namespace: TTL em segundos}
+            max_entries: Máximo de entradas no L1
+            max_bytes: Máximo de bytes (estimados) no L1
+            negative_ttl: TTL de falhas (valor None)
+            default_ttl: TTL de namespaces não configurados
+            l2_path: Banco SQLite do L2 (None = somente memória)
+            stale_ttls: {namespace: segundos após o TTL em que o valor vencido
+                ainda é servido enquanto get_or_set atualiza em segundo plano}
+            max_value_bytes: Valores maiores que isso não são guardados (None = sem limite)
+            l2_max_entries: Máximo de entradas no arquivo do L2 (todas as instâncias que o usam)
+            l2_max_bytes: Máximo de bytes de valores no arquivo do L2
+        """
+        self.ttls = dict(ttls or {})
+        self.stale_ttls = dict(stale_ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_value_bytes = max_value_bytes
+        self.negative_ttl = negative_ttl
+        self.default_ttl = default_ttl
+        self.l2_path = l2_path
+        self.l2_max_entries = l2_max_entries
+        self.l2_max_bytes = l2_max_bytes
+
+        # _lock protege só o L1 (memória); a conexão SQLite tem lock próprio
+        self._lock = threading.RLock()
+        self._l2_lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # (namespace, key) -> CacheEntry
+        self._bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        self._flight = SingleFlight()
+        self._refreshing: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._l2_writes = 0
+        if l2_path:
+            self._init_database()
+
+    # ============= L2 (SQLITE) =============
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Conexão única do processo (protegida por self._l2_lock)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.l2_path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _init_database(self):
+        os.makedirs(os.path.dirname(self.l2_path), exist_ok=True)
+
+        with self._l2_lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    negative BOOLEAN DEFAULT 0,
+                    stale_until REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+            cursor.execute("PRAGMA table_info(cache_entries)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'stale_until' not in columns:
+                cursor.execute("ALTER TABLE cache_entries ADD COLUMN stale_until REAL")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_expires
+                ON cache_entries(expires_at)
+            """)
+
+            conn.commit()
+
+    def _l2_get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        try:
+            with self._l2_lock:
+                cursor = self.get_connection().cursor()
+                cursor.execute("""
+                    SELECT value, expires_at, negative, stale_until FROM cache_entries
+                    WHERE namespace = ? AND key = ? AND COALESCE(stale_until, expires_at) > ?
+                """, (namespace, key, time.time()))
+                row = cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"[CACHE] ⚠️ Erro ao ler L2: {e}")
+            return None
+
+        if not row:
+            return None
+        return CacheEntry(json.loads(row['value']), row['expires_at'], bool(row['negative']),
+                          len(row['value'].encode('utf-8')), row['stale_until'])
+
+    def _l2_set(self, namespace: str, key: str, payload: str, entry: CacheEntry):
+        try:
+            with self._l2_lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, negative, stale_until)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (namespace, key, payload, entry.expires_at, entry.negative, entry.stale_until))
+
+                self._l2_writes += 1
+                if self._l2_writes % L2_PURGE_EVERY == 0:
+                    self._l2_purge(cursor)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[CACHE] ⚠️ Erro ao gravar L2: {e}")
+
+    def _l2_purge(self, cursor: sqlite3.Cursor):
+        """Remove expiradas e o excesso sobre os limites; chamar com self._l2_lock"""
+        cursor.execute("DELETE FROM cache_entries WHERE COALESCE(stale_until, expires_at) <= ?",
+                       (time.time(),))
+        # Mantém as que vencem por último enquanto couberem em entradas e bytes
+        cursor.execute("""
+            DELETE FROM cache_entries WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid,
+                           ROW_NUMBER() OVER newest AS position,
+                           SUM(LENGTH(CAST(value AS BLOB))) OVER newest AS total_bytes
+                    FROM cache_entries
+                    WINDOW newest AS (ORDER BY COALESCE(stale_until, expires_at) DESC, rowid DESC)
+                ) WHERE position > ? OR total_bytes > ?
+            )
+        """, (self.l2_max_entries, self.l2_max_bytes))
+        if cursor.rowcount > 0:
+            print(f"[CACHE] 🧹 L2 acima do limite: {cursor.rowcount} entradas removidas")
+
+    # ============= L1 (MEMÓRIA) =============
+
+    def _stat(self, namespace: str, name: str, amount: int = 1):
+        stats = self._stats.setdefault(namespace, {
+            'hits': 0, 'negative_hits': 0, 'l2_hits': 0, 'stale_hits': 0, 'misses': 0,
+            'coalesced': 0, 'refreshes': 0, 'sets': 0, 'expired': 0, 'evicted': 0, 'oversized': 0
+        })
+        stats[name] += amount
+
+    def _store(self, cache_key: Tuple[str, str], entry: CacheEntry):
+        old = self._entries.pop(cache_key, None)
+        if old:
+            self._bytes -= old.size
+        self._entries[cache_key] = entry
+        self._bytes += entry.size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            (namespace, _), evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stat(namespace, 'evicted')
+
+    def _drop(self, cache_key: Tuple[str, str]):
+        entry = self._entries.pop(cache_key, None)
+        if entry:
+            self._bytes -= entry.size
+
+    # ============= API =============
+
+    def ttl_for(self, namespace: str, negative: bool = False) -> float:
+        if negative:
+            return min(self.negative_ttl, self.ttls.get(namespace, self.default_ttl))
+        return self.ttls.get(namespace, self.default_ttl)
+
+    def _lookup(self, cache_key: Tuple[str, str], now: float) -> Tuple[Optional[CacheEntry], bool]:
+        """
+        Entrada utilizável (fresca ou stale) do L1 ou do L2; chamar sem self._lock
+
+        Returns:
+            (entrada ou None, veio do L2)
+        """
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                if entry.usable(now):
+                    self._entries.move_to_end(cache_key)
+                    return entry, False
+                self._drop(cache_key)
+                self._stat(cache_key[0], 'expired')
+
+        if self.l2_path:
+            entry = self._l2_get(*cache_key)
+            if entry is not None:
+                with self._lock:
+                    self._store(cache_key, entry)
+                return entry, True
+
+        return None, False
+
+    def _count_hit(self, namespace: str, entry: CacheEntry, from_l2: bool):
+        if from_l2:
+            self._stat(namespace, 'l2_hits')
+        else:
+            self._stat(namespace, 'negative_hits' if entry.negative else 'hits')
+
+    def get(self, namespace: str, key: str, default: Any = MISSING) -> Any:
+        """
+        Busca um valor válido (L1, depois L2)
+
+        Returns:
+            Valor em cache (None para falhas em cache negativo) ou default
+        """
+        now = time.time()
+        entry, from_l2 = self._lookup((namespace, key), now)
+
+        with self._lock:
+            if entry is not None and not entry.expired(now):
+                self._count_hit(namespace, entry, from_l2)
+                return entry.value
+
+            self._stat(namespace, 'misses')
+            return default
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None,
+            negative: Optional[bool] = None):
+        """
+        Armazena um valor
+
+        Args:
+            namespace: Namespace (define o TTL padrão)
+            key: Chave dentro do namespace
+            value: Valor (JSON-serializável para ir ao L2)
+            ttl: TTL explícito em segundos
+            negative: Falha em cache (padrão: value is None)
+        """
+        negative = value is None if negative is None else negative
+        ttl = ttl if ttl is not None else self.ttl_for(namespace, negative)
+        if ttl <= 0:
+            return
+
+        payload, size = _serialize(value)
+        if self.max_value_bytes is not None and size > self.max_value_bytes:
+            with self._lock:
+                self._stat(namespace, 'oversized')
+            return
+
+        expires_at = time.time() + ttl
+        # Falhas não são servidas depois de vencidas
+        stale_until = expires_at + (0 if negative else self.stale_ttls.get(namespace, 0))
+        entry = CacheEntry(value, expires_at, negative, size, stale_until)
+
+        with self._lock:
+            self._store((namespace, key), entry)
+            self._stat(namespace, 'sets')
+        if self.l2_path and payload is not None:
+            self._l2_set(namespace, key, payload, entry)
+
+    def get_or_set(self, namespace: str, key: str, fetch: Callable[[], Any],
+                   is_negative: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Retorna o valor em cache ou chama fetch() e armazena o resultado
+
+        Chamadas simultâneas para a mesma chave compartilham uma única busca.
+        Valores vencidos dentro da janela stale são retornados imediatamente e
+        atualizados em segundo plano (uma atualização por chave).
+
+        Args:
+            fetch: Função sem argumentos que busca o valor
+            is_negative: Identifica falhas (cache negativo); padrão: valor None
+        """
+        cache_key = (namespace, key)
+        now = time.time()
+        entry, from_l2 = self._lookup(cache_key, now)
+
+        with self._lock:
+            if entry is not None:
+                if not entry.expired(now):
+                    self._count_hit(namespace, entry, from_l2)
+                    return entry.value
+                if not entry.negative:
+                    self._stat(namespace, 'stale_hits')
+                    self._refresh_async(namespace, key, fetch, is_negative)
+                    return entry.value
+            self._stat(namespace, 'misses')
+
+        value, shared = self._flight.do(cache_key, lambda: self._load(namespace, key, fetch, is_negative))
+        if shared:
+            with self._lock:
+                self._stat(namespace, 'coalesced')
+        return value
+
+    def _load(self, namespace: str, key: str, fetch: Callable[[], Any],
+              is_negative: Optional[Callable[[Any], bool]]) -> Any:
+        # Outro worker pode ter preenchido o L2 enquanto esperávamos
+        if self.l2_path:
+            entry, _ = self._lookup((namespace, key), time.time())
+            if entry is not None and not entry.expired():
+                return entry.value
+
+        value = fetch()
+        self.set(namespace, key, value, negative=is_negative(value) if is_negative else None)
+        return value
+
+    def _refresh_async(self, namespace: str, key: str, fetch: Callable[[], Any],
+                       is_negative: Optional[Callable[[Any], bool]]):
+        """Agenda uma atualização da chave (ignorado se já houver uma em andamento)"""
+        cache_key = (namespace, key)
+        if cache_key in self._refreshing:
+            return
+        self._refreshing.add(cache_key)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS,
+                                                thread_name_prefix='cache-refresh')
+        self._executor.submit(self._refresh, namespace, key, fetch, is_negative)
+
+    def _refresh(self, namespace: str, key: str, fetch: Callable[[], Any],
+                 is_negative: Optional[Callable[[Any], bool]]):
+        cache_key = (namespace, key)
+        try:
+            value, _ = self._flight.do(cache_key, fetch)
+            negative = is_negative(value) if is_negative else value is None
+            # Falha na atualização: continuar servindo o valor stale até a janela acabar
+            if not negative:
+                self.set(namespace, key, value)
+            with self._lock:
+                self._stat(namespace, 'refreshes')
+        except Exception as e:
+            print(f"[CACHE] ⚠️ Erro ao atualizar {namespace}/{key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(cache_key)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._drop((namespace, key))
+        if self.l2_path:
+            try:
+                with self._l2_lock:
+                    conn = self.get_connection()
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"[CACHE] ⚠️ Erro ao remover do L2: {e}")
+
+    def clear(self, namespace: Optional[str] = None):
+        """Limpa um namespace (ou tudo) no L1 e no L2"""
+        with self._lock:
+            for cache_key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._drop(cache_key)
+        if self.l2_path:
+            try:
+                with self._l2_lock:
+                    conn = self.get_connection()
+                    if namespace is None:
+                        conn.execute("DELETE FROM cache_entries")
+                    else:
+                        conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"[CACHE] ⚠️ Erro ao limpar L2: {e}")
+
+    def close(self):
+        """Encerra as atualizações em segundo plano"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        """Ocupação e métricas por namespace"""
+        with self._lock:
+            namespaces = {}
+            for namespace, stats in self._stats.items():
+                lookups = (stats['hits'] + stats['negative_hits'] + stats['l2_hits'] +
+                           stats['stale_hits'] + stats['misses'])
+                hits = lookups - stats['misses']
+                namespaces[namespace] = {
+                    **stats,
+                    'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+                }
+
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'l2': bool(self.l2_path),
+                'l2_max_entries': self.l2_max_entries if self.l2_path else 0,
+                'l2_max_bytes': self.l2_max_bytes if self.l2_path else 0,
+                'in_flight': self._flight.in_flight(),
+                'refreshing': len(self._refreshing),
+                'namespaces': namespaces
+            }
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("🗄️ TTL Cache - Sofia LiberNet")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.db')
+        cache = TTLCache({'weather': 1800, 'price': 1}, max_entries=3, l2_path=path)
+
+        calls = []
+        def fetch(name):
+            calls.append(name)
+            return None if name == 'falha' else {'name': name}
+
+        for name in ['sp', 'sp', 'rj', 'falha', 'falha', 'bh', 'poa', 'sp']:
+            print(f"{name}: {cache.get_or_set('weather', name, lambda: fetch(name))}")
+        print(f"Chamadas externas: {calls}")
+
+        # Outro processo/worker com o mesmo L2
+        other = TTLCache({'weather': 1800}, l2_path=path)
+        print(f"Worker 2 (L2): {other.get('weather', 'rj')}")
+
+        # Single-flight: 20 threads pedindo o mesmo preço ao mesmo tempo
+        cache = TTLCache({'price': 1}, stale_ttls={'price': 60})
+        calls.clear()
+        def fetch_price():
+            calls.append('price')
+            time.sleep(0.2)
+            return {'usd': 100 + len(calls)}
+
+        threads = [threading.Thread(target=cache.get_or_set, args=('price', 'btc', fetch_price))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"20 chamadas simultâneas → {len(calls)} busca(s) externa(s)")
+
+        # Stale-while-revalidate: valor vencido servido na hora, atualização em segundo plano
+        time.sleep(1.1)
+        start = time.perf_counter()
+        stale = cache.get_or_set('price', 'btc', fetch_price)
+        print(f"Vencido servido em {(time.perf_counter() - start) * 1000:.2f}ms: {stale}")
+        cache.close()
+        print(f"Após atualização: {cache.get('price', 'btc')}")
+        print(json.dumps(cache.get_stats(), indent=2))